@@ -0,0 +1,180 @@
+"""Sprite atlas: every sprite packed into one pre-decoded, memory-mapped RGBA file.
+
+Build it with ``scripts/build_atlas.py``. When present, ``io.load_img`` serves
+sprites from the atlas instead of decoding their PNGs. Sprites whose PNG has
+changed since the atlas was built are left out, and decoded as before.
+"""
+from __future__ import annotations
+import json
+import mmap
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Final, NamedTuple
+
+from PIL import Image
+
+from . import constants as C
+
+VERSION: Final = 2
+WIDTH: Final = 256
+SPRITE_DIRS: Final = ('block', 'monster', 'tower', 'projectileImages', 'mouseImages')
+# Rotations baked into the atlas, besides the unrotated sprite. Arrows are
+# drawn at the nearest whole degree
+ROTATIONS: Final[Mapping[str, Iterable[int]]] = {
+    'projectileImages/arrow.png': range(1, 360),
+}
+
+
+class Rect(NamedTuple):
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class Sprite:
+    path: str
+    name: str
+    level: int
+    rotation: int
+    rect: Rect
+
+
+class Atlas:
+    def __init__(self, image: Image.Image, sprites: Iterable[Sprite]):
+        self._image = image
+        self._rects = {(s.path, s.rotation): s.rect for s in sprites}
+
+    def get(self, fp: Path, rotation: int = 0) -> Image.Image | None:
+        """The sprite at `rotation`, rotating the unrotated one if not baked."""
+        path = fp.as_posix()
+        rect = self._rects.get((path, rotation))
+        if rect is not None:
+            return self._crop(rect)
+        rect = self._rects.get((path, 0))
+        if rect is None:
+            return None
+        return self._crop(rect).rotate(rotation)
+
+    def _crop(self, rect: Rect) -> Image.Image:
+        return self._image.crop(
+            (rect.x, rect.y, rect.x + rect.width, rect.y + rect.height)
+        )
+
+
+def data_path() -> Path:
+    return C.Paths.IMAGES.join('atlas.rgba')
+
+
+def index_path() -> Path:
+    return C.Paths.IMAGES.join('atlas.json')
+
+
+@cache
+def load() -> Atlas | None:
+    """Map the atlas into memory, if it has been built."""
+    if not (data_path().exists() and index_path().exists()):
+        return None
+    index = json.loads(index_path().read_text())
+    if index['version'] != VERSION:
+        return None
+
+    with open(data_path(), 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    size = tuple(index['size'])
+    image = Image.frombuffer('RGBA', size, data, 'raw', 'RGBA', 0, 1)
+    stale = {
+        path
+        for path, stamp in index['sources'].items()
+        if _stamp(C.Paths.IMAGES.join(path)) != stamp
+    }
+    sprites = (
+        Sprite(s['path'], s['name'], s['level'], s['rotation'], Rect(*s['rect']))
+        for s in index['sprites']
+        if s['path'] not in stale
+    )
+    return Atlas(image, sprites)
+
+
+def _stamp(fp: Path) -> list[int] | None:
+    """A source PNG's modification time and size, None if it is gone."""
+    try:
+        stat = fp.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def build() -> tuple[Path, Path]:
+    """Pack every sprite into the atlas, returning the data and index paths."""
+    images = dict(_sprite_images())
+    placed = _pack({key: img.size for key, img in images.items()})
+    height = max((r.y + r.height for r in placed.values()), default=0)
+
+    sheet = Image.new('RGBA', (WIDTH, height), (0, 0, 0, 0))
+    sprites = []
+    for (path, rotation), rect in placed.items():
+        sheet.paste(images[path, rotation], (rect.x, rect.y))
+        name, level = _name_and_level(path)
+        sprites.append(Sprite(path, name, level, rotation, rect))
+
+    data_path().write_bytes(sheet.tobytes())
+    index = {
+        'version': VERSION,
+        'size': sheet.size,
+        'sources': {
+            path: _stamp(C.Paths.IMAGES.join(path))
+            for path in sorted({s.path for s in sprites})
+        },
+        'sprites': [
+            {
+                'path': s.path,
+                'name': s.name,
+                'level': s.level,
+                'rotation': s.rotation,
+                'rect': list(s.rect),
+            }
+            for s in sprites
+        ],
+    }
+    index_path().write_text(json.dumps(index, indent=1))
+    return data_path(), index_path()
+
+
+def _sprite_images() -> Iterable[tuple[tuple[str, int], Image.Image]]:
+    root = C.Paths.IMAGES.path
+    for directory in SPRITE_DIRS:
+        for fp in sorted(root.joinpath(directory).rglob('*.png')):
+            path = fp.relative_to(root).as_posix()
+            img = Image.open(fp).convert('RGBA')
+            yield (path, 0), img
+            for rotation in ROTATIONS.get(path, ()):
+                yield (path, rotation), img.rotate(rotation)
+
+
+def _pack(
+    sizes: Mapping[tuple[str, int], tuple[int, int]]
+) -> dict[tuple[str, int], Rect]:
+    """Shelf-pack sprites, tallest first, into rows `WIDTH` pixels wide."""
+    placed = {}
+    x = y = shelf = 0
+    for key in sorted(sizes, key=lambda k: (-sizes[k][1], k)):
+        width, height = sizes[key]
+        if x + width > WIDTH:
+            x, y, shelf = 0, y + shelf, 0
+        placed[key] = Rect(x, y, width, height)
+        x += width
+        shelf = max(shelf, height)
+    return placed
+
+
+def _name_and_level(path: str) -> tuple[str, int]:
+    """Split 'tower/<Tower>/<level>.png' into its tower and level."""
+    stem = path.rsplit('.', 1)[0]
+    head, _, tail = stem.rpartition('/')
+    if tail.isdigit():
+        return head, int(tail)
+    return stem, 0
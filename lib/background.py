@@ -0,0 +1,89 @@
+"""The map with every placed tower baked into a single image."""
+from __future__ import annotations
+import tkinter as tk
+
+from PIL import Image, ImageTk
+
+from . import grid, io, maps, tower
+from .maps import Dimension
+
+Box = tuple[int, int, int, int]
+
+
+class Background:
+    """Draws the map and the towers as one canvas image.
+
+    The image is recomposed only where towers were placed, upgraded or removed.
+    """
+
+    def __init__(self, map_name: str, tower_map: tower.TowerMap, block_dim: Dimension):
+        self._tower_map = tower_map
+        self._block_dim = block_dim
+        self._base = io.load_img(maps.img_path(map_name)).convert('RGBA')
+        self._image = self._base.copy()
+        self._photo: ImageTk.PhotoImage | None = None
+        # Where each tower's sprite was composited
+        self._boxes: dict[grid.Point, Box] = {}
+        self._dirty: set[grid.Point] = set(tower_map)
+        tower_map.baked = True
+        tower_map.subscribe(self._dirty.add)
+
+    def update(self) -> None:
+        pass
+
+    def composed(self) -> Image.Image:
+        """The map with every tower, recomposed where towers have changed."""
+        if self._dirty:
+            self._compose()
+        return self._image
+
+    def paint(self, canvas: tk.Canvas) -> None:
+        if self._photo is None:
+            self._compose()
+            self._photo = ImageTk.PhotoImage(self._image)
+        elif self._dirty:
+            self._compose()
+            self._photo.paste(self._image)
+        canvas.create_image(0, 0, image=self._photo, anchor=tk.NW)
+
+    def _compose(self) -> None:
+        bounds = (0, 0, *self._image.size)
+        for point in self._dirty:
+            old = self._boxes.pop(point, None)
+            if point in self._tower_map:
+                self._boxes[point] = self._sprite_box(point)
+            region = _union(old, self._boxes.get(point))
+            if region is not None:
+                region = _intersection(region, bounds)
+            if region is not None:
+                self._redraw(region)
+        self._dirty.clear()
+
+    def _redraw(self, region: Box) -> None:
+        self._image.paste(self._base.crop(region), region[:2])
+        for point, box in self._boxes.items():
+            overlap = _intersection(box, region)
+            if overlap is None:
+                continue
+            left, top, right, bottom = overlap
+            source = (left - box[0], top - box[1], right - box[0], bottom - box[1])
+            sprite = tower.load_sprite(self._tower_map[point])
+            self._image.alpha_composite(sprite, (left, top), source)
+
+    def _sprite_box(self, point: grid.Point) -> Box:
+        width, height = tower.load_sprite(self._tower_map[point]).size
+        # Centred on the cell, as canvas images anchored at their centre are
+        left = int(point.x * self._block_dim + self._block_dim / 2 - width / 2)
+        top = int(point.y * self._block_dim + self._block_dim / 2 - height / 2)
+        return left, top, left + width, top + height
+
+
+def _union(a: Box | None, b: Box | None) -> Box | None:
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _intersection(a: Box, b: Box) -> Box | None:
+    box = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    return box if box[0] < box[2] and box[1] < box[3] else None
@@ -33,21 +33,30 @@ class Button(ABC):
     def press(self, tower_map: tower.ITowerMap) -> None:
         """Implement press functionality."""
 
-    def paint(self, canvas: tk.Canvas) -> None:
-        canvas.create_rectangle(*self.coord1, *self.coord2, fill="red", outline="black")
+    def paint(self, canvas: tk.Canvas) -> int:
+        return canvas.create_rectangle(
+            *self.coord1, *self.coord2, fill="red", outline="black"
+        )
 
 
 class NextWaveButton:
     def __init__(self):
         self.coord1 = grid.Point(450, 25)
         self.coord2 = grid.Point(550, 50)
+        self._rect: int | None = None
 
     def paint(self, canvas: tk.Canvas, color: str) -> None:
-        canvas.create_rectangle(
+        self._rect = canvas.create_rectangle(
             *self.coord1, *self.coord2, fill=color, outline=color
         )  # draws a rectangle where the pointer is
         canvas.create_text(500, 37, text="Next Wave")
 
+    def recolor(self, canvas: tk.Canvas, color: str) -> None:
+        if self._rect is None:
+            self.paint(canvas, color)
+        else:
+            canvas.itemconfigure(self._rect, fill=color, outline=color)
+
 
 def is_within_bounds(btn: BaseButton, point: grid.Point) -> bool:
     return (
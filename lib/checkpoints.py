@@ -0,0 +1,131 @@
+"""Wave boundary checkpoints, so that layouts sharing their early placements
+replay only the waves where they differ.
+
+Each time a wave is cleared, a headless game is snapshotted and cached, keyed by
+the scenario's map, wave file, seed and starting stats, and by the placements
+made before that wave. A run resumes from the deepest checkpoint it shares.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Final
+
+from . import scenario, snapshot
+from .tower_defense import load_waves
+
+Key = tuple[Hashable, ...]
+
+DEFAULT_MAX_BYTES: Final = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Result:
+    waves: int
+    tick: int
+    money: int
+    health: int
+    # The wave boundary the run resumed from, 0 if played from the start
+    resumed: int
+    # Ticks actually played, leaving out those a checkpoint skipped
+    played: int
+
+
+def key(scenario_: scenario.Scenario, wave: int) -> Key:
+    """The key of the checkpoint taken once `wave` waves are cleared."""
+    return (
+        scenario_.map_name,
+        scenario_.wave_name,
+        scenario_.seed,
+        scenario_.money,
+        scenario_.health,
+        wave,
+        tuple(placement for placement in scenario_.towers if placement.wave < wave),
+    )
+
+
+class CheckpointCache:
+    """Encoded snapshots by key, evicting the least recently used once they
+    take more than `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # Runs resumed from a checkpoint, and runs played from the start
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Key, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key_: Key) -> snapshot.Snapshot | None:
+        data = self._entries.get(key_)
+        if data is None:
+            return None
+        self._entries.move_to_end(key_)
+        return snapshot.decode(data)
+
+    def put(self, key_: Key, snap: snapshot.Snapshot) -> None:
+        data = snapshot.encode(snap)
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key_, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._entries[key_] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= len(old)
+            self.evictions += 1
+
+    def deepest(
+        self, scenario_: scenario.Scenario, waves: int
+    ) -> tuple[int, snapshot.Snapshot] | None:
+        """The last checkpoint within `waves` waves that the scenario shares,
+        with the waves cleared by then.
+        """
+        for wave in range(waves, 0, -1):
+            snap = self.get(key(scenario_, wave))
+            if snap is not None:
+                self.hits += 1
+                return wave, snap
+        self.misses += 1
+        return None
+
+    def report(self) -> str:
+        return (
+            f'  {len(self)} checkpoints in {self.bytes / 1024:.0f} KiB, '
+            f'{self.hits} runs resumed, {self.misses} from the start, '
+            f'{self.evictions} evicted'
+        )
+
+
+def evaluate(
+    scenario_: scenario.Scenario,
+    waves: int,
+    cache: CheckpointCache | None = None,
+) -> Result:
+    """Play a scenario's first `waves` waves, each sent once the last is cleared,
+    placing its towers for each wave before sending it.
+
+    With a cache, play resumes from the deepest checkpoint the scenario shares,
+    and a checkpoint is cached as each wave is cleared.
+    """
+    waves = min(waves, len(load_waves(scenario_.wave_name)))
+    found = cache.deepest(scenario_, waves) if cache is not None else None
+    game = scenario.new_game(scenario_)
+    start = 0
+    if found is not None:
+        start, snap = found
+        game.restore(snap)
+    played = 0
+    for wave in range(start, waves):
+        played += scenario.play(game, waves=1, scenario=scenario_)
+        if cache is not None:
+            cache.put(key(scenario_, wave + 1), game.capture())
+    game.stop()
+    return Result(waves, game.tick, game.stats.money, game.stats.health, start, played)
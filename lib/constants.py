@@ -5,6 +5,7 @@ from pathlib import Path
 class Paths(Enum):
     IMAGES = 'images'
     TEXTS = 'texts'
+    SAVES = 'saves'
 
     @classmethod
     def ROOT(cls) -> Path:
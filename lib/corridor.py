@@ -0,0 +1,180 @@
+"""Path geometry, used as a broad phase for straight-flying projectiles.
+
+Monsters only ever move along the path, so a projectile can only hit monsters
+whose distance travelled lies within the stretches of path it passes near.
+"""
+from __future__ import annotations
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator, Sequence
+
+from . import grid
+from .maps import Dimension
+from .monster import IMonster
+from .protocols import Movable
+
+Window = tuple[float, float]
+
+_STEPS = {1: (1, 0), 2: (-1, 0), 3: (0, 1), 4: (0, -1)}
+
+
+class PathCorridor:
+    def __init__(
+        self,
+        origin: grid.Loc,
+        directions: Sequence[int],
+        block_dim: Dimension,
+        map_size: Dimension,
+        monsters: list[IMonster],
+    ):
+        """Trace the path from `origin`, the position at distance 0.
+
+        directions: the direction of each path step, as in `MapGrid.path`
+        """
+        self.map_size = map_size
+        self.block_dim = block_dim
+        self._centers = _centers(origin, directions, block_dim)
+        self._steps = [_STEPS[d] for d in directions[: len(self._centers) - 1]]
+        self._monsters = monsters
+        self._by_distance: list[IMonster] = []
+        self._distances: list[float] = []
+        self._stale = True
+
+    def update(self) -> None:
+        # Monsters moved, so they are re-sorted on the next query
+        self._stale = True
+
+    def paint(self, canvas: tk.Canvas) -> None:
+        pass
+
+    def place(self, mover: Movable) -> bool:
+        """Position `mover` by its distance travelled.
+
+        Returns False, placing it on the exit, once it has reached the exit.
+        """
+        k = int(mover.distance_travelled // self.block_dim)
+        if k >= len(self._steps):
+            mover.x, mover.y = self._centers[-1]
+            return False
+        offset = mover.distance_travelled - k * self.block_dim
+        center, step = self._centers[k], self._steps[k]
+        mover.x = center.x + step[0] * offset
+        mover.y = center.y + step[1] * offset
+        return True
+
+    def in_bounds(self, x: float, y: float) -> bool:
+        return 0 <= x <= self.map_size and 0 <= y <= self.map_size
+
+    def windows(
+        self, x: float, y: float, dx: float, dy: float, steps: int
+    ) -> list[Window]:
+        """Return the path distance windows a projectile could hit monsters in.
+
+        The projectile starts at (x, y) and is tested for hits after each of its
+        `steps` moves of (dx, dy), hitting monsters within a block of it.
+        """
+        ax, ay = x + dx, y + dy
+        bx, by = x + dx * steps, y + dy * steps
+        reach = self.block_dim
+        left, right = min(ax, bx) - reach, max(ax, bx) + reach
+        top, bottom = min(ay, by) - reach, max(ay, by) + reach
+
+        windows: list[Window] = []
+        for k in range(len(self._centers) - 1):
+            (cx, cy), (ex, ey) = self._centers[k], self._centers[k + 1]
+            if (
+                max(cx, ex) < left
+                or min(cx, ex) > right
+                or max(cy, ey) < top
+                or min(cy, ey) > bottom
+            ):
+                continue
+            if _segment_distance(ax, ay, bx, by, cx, cy, ex, ey) > reach:
+                continue
+            lo, hi = k * self.block_dim, (k + 1) * self.block_dim
+            if windows and windows[-1][1] >= lo:
+                windows[-1] = (windows[-1][0], hi)
+            else:
+                windows.append((lo, hi))
+        return windows
+
+    def candidates(self, windows: Sequence[Window]) -> Iterator[IMonster]:
+        """Yield the monsters whose distance travelled lies within `windows`."""
+        if self._stale:
+            self._by_distance = sorted(
+                self._monsters, key=lambda m: m.distance_travelled
+            )
+            self._distances = [m.distance_travelled for m in self._by_distance]
+            self._stale = False
+        for lo, hi in windows:
+            start = bisect_left(self._distances, lo)
+            end = bisect_right(self._distances, hi)
+            for i in range(start, end):
+                yield self._by_distance[i]
+
+
+def _centers(
+    origin: grid.Loc, directions: Sequence[int], block_dim: Dimension
+) -> list[grid.Loc]:
+    x, y = origin
+    centers = [grid.Loc(x, y)]
+    for direction in directions:
+        step = _STEPS.get(direction)
+        if step is None:
+            break
+        x += step[0] * block_dim
+        y += step[1] * block_dim
+        centers.append(grid.Loc(x, y))
+    return centers
+
+
+def _segment_distance(
+    ax: float,
+    ay: float,
+    bx: float,
+    by: float,
+    cx: float,
+    cy: float,
+    ex: float,
+    ey: float,
+) -> float:
+    """Shortest distance between segments AB and CE."""
+    if _intersects(ax, ay, bx, by, cx, cy, ex, ey):
+        return 0.0
+    return min(
+        _point_distance(ax, ay, cx, cy, ex, ey),
+        _point_distance(bx, by, cx, cy, ex, ey),
+        _point_distance(cx, cy, ax, ay, bx, by),
+        _point_distance(ex, ey, ax, ay, bx, by),
+    )
+
+
+def _point_distance(
+    px: float, py: float, ax: float, ay: float, bx: float, by: float
+) -> float:
+    """Distance from P to segment AB."""
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else ((px - ax) * dx + (py - ay) * dy) / length
+    t = min(1.0, max(0.0, t))
+    return ((ax + t * dx - px) ** 2 + (ay + t * dy - py) ** 2) ** 0.5
+
+
+def _intersects(
+    ax: float,
+    ay: float,
+    bx: float,
+    by: float,
+    cx: float,
+    cy: float,
+    ex: float,
+    ey: float,
+) -> bool:
+    def orient(px: float, py: float, qx: float, qy: float, rx: float, ry: float):
+        return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+
+    d1 = orient(cx, cy, ex, ey, ax, ay)
+    d2 = orient(cx, cy, ex, ey, bx, by)
+    d3 = orient(ax, ay, bx, by, cx, cy)
+    d4 = orient(ax, ay, bx, by, ex, ey)
+    return d1 * d2 < 0 and d3 * d4 < 0
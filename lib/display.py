@@ -2,6 +2,7 @@ import tkinter as tk
 import itertools as it
 from typing import (
     Any,
+    Final,
     Iterable,
     NamedTuple,
 )
@@ -15,6 +16,7 @@ from . import (
     tower,
     grid,
     game,
+    telemetry,
 )
 from .buttons import (
     Button,
@@ -29,9 +31,16 @@ from .tower import (
 )
 from ._type_aliases import _Anchor
 
+_STALE: Final = object()
+
 
 class Infoboard:
-    def __init__(self, frame: tk.Frame, tower_map: ITowerMap):
+    def __init__(
+        self,
+        frame: tk.Frame,
+        tower_map: ITowerMap,
+        damage_log: telemetry.DamageLog | None = None,
+    ):
         self.canvas = tk.Canvas(
             master=frame, width=162, height=174, bg="gray", highlightthickness=0
         )
@@ -42,33 +51,56 @@ class Infoboard:
         self._btns: list[buttons.Button] = []
         self._tower_img: ImageTk.PhotoImage | None
         self.text: str | None
+        self._damage_log = damage_log
+        self._layout: object = _STALE
+        self._target_mark: int | None = None
+        self._sticky_mark: int | None = None
+        self._dps_item: int | None = None
+        self._dps = 0.0
+
+    def button_at(self, point: grid.Point) -> Button | None:
+        for btn in self._btns:
+            if btn.can_press(point):
+                return btn
+        return None
 
     def buttonsCheck(self, point: grid.Point, money: int) -> int:
         amt = 0
         displayTower = self.tower_map.displayed
-        for btn in self._btns:
-            if not btn.can_press(point):
-                continue
-
-            btn.press(self.tower_map)
-
-            if isinstance(btn, UpgradeButton):
-                assert displayTower is not None and displayTower.upgradeCost is not None
-                if money >= displayTower.upgradeCost:
-                    amt = -displayTower.upgradeCost
-                    displayTower.upgrade()
-            if isinstance(btn, SellButton):
-                assert displayTower is not None and displayTower.upgradeCost is not None
-                amt = int(0.5 * displayTower.upgradeCost)
-            self.displaySpecific()
+        btn = self.button_at(point)
+        if btn is None:
             return amt
+
+        btn.press(self.tower_map)
+
+        if isinstance(btn, UpgradeButton):
+            assert displayTower is not None and displayTower.upgradeCost is not None
+            if money >= displayTower.upgradeCost:
+                amt = -displayTower.upgradeCost
+                displayTower.upgrade()
+        if isinstance(btn, SellButton):
+            assert displayTower is not None and displayTower.upgradeCost is not None
+            amt = int(0.5 * displayTower.upgradeCost)
+        self.displaySpecific()
         return amt
 
     def displaySpecific(self):
+        """Show the displayed tower, redrawing only what changed."""
+        displayTower = self.tower_map.displayed
+        layout = None if displayTower is None else (displayTower, displayTower.level)
+        if layout != self._layout:
+            self._layout = layout
+            self._draw_specific(displayTower)
+        elif displayTower is not None:
+            self._mark_targets(displayTower)
+
+    def _draw_specific(self, displayTower: ITower | None) -> None:
         self.canvas.delete(tk.ALL)  # clear the screen
         self.canvas.create_image(0, 0, image=self.image, anchor=tk.NW)
         self._btns = []
-        displayTower = self.tower_map.displayed
+        self._dps_item = None
+        self._target_mark = None
+        self._sticky_mark = None
         if displayTower is None:
             return
 
@@ -76,6 +108,12 @@ class Infoboard:
         self.canvas.create_text(80, 75, text=displayTower.name, font=("times", 20))
         self.canvas.create_image(5, 5, image=self._tower_img, anchor=tk.NW)
 
+        if self._damage_log is not None and displayTower.telemetry_id >= 0:
+            self._dps = _dps(self._damage_log, displayTower)
+            self._dps_item = self.canvas.create_text(
+                80, 110, text=_dps_text(self._dps), font=("times", 12), fill="white"
+            )
+
         if not isinstance(displayTower, ITower):
             return None
 
@@ -83,12 +121,34 @@ class Infoboard:
 
         self._btns.extend(_gen_draw_misc_buttons(self.canvas, displayTower))
 
-        self._btns[displayTower.targetList].paint(self.canvas)
-        if displayTower.stickyTarget:
-            self._btns[4].paint(self.canvas)
+        self._target_mark = self._btns[displayTower.targetList].paint(self.canvas)
+        self._sticky_mark = self._btns[4].paint(self.canvas)
+        self._mark_targets(displayTower)
+
+    def _mark_targets(self, displayTower: ITower) -> None:
+        if self._target_mark is None or self._sticky_mark is None:
+            return
+        btn = self._btns[displayTower.targetList]
+        self.canvas.coords(self._target_mark, *btn.coord1, *btn.coord2)
+        self.canvas.itemconfigure(
+            self._sticky_mark,
+            state=tk.NORMAL if displayTower.stickyTarget else tk.HIDDEN,
+        )
+
+    def refresh_dps(self) -> None:
+        """Update the rolling DPS of the displayed tower, if it changed."""
+        displayTower = self.tower_map.displayed
+        if self._dps_item is None or self._damage_log is None or displayTower is None:
+            return
+        dps = _dps(self._damage_log, displayTower)
+        if dps != self._dps:
+            self._dps = dps
+            self.canvas.itemconfigure(self._dps_item, text=_dps_text(dps))
 
     def displayGeneric(self, selectedTower: str):
         self._btns = []
+        self._dps_item = None
+        self._layout = _STALE
         if selectedTower == "<None>":
             self.text = None
             self._tower_img = None
@@ -101,6 +161,14 @@ class Infoboard:
         self.canvas.create_image(5, 5, image=self._tower_img, anchor=tk.NW)
 
 
+def _dps(damage_log: telemetry.DamageLog, tower_: ITower) -> float:
+    return round(damage_log.dps(tower_.telemetry_id), 1)
+
+
+def _dps_text(dps: float) -> str:
+    return f'DPS: {dps:.1f}'
+
+
 def _gen_draw_info_buttons(canvas: tk.Canvas) -> Iterable[Button]:
     def _target_btns(canvas: tk.Canvas) -> Iterable[Button]:
         _c1, _c2 = (26, 30), (35, 39)
@@ -170,46 +238,56 @@ def _gen_draw_misc_buttons(canvas: tk.Canvas, tower_: ITower) -> Iterable[Button
 
 
 class Displayboard:
+    """Shows the player stats, redrawing items only when their values change."""
+
     def __init__(self, frame: tk.Frame, stats: game.Stats):
         self.canvas = tk.Canvas(
             master=frame, width=600, height=80, bg="gray", highlightthickness=0
         )
         self.canvas.grid(row=2, column=0)
-        self._healthbar = Healthbar(stats.health)
-        self._moneybar = Moneybar(stats.money)
+        self._healthbar = Healthbar(self.canvas, stats.health)
+        self._moneybar = Moneybar(self.canvas, stats.money)
         self.nextWaveButton = buttons.NextWaveButton()
+        self._wave_ready: bool | None = None
+        stats.subscribe(self._on_stats_change)
 
-    def update(self, stats: game.Stats) -> None:
-        self._healthbar.update(stats.health)
-        self._moneybar.update(stats.money)
+    def _on_stats_change(self, name: str, value: int) -> None:
+        if name == 'health':
+            self._healthbar.update(value)
+        elif name == 'money':
+            self._moneybar.update(value)
 
-    def paint(self, color: str) -> None:
-        self.canvas.delete(tk.ALL)  # clear the screen
-        self._healthbar.paint(self.canvas)
-        self._moneybar.paint(self.canvas)
-        self.nextWaveButton.paint(self.canvas, color)
+    def set_wave_ready(self, ready: bool) -> None:
+        if ready is self._wave_ready:
+            return
+        self._wave_ready = ready
+        self.nextWaveButton.recolor(self.canvas, 'blue' if ready else 'red')
 
 
 class Healthbar:
-    def __init__(self, health: int):
-        self.text = str(health)
+    def __init__(self, canvas: tk.Canvas, health: int):
+        self._canvas = canvas
+        self._item = canvas.create_text(40, 40, text=_health_text(health), fill="black")
 
     def update(self, health: int) -> None:
-        self.text = str(health)
-
-    def paint(self, canvas: tk.Canvas) -> None:
-        canvas.create_text(40, 40, text=f"Health: {self.text}", fill="black")
+        self._canvas.itemconfigure(self._item, text=_health_text(health))
 
 
 class Moneybar:
-    def __init__(self, money: int):
-        self.text = str(money)
+    def __init__(self, canvas: tk.Canvas, money: int):
+        self._canvas = canvas
+        self._item = canvas.create_text(240, 40, text=_money_text(money), fill="black")
 
     def update(self, money: int) -> None:
-        self.text = str(money)
+        self._canvas.itemconfigure(self._item, text=_money_text(money))
+
+
+def _health_text(health: int) -> str:
+    return f"Health: {health}"
+
 
-    def paint(self, canvas: tk.Canvas) -> None:
-        canvas.create_text(240, 40, text=f"Money: {self.text}", fill="black")
+def _money_text(money: int) -> str:
+    return f"Money: {money}"
 
 
 class Towerbox:
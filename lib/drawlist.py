@@ -0,0 +1,98 @@
+"""Collects a frame's canvas items, to create them all in a single Tcl call."""
+from __future__ import annotations
+import tkinter as tk
+from collections.abc import Iterable
+from typing import Any, Final
+
+from . import lod
+
+# Creates each item of a list on a canvas. Compiled once by Tcl, so the whole
+# frame crosses from Python as one list, converted without formatting any text.
+_CREATE: Final = '::drawlist_create'
+_CREATE_PROC: Final = (
+    f'proc {_CREATE} {{canvas items}} '
+    '{ foreach item $items { $canvas create {*}$item } }'
+)
+
+
+class DrawList:
+    """Stands in for a canvas while painting.
+
+    Items are queued and created together by `flush`, so none has an id to
+    return. Persistent items are created at once, returning their id, as they
+    are kept to be updated in place. Anything else flushes the queue, to keep
+    the order of drawing, then goes to the canvas.
+    """
+
+    def __init__(self, canvas: tk.Canvas):
+        self.canvas = canvas
+        # Calls made to the Tcl interpreter
+        self.calls = 0
+        self._path = str(canvas)
+        self._items: list[tuple[Any, ...]] = []
+        canvas.tk.eval(_CREATE_PROC)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getattr__(self, name: str) -> Any:
+        self.flush()
+        return getattr(self.canvas, name)
+
+    def create_image(self, *args, **options) -> int | None:
+        return self._create('image', args, options)
+
+    def create_line(self, *args, **options) -> int | None:
+        return self._create('line', args, options)
+
+    def create_oval(self, *args, **options) -> int | None:
+        return self._create('oval', args, options)
+
+    def create_polygon(self, *args, **options) -> int | None:
+        return self._create('polygon', args, options)
+
+    def create_rectangle(self, *args, **options) -> int | None:
+        return self._create('rectangle', args, options)
+
+    def create_text(self, *args, **options) -> int | None:
+        return self._create('text', args, options)
+
+    def flush(self) -> None:
+        """Create every queued item, in one call to the Tcl interpreter."""
+        if not self._items:
+            return
+        items = tuple(self._items)
+        self._items.clear()
+        self.calls += 1
+        self.canvas.tk.call(_CREATE, self._path, items)
+
+    def _create(
+        self, item_type: str, args: tuple, options: dict[str, Any]
+    ) -> int | None:
+        if lod.PERSISTENT in _tags(options.get('tags')):
+            self.flush()
+            self.calls += 1
+            return getattr(self.canvas, f'create_{item_type}')(*args, **options)
+        item: list[Any] = [item_type]
+        item.extend(_flatten(args))
+        for key, value in options.items():
+            item.append(f'-{key.rstrip("_")}')
+            item.append(value)
+        self._items.append(tuple(item))
+        return None
+
+
+def _tags(tags: Any) -> tuple[str, ...]:
+    if tags is None:
+        return ()
+    if isinstance(tags, str):
+        return (tags,)
+    return tuple(tags)
+
+
+def _flatten(args: Iterable[Any]) -> Iterable[Any]:
+    for arg in args:
+        if isinstance(arg, (tuple, list)):
+            yield from _flatten(arg)
+        else:
+            yield arg
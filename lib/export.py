@@ -0,0 +1,197 @@
+"""Offscreen export of a traced game, as PNG frames or a raw video stream.
+
+Frames are drawn from the trace's columns into a framebuffer, so no display is
+needed, and are split by frame range across worker processes. Traces do not
+record projectiles, so only the map, towers and monsters are drawn.
+"""
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Final
+
+import numpy as np
+from PIL import Image
+
+from . import framebuffer, io, maps, monster, trace, tower, units
+
+FORMATS: Final = ('png', 'raw')
+# Ranges per worker, so that a slow range holds up little else
+_RANGES_PER_WORKER: Final = 4
+# The tower columns that change what is drawn
+_LAYOUT: Final = ('type', 'gridx', 'gridy', 'level')
+
+
+@dataclass(frozen=True)
+class Export:
+    """What to render from a trace's run directory, and where.
+
+    size: the frame's width and height, or None for the map's own
+    speed: game seconds shown per second of video
+    ranges: outline every tower's range, as a selected tower's is
+    """
+
+    run_dir: Path
+    out: Path
+    format: str = 'png'
+    size: tuple[int, int] | None = None
+    fps: float = 20.0
+    speed: float = 1.0
+    ranges: bool = False
+
+
+def frame_ticks(export_: Export) -> np.ndarray:
+    """The game tick shown in each frame."""
+    recorded = [
+        trace.load(export_.run_dir, table)['tick'] for table in ('monsters', 'towers')
+    ]
+    recorded = [ticks for ticks in recorded if len(ticks)]
+    if not recorded:
+        return np.zeros(0, dtype=np.int64)
+    first = min(int(ticks[0]) for ticks in recorded)
+    last = max(int(ticks[-1]) for ticks in recorded)
+    meta = trace.load_meta(export_.run_dir)
+    ticks_per_frame = export_.speed * 1000 / meta['timestep'] / export_.fps
+    count = int((last - first) / ticks_per_frame) + 1
+    return first + (np.arange(count) * ticks_per_frame).astype(np.int64)
+
+
+def frame_size(export_: Export) -> tuple[int, int]:
+    return _renderer(export_).size
+
+
+def export(export_: Export, workers: int | None = None) -> int:
+    """Render every frame, returning how many were written.
+
+    Frames are written as ``frame_NNNNNN.png`` into the `out` directory, or as
+    consecutive rgb24 frames into the `out` file.
+    """
+    if export_.format not in FORMATS:
+        raise ValueError(f'Unknown format {export_.format!r}')
+    ticks = frame_ticks(export_)
+    renderer = _renderer(export_)
+    if export_.format == 'png':
+        export_.out.mkdir(parents=True, exist_ok=True)
+    else:
+        with open(export_.out, 'wb') as f:
+            f.truncate(len(ticks) * renderer.frame_bytes)
+    if not len(ticks):
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    count = max(1, min(len(ticks), workers * _RANGES_PER_WORKER))
+    starts = np.linspace(0, len(ticks), count + 1).astype(int)
+    jobs = [
+        (export_, int(start), ticks[start:end])
+        for start, end in zip(starts[:-1], starts[1:])
+        if start < end
+    ]
+    if workers == 1:
+        for job in jobs:
+            _render_range(*job)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for _ in pool.map(_render_range, *zip(*jobs)):
+                pass
+    return len(ticks)
+
+
+def _render_range(export_: Export, first: int, ticks: np.ndarray) -> None:
+    """Render and write the frames from index `first` on, one per tick given."""
+    renderer = _renderer(export_)
+    if export_.format == 'png':
+        for i, tick in enumerate(ticks, first):
+            image = Image.fromarray(renderer.render(int(tick)), 'RGB')
+            # Fast compression, as frames are usually encoded again into a video
+            image.save(export_.out / f'frame_{i:06d}.png', compress_level=1)
+        return
+    with open(export_.out, 'r+b') as f:
+        f.seek(first * renderer.frame_bytes)
+        for tick in ticks:
+            f.write(renderer.render(int(tick)).tobytes())
+
+
+@cache
+def _renderer(export_: Export) -> Renderer:
+    # One per worker process, keeping its caches across the ranges it renders
+    return Renderer(export_.run_dir, export_.size, export_.ranges)
+
+
+class Renderer:
+    """Draws the traced game as it was at the end of any tick."""
+
+    def __init__(
+        self,
+        run_dir: Path,
+        size: tuple[int, int] | None = None,
+        ranges: bool = False,
+    ):
+        meta = trace.load_meta(run_dir)
+        self._block_dim = meta['block_dim']
+        self._ranges = ranges
+        self._monsters = trace.load(run_dir, 'monsters')
+        self._towers = trace.load(run_dir, 'towers')
+        self._map = io.load_img(maps.img_path(meta['map'])).convert('RGB')
+        self.size = size or self._map.size
+        self.frame_bytes = self.size[0] * self.size[1] * 3
+        prefabs = {prefab.name: prefab for prefab in units.load().monsters}
+        self._prefabs = [prefabs[name] for name in meta['monster_types']]
+        defs = {unit.name: unit for unit in units.load().towers}
+        self._tower_defs = [defs[name] for name in meta['tower_types']]
+        self.frame = framebuffer.Frame(*self._map.size)
+        self._layout: bytes | None = None
+        self._base = np.asarray(self._map)
+
+    def render(self, tick: int) -> np.ndarray:
+        self.frame.clear(self._towers_at(tick))
+        self._blit_monsters(tick)
+        if self.size == self._map.size:
+            return self.frame.pixels
+        image = Image.fromarray(self.frame.pixels, 'RGB')
+        return np.asarray(image.resize(self.size, Image.Resampling.BILINEAR))
+
+    def _towers_at(self, tick: int) -> np.ndarray:
+        """The map with the towers of `tick`, composed again only when they change."""
+        rows = _rows(self._towers, tick)
+        layout = b''.join(rows[column].tobytes() for column in _LAYOUT)
+        if layout == self._layout:
+            return self._base
+        self._layout = layout
+        frame = framebuffer.Frame(*self._map.size)
+        frame.clear(np.asarray(self._map))
+        b_dim = self._block_dim
+        towers = [
+            (self._tower_defs[type_], int(level), (x + 0.5) * b_dim, (y + 0.5) * b_dim)
+            for type_, x, y, level in zip(*(rows[column] for column in _LAYOUT))
+        ]
+        for unit, level, x, y in towers:
+            frame.blit(tower.sprite(unit.type, level), x, y)
+        if self._ranges:
+            for unit, level, x, y in towers:
+                radius = unit.levels[level - 1].range * b_dim
+                frame.oval(tower.range_box(x, y, radius), 'white')
+        self._base = frame.pixels
+        return self._base
+
+    def _blit_monsters(self, tick: int) -> None:
+        rows = _rows(self._monsters, tick)
+        b_dim = self._block_dim
+        # Furthest along on top, as the game paints them
+        for i in np.argsort(rows['distance'], kind='stable'):
+            prefab = self._prefabs[rows['type'][i]]
+            x, y = float(rows['x'][i]), float(rows['y'][i])
+            back, fill = monster.health_bar(
+                x, y, prefab.axis * b_dim, int(rows['health'][i]), prefab.health
+            )
+            self.frame.rectangle(back, 'red', 'black')
+            self.frame.rectangle(fill, 'green', 'green')
+            self.frame.blit(framebuffer.sprite(prefab.sprite_path), x, y)
+
+
+def _rows(table: dict[str, np.ndarray], tick: int) -> dict[str, np.ndarray]:
+    """The rows of a table recorded at `tick`, as it is sorted by tick."""
+    ticks = table['tick']
+    start, end = np.searchsorted(ticks, (tick, tick + 1))
+    return {name: column[start:end] for name, column in table.items()}
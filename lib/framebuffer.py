@@ -0,0 +1,175 @@
+"""A software renderer: the playfield composited with numpy, shown as one image."""
+from __future__ import annotations
+import tkinter as tk
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+from PIL import Image, ImageColor, ImageTk
+
+from . import io, lod
+from .monster import IMonster, sort_distance
+
+if TYPE_CHECKING:
+    from .background import Background
+    from .tower import TowerMap
+
+Colour = tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class Sprite:
+    """An image ready to be blended: its colours premultiplied by alpha, and the
+    share of what is below that shows through, both out of 255.
+    """
+
+    premultiplied: np.ndarray
+    inverse: np.ndarray
+    opaque: bool
+
+    @property
+    def width(self) -> int:
+        return self.premultiplied.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.premultiplied.shape[0]
+
+
+@cache
+def sprite(fp: Path, rotation: int = 0) -> Sprite:
+    rgba = np.asarray(io.load_img(fp, rotation).convert('RGBA'), dtype=np.uint16)
+    alpha = rgba[..., 3:]
+    return Sprite(rgba[..., :3] * alpha, 255 - alpha, bool((alpha == 255).all()))
+
+
+@cache
+def colour(name: str) -> Colour:
+    """The RGB of a Tk colour name or hex string."""
+    return ImageColor.getrgb(name)[:3]
+
+
+class Frame:
+    """An RGB framebuffer, indexed [y, x] like an image."""
+
+    def __init__(self, width: int, height: int):
+        self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def clear(self, base: np.ndarray) -> None:
+        np.copyto(self.pixels, base)
+
+    def blit(self, sprite_: Sprite, x: float, y: float) -> None:
+        """Blend a sprite centred on (x, y), as canvas images are by default."""
+        left = round(x) - sprite_.width // 2
+        top = round(y) - sprite_.height // 2
+        clipped = self._clip(left, top, sprite_.width, sprite_.height)
+        if clipped is None:
+            return
+        target, source = clipped
+        if sprite_.opaque:
+            target[...] = sprite_.premultiplied[source] // 255
+            return
+        # At most 255 * 255, so it cannot overflow 16 bits
+        blended = sprite_.premultiplied[source] + target * sprite_.inverse[source]
+        target[...] = (blended + 127) // 255
+
+    def rectangle(self, box: lod.Box, fill: str, outline: str) -> None:
+        """Fill a box with a one pixel outline, as a canvas rectangle is drawn."""
+        height, width = self.pixels.shape[:2]
+        left, top = max(round(box[0]), 0), max(round(box[1]), 0)
+        right, bottom = min(round(box[2]) + 1, width), min(round(box[3]) + 1, height)
+        if left >= right or top >= bottom:
+            return
+        self.pixels[top:bottom, left:right] = colour(outline)
+        if fill != outline:
+            self.pixels[top + 1 : bottom - 1, left + 1 : right - 1] = colour(fill)
+
+    def oval(self, box: lod.Box, outline: str) -> None:
+        """Draw the one pixel outline of the oval in a box, left unfilled."""
+        left, top = round(box[0]), round(box[1])
+        ring = _ring(round(box[2]) - left, round(box[3]) - top)
+        clipped = self._clip(left, top, ring.shape[1], ring.shape[0])
+        if clipped is None:
+            return
+        target, source = clipped
+        target[ring[source]] = colour(outline)
+
+    def _clip(
+        self, left: int, top: int, width: int, height: int
+    ) -> tuple[np.ndarray, tuple[slice, slice]] | None:
+        """The pixels a box covers, and the part of the box within the frame."""
+        frame_height, frame_width = self.pixels.shape[:2]
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + width, frame_width), min(top + height, frame_height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        source = np.s_[y0 - top : y1 - top, x0 - left : x1 - left]
+        return self.pixels[y0:y1, x0:x1], source
+
+
+@cache
+def _ring(width: int, height: int) -> np.ndarray:
+    """A mask of the pixels within half a pixel of an oval's edge."""
+    if width <= 0 or height <= 0:
+        return np.zeros((0, 0), dtype=bool)
+    rx, ry = width / 2, height / 2
+    y, x = np.ogrid[: height + 1, : width + 1]
+    radius = np.sqrt(((x - rx) / rx) ** 2 + ((y - ry) / ry) ** 2)
+    return np.abs(radius - 1) * min(rx, ry) <= 0.5
+
+
+class Playfield:
+    """Draws the map, towers, projectiles and monsters into a `Frame`, shown on
+    the canvas as a single image updated in place.
+
+    Takes the place of the background, and of painting towers' projectiles and
+    monsters as canvas items, which cost a Tcl call each.
+    """
+
+    def __init__(
+        self,
+        background_: Background,
+        tower_map: TowerMap,
+        monsters: Sequence[IMonster],
+    ):
+        self._background = background_
+        self._tower_map = tower_map
+        self._monsters = monsters
+        # Projectiles are drawn here instead
+        tower_map.blitted = True
+        width, height = background_.composed().size
+        self.frame = Frame(width, height)
+        self._base: np.ndarray | None = None
+        self._photo: ImageTk.PhotoImage | None = None
+        tower_map.subscribe(self._changed)
+
+    def _changed(self, _) -> None:
+        self._base = None
+
+    def update(self) -> None:
+        pass
+
+    def render(self) -> np.ndarray:
+        """Draw the playfield as it is now, returning the frame's pixels."""
+        if self._base is None:
+            self._base = np.asarray(self._background.composed().convert('RGB'))
+        self.frame.clear(self._base)
+        self._tower_map.blit(self.frame)
+        for monster_ in sort_distance(self._monsters):
+            monster_.blit(self.frame)
+        return self.frame.pixels
+
+    def paint(self, canvas: tk.Canvas) -> None:
+        image = Image.fromarray(self.render(), 'RGB')
+        if self._photo is not None:
+            self._photo.paste(image)
+            return
+        self._photo = ImageTk.PhotoImage(image)
+        item = canvas.create_image(
+            0, 0, image=self._photo, anchor=tk.NW, tags=lod.PERSISTENT
+        )
+        # Below the other persistent items: the heatmap, selection and cursor
+        canvas.tag_lower(item)
@@ -1,8 +1,11 @@
+import gc
+import time
 import tkinter as tk
-from collections.abc import Iterable
-from dataclasses import dataclass
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Optional
+from typing import Any, Optional, cast
+from . import drawlist, lod, metrics, startup
 from .protocols import GameObject
 
 
@@ -12,20 +15,59 @@ class GameState(Enum):
     SPAWNING = auto()
 
 
+StatsListener = Callable[[str, int], None]
+
+
 @dataclass
 class Stats:
+    """Player stats, notifying subscribers as `listener(name, value)` on change."""
+
     money: int
     health: int
+    _listeners: list[StatsListener] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+
+    def subscribe(self, listener: StatsListener) -> None:
+        self._listeners.append(listener)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        old = self.__dict__.get(name, value)
+        super().__setattr__(name, value)
+        if old != value and '_listeners' in self.__dict__:
+            for listener in self._listeners:
+                listener(name, value)
 
 
 class Game:
-    def __init__(self, title: str, width: int, height: int, timestep: int = 50):
-        self.root = tk.Tk()
-        self.root.title(title)
+    def __init__(
+        self,
+        title: str,
+        width: int,
+        height: int,
+        timestep: int = 50,
+        headless: bool = False,
+    ):
+        """Create the game window.
+
+        headless: create no window, so the game can only be advanced with `step`
+        """
+        self.headless = headless
         self._running = False
-        self.root.protocol("WM_DELETE_WINDOW", self._end)
         self._timer_id: Optional[str] = None
         self._timestep = timestep
+        self.tick = 0
+        self.metrics = metrics.Metrics()
+        self.quality = lod.QualityController(timestep / 1000)
+        self._gc_frozen = False
+        self.objects: list[GameObject] = []
+        self._first_frame_hooks: list[Callable[[], Any]] = []
+        if headless:
+            return
+
+        self.root = tk.Tk()
+        self.root.title(title)
+        self.root.protocol("WM_DELETE_WINDOW", self._end)
         self.frame = tk.Frame(master=self.root)
         self.frame.grid(row=0, column=0)
 
@@ -39,8 +81,7 @@ class Game:
         self.canvas.grid(
             row=0, column=0, rowspan=2, columnspan=1
         )  # makes the window called "canvas" complete
-
-        self.objects: list[GameObject] = []
+        self.draw = drawlist.DrawList(self.canvas)
 
     def _add_objects(self, objs: Iterable[GameObject]) -> None:
         self.objects.extend(objs)
@@ -48,20 +89,68 @@ class Game:
     def _remove_object(self, obj: GameObject) -> None:
         self.objects.remove(obj)
 
+    def after_first_frame(self, callback: Callable[[], Any]) -> None:
+        """Call `callback` once the first frame has been drawn."""
+        self._first_frame_hooks.append(callback)
+
     def run(self) -> None:
         self._running = True
-        self._run()
+        with startup.phase('first frame'):
+            self._run()
+        for hook in self._first_frame_hooks:
+            # Idle callbacks run after Tk has redrawn the canvas
+            self.root.after_idle(hook)
         self.root.mainloop()
 
+    def stop(self) -> None:
+        self._end()
+
+    def freeze_gc(self) -> None:
+        """Move everything alive into the permanent generation, then collect
+        garbage only between frames rather than whenever allocations trigger it.
+        """
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self._gc_frozen = True
+
+    def step(self, ticks: int = 1) -> None:
+        """Advance the game by `ticks` ticks, without painting."""
+        for _ in range(ticks):
+            self.tick += 1
+            self._update()
+            if self.headless:
+                self._between_frames()
+
     def _run(self) -> None:
-        self._update()
-        self._paint()
+        start = time.perf_counter()
+        self.step()
+        with self.metrics.measure('paint'):
+            self._paint()
+            self.draw.flush()
+            self.canvas.tag_raise(lod.PERSISTENT)
+        latency = self.metrics.latency
+        if latency is not None and latency.pending:
+            # Idle callbacks run after Tk has redrawn the canvas
+            self.root.after_idle(latency.shown)
+        self.quality.observe(time.perf_counter() - start)
+        self._between_frames()
 
         if self._running:
             self._timer_id = self.root.after(self._timestep, self._run)
 
+    def _between_frames(self) -> None:
+        if self._gc_frozen:
+            _collect()
+
     def _end(self) -> None:
         self._running = False
+        if self._gc_frozen:
+            gc.unfreeze()
+            gc.enable()
+            self._gc_frozen = False
+        if self.headless:
+            return
         if self._timer_id is not None:
             self.root.after_cancel(self._timer_id)
         self.root.destroy()
@@ -69,10 +158,30 @@ class Game:
     def _update(self) -> None:
         """Updates the game."""
         for obj in self.objects:
-            obj.update()
+            with self.metrics.measure(type(obj).__name__):
+                obj.update()
+
+    @property
+    def painter(self) -> tk.Canvas:
+        """The canvas to paint on, with item creation batched until the frame ends."""
+        return cast(tk.Canvas, self.draw)
 
     def _paint(self) -> None:
         """Paints the game."""
-        self.canvas.delete(tk.ALL)  # clear the screen
+        # clear the screen, except for items that are updated in place
+        self.canvas.delete(f'!{lod.PERSISTENT}')
+        painter = self.painter
         for obj in self.objects:
-            obj.paint(self.canvas)
+            obj.paint(painter)
+
+
+def _collect() -> None:
+    """Run the collections that the disabled automatic collector is due."""
+    counts, thresholds = gc.get_count(), gc.get_threshold()
+    generation = -1
+    for gen, (count, threshold) in enumerate(zip(counts, thresholds)):
+        if not threshold or count <= threshold:
+            break
+        generation = gen
+    if generation >= 0:
+        gc.collect(generation)
@@ -1,13 +1,17 @@
 from collections.abc import (
     Generator,
+    Hashable,
+    Iterator,
     Sequence,
 )
 from typing import (
+    Generic,
     NamedTuple,
     TypeVar,
 )
 
 T = TypeVar('T')
+H = TypeVar('H', bound=Hashable)
 Grid = Sequence[Sequence[T]]
 
 
@@ -39,3 +43,57 @@ def grid_iter(grid: Grid[T]) -> Generator[T, None, None]:
     for row in grid:
         for item in row:
             yield item
+
+
+class Buckets(Generic[H]):
+    """Items over rectangles of cells, bucketed by squares of `size` cells.
+
+    Finding the items near an area only visits the buckets it overlaps.
+    """
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self._buckets: dict[Point, dict[H, None]] = {}
+        self._keys: dict[H, tuple[Point, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, item: H, left: int, top: int, right: int, bottom: int) -> None:
+        """Add `item` over the cells from (left, top) to (right, bottom) inclusive."""
+        self.discard(item)
+        keys = tuple(self._overlapping(left, top, right, bottom))
+        self._keys[item] = keys
+        for key in keys:
+            self._buckets.setdefault(key, {})[item] = None
+
+    def discard(self, item: H) -> None:
+        for key in self._keys.pop(item, ()):
+            bucket = self._buckets[key]
+            del bucket[item]
+            if not bucket:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._keys.clear()
+
+    def near(self, left: int, top: int, right: int, bottom: int) -> Iterator[H]:
+        """Yield every item in a bucket the area overlaps, once each.
+
+        A superset of the items over the area, for the caller to filter.
+        """
+        seen: set[H] = set()
+        for key in self._overlapping(left, top, right, bottom):
+            for item in self._buckets.get(key, ()):
+                if item not in seen:
+                    seen.add(item)
+                    yield item
+
+    def _overlapping(
+        self, left: int, top: int, right: int, bottom: int
+    ) -> Iterator[Point]:
+        size = self.size
+        for bx in range(left // size, right // size + 1):
+            for by in range(top // size, bottom // size + 1):
+                yield Point(bx, by)
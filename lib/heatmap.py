@@ -0,0 +1,122 @@
+"""How much of the path a tower would cover from each buildable cell."""
+from __future__ import annotations
+import tkinter as tk
+
+import numpy as np
+from PIL import Image, ImageTk
+
+from . import display, lod, maps, tower
+
+# Overlay colours for the least and most covering cells, and their opacity
+_LOW: tuple[int, int, int] = (40, 80, 255)
+_HIGH: tuple[int, int, int] = (255, 40, 40)
+_ALPHA = 110
+
+
+class Coverage:
+    """The path cells within reach of each cell of a map, by tower type and level.
+
+    Each reach is convolved once per map; towers placed later only mask cells out.
+    """
+
+    def __init__(self, grid_: maps.MapGrid):
+        self._grid = grid_
+        self._path = (grid_.path_distance >= 0).astype(np.float64)
+        self._by_reach: dict[float, np.ndarray] = {}
+
+    def __call__(self, tower_: str, level: int = 1) -> np.ndarray:
+        """Path cells covered from each cell, indexed [x, y]. Not masked."""
+        reach = tower.reach(tower_, level)
+        counts = self._by_reach.get(reach)
+        if counts is None:
+            counts = self._by_reach[reach] = _convolve(self._path, disk(reach))
+        return counts
+
+    def buildable(self, tower_: str, level: int = 1) -> np.ndarray:
+        """As calling it, but 0 wherever a tower cannot be built."""
+        return np.where(self._grid.buildable, self(tower_, level), 0)
+
+
+def disk(reach: float) -> np.ndarray:
+    """The cells whose centres are within `reach` blocks of the middle cell."""
+    r = int(reach)
+    offsets = np.arange(-r, r + 1)
+    return (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= reach**2).astype(
+        np.float64
+    )
+
+
+def _convolve(mask: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Convolve in the frequency domain, cropped to the shape of `mask`."""
+    shape = tuple(m + k - 1 for m, k in zip(mask.shape, kernel.shape))
+    full = np.fft.irfft2(
+        np.fft.rfft2(mask, shape) * np.fft.rfft2(kernel, shape), shape
+    )
+    rx, ry = (k // 2 for k in kernel.shape)
+    cropped = full[rx : rx + mask.shape[0], ry : ry + mask.shape[1]]
+    return np.rint(cropped).astype(np.int32)
+
+
+def render(counts: np.ndarray, block_dim: int) -> Image.Image:
+    """Colour each cell with cover from blue to red, scaled to `block_dim`."""
+    most = counts.max()
+    share = counts.T / most if most else np.zeros(counts.T.shape)
+    colour = np.empty((*share.shape, 4), dtype=np.uint8)
+    for channel, (low, high) in enumerate(zip(_LOW, _HIGH)):
+        colour[..., channel] = low + (high - low) * share
+    colour[..., 3] = np.where(counts.T > 0, _ALPHA, 0)
+    image = Image.fromarray(colour, 'RGBA')
+    return image.resize(
+        (image.width * block_dim, image.height * block_dim), Image.Resampling.NEAREST
+    )
+
+
+class Heatmap:
+    """An overlay of `Coverage` for the tower selected in the towerbox.
+
+    Hidden until toggled on. Redrawn only when the selection or a tower changes.
+    """
+
+    def __init__(
+        self,
+        grid_: maps.MapGrid,
+        towerbox: display.Towerbox,
+        tower_map: tower.ITowerMap,
+    ):
+        self.visible = False
+        self.coverage = Coverage(grid_)
+        self._block_dim = grid_.block_dim
+        self._towerbox = towerbox
+        self._item: int | None = None
+        self._photo: ImageTk.PhotoImage | None = None
+        self._shown: str | None = None
+        self._stale = False
+        tower_map.subscribe(self._changed)
+
+    def toggle(self) -> None:
+        self.visible = not self.visible
+
+    def _changed(self, _) -> None:
+        self._stale = True
+
+    def update(self) -> None:
+        pass
+
+    def paint(self, canvas: tk.Canvas) -> None:
+        if self._item is None:
+            self._item = canvas.create_image(
+                0, 0, anchor=tk.NW, state=tk.HIDDEN, tags=lod.PERSISTENT
+            )
+        selected = None
+        if self.visible and self._towerbox.is_selected:
+            selected = self._towerbox.selected
+        if selected == self._shown and not (selected and self._stale):
+            return
+        self._shown = selected
+        if selected is None:
+            canvas.itemconfigure(self._item, state=tk.HIDDEN)
+            return
+        self._stale = False
+        counts = self.coverage.buildable(selected)
+        self._photo = ImageTk.PhotoImage(render(counts, self._block_dim))
+        canvas.itemconfigure(self._item, image=self._photo, state=tk.NORMAL)
@@ -2,17 +2,48 @@ from pathlib import Path
 
 from PIL import Image, ImageTk
 
-from . import constants as C
+from . import (
+    atlas,
+    constants as C,
+)
 
 
-def load_img_tk(fp: Path) -> ImageTk.PhotoImage:
-    return ImageTk.PhotoImage(load_img(fp))
+# Images decoded ahead of their first load, by path and rotation
+_decoded: dict[tuple[Path, int], Image.Image] = {}
 
 
-def load_img(fp: Path) -> Image.Image:
-    return Image.open(C.Paths.IMAGES.join(fp))
+def load_img_tk(fp: Path, rotation: int = 0) -> ImageTk.PhotoImage:
+    return ImageTk.PhotoImage(load_img(fp, rotation))
 
 
-def load_map_text(fp: Path) -> str:
+def load_img(fp: Path, rotation: int = 0) -> Image.Image:
+    """Load an image, from the sprite atlas when it has been built."""
+    img = _decoded.get((fp, rotation))
+    if img is not None:
+        return img
+    sheet = atlas.load()
+    if sheet is not None:
+        img = sheet.get(fp, rotation)
+        if img is not None:
+            return img
+    img = Image.open(C.Paths.IMAGES.join(fp))
+    return img.rotate(rotation) if rotation else img
+
+
+def decode(fp: Path, rotation: int = 0) -> None:
+    """Read and decode an image now, so that loading it does neither.
+
+    Safe to call from any thread.
+    """
+    img = load_img(fp, rotation)
+    img.load()
+    _decoded[(fp, rotation)] = img
+
+
+def load_map_data(fp: Path) -> bytes:
+    return C.Paths.TEXTS.join(fp).read_bytes()
+
+
+def load_text(fp: Path) -> str:
     with open(C.Paths.TEXTS.join(fp)) as f:
         return f.read()
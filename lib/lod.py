@@ -0,0 +1,77 @@
+"""Adaptive level of detail, driven by the measured frame time."""
+from __future__ import annotations
+import tkinter as tk
+from collections.abc import Iterable
+from enum import IntEnum
+from typing import Final
+
+# Canvas items with this tag survive the per-frame clear, to be updated in place
+PERSISTENT: Final = 'persistent'
+# Projectiles with the same sprite within this many pixels are drawn once
+MERGE_DISTANCE: Final = 6
+
+Box = tuple[float, float, float, float]
+
+
+class Quality(IntEnum):
+    FULL = 0
+    # No full health bars, batched health bars, throttled cursor updates
+    REDUCED = 1
+    # Also merges overlapping projectiles and drops the health bar backgrounds
+    MINIMAL = 2
+
+
+class QualityController:
+    """Lowers the quality when frames near their budget, and raises it again
+    once frames have been comfortably within budget for a while.
+    """
+
+    def __init__(
+        self,
+        budget: float,
+        high: float = 0.8,
+        low: float = 0.4,
+        patience: int = 10,
+        smoothing: float = 0.2,
+    ):
+        """budget: the seconds a frame may take"""
+        self.quality = Quality.FULL
+        self.frame_time = 0.0
+        self._high = budget * high
+        self._low = budget * low
+        self._patience = patience
+        self._smoothing = smoothing
+        self._over = 0
+        self._under = 0
+
+    def observe(self, elapsed: float) -> None:
+        """Record that the last frame took `elapsed` seconds."""
+        self.frame_time += (elapsed - self.frame_time) * self._smoothing
+        if self.frame_time > self._high:
+            self._over, self._under = self._over + 1, 0
+        elif self.frame_time < self._low:
+            self._over, self._under = 0, self._under + 1
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self._patience and self.quality < Quality.MINIMAL:
+            self._set(Quality(self.quality + 1))
+        # Slower to recover than to degrade, so it does not flip back and forth
+        elif self._under >= 4 * self._patience and self.quality > Quality.FULL:
+            self._set(Quality(self.quality - 1))
+
+    def due(self, tick: int) -> bool:
+        """Whether throttled items should be redrawn on `tick`."""
+        return tick % (1 << self.quality) == 0
+
+    def _set(self, quality: Quality) -> None:
+        self.quality = quality
+        self._over = self._under = 0
+
+
+def paint_boxes(canvas: tk.Canvas, boxes: Iterable[Box], fill: str) -> None:
+    """Fill every box, each with its own item so that overlapping boxes stay
+    filled. Painted on a draw list, they still reach Tcl in one call.
+    """
+    for box in boxes:
+        canvas.create_rectangle(*box, fill=fill, outline='')
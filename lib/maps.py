@@ -1,10 +1,12 @@
+from __future__ import annotations
 from pathlib import Path
-import tkinter as tk
 from collections.abc import (
     Sequence,
 )
-from typing import NewType
+from functools import cache, cached_property
+from typing import TYPE_CHECKING, Final, NewType, overload
 
+import numpy as np
 from PIL import Image
 
 from . import (
@@ -13,22 +15,165 @@ from . import (
     io,
     grid,
 )
-from .block import Block
+from .block import Block, BlockType
 from .grid import Grid
 
-Dimension = NewType('Dimension', int)
-
+if TYPE_CHECKING:
+    from .tower import ITowerMap
 
-class Map:
-    def __init__(self, name: str):
-        self.name = name
-        self._image = io.load_img_tk(img_path(name))
+Dimension = NewType('Dimension', int)
 
-    def update(self) -> None:
-        pass
+# Values of the block type array
+EMPTY: Final = tuple(BlockType).index(BlockType.NORMAL)
+PATH: Final = tuple(BlockType).index(BlockType.PATH)
+WATER: Final = tuple(BlockType).index(BlockType.WATER)
+# Direction of each step along the path, as in `MapGrid.path`; END follows the last
+RIGHT, LEFT, DOWN, UP, END = 1, 2, 3, 4, 5
+_STEPS: Final = ((RIGHT, 1, 0), (LEFT, -1, 0), (DOWN, 0, 1), (UP, 0, -1))
+_OPPOSITE: Final = {RIGHT: LEFT, LEFT: RIGHT, DOWN: UP, UP: DOWN}
+# Cached layers that games on the same map share
+_SHARED: Final = ('path', 'path_distance')
+
+
+class MapGrid(Sequence[Sequence[Block]]):
+    """A map's block types as a `uint8` array indexed [x, y], with derived layers.
+
+    Indexing as ``grid[x][y]`` creates a `Block` view of the cell on demand.
+    """
+
+    def __init__(self, types: np.ndarray, block_dim: Dimension):
+        self.types = types
+        self.block_dim = block_dim
+        self.dim = types.shape[0]
+        self.occupied = np.zeros(types.shape, dtype=bool)
+        self.buildable = types == EMPTY
+
+    def __len__(self) -> int:
+        return self.dim
+
+    def copy(self) -> MapGrid:
+        """A grid of the same map without towers, sharing its read-only layers."""
+        grid_ = MapGrid(self.types, self.block_dim)
+        # Derived from the block types alone, so they are computed once for all
+        for layer in _SHARED:
+            grid_.__dict__[layer] = getattr(self, layer)
+        return grid_
+
+    @overload
+    def __getitem__(self, x: int) -> _Column:
+        ...
+
+    @overload
+    def __getitem__(self, x: slice) -> Sequence[_Column]:
+        ...
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [_Column(self, i) for i in range(self.dim)[x]]
+        if not -self.dim <= x < self.dim:
+            raise IndexError(x)
+        return _Column(self, x % self.dim)
+
+    def block(self, x: int, y: int) -> Block:
+        b_dim = self.block_dim
+        return block.factory(
+            x * b_dim + b_dim / 2,
+            y * b_dim + b_dim / 2,
+            int(self.types[x, y]),
+            x,
+            y,
+        )
 
-    def paint(self, canvas: tk.Canvas) -> None:
-        canvas.create_image(0, 0, image=self._image, anchor=tk.NW)
+    def is_empty(self, x: int, y: int) -> bool:
+        return bool(self.types[x, y] == EMPTY)
+
+    def is_path(self, x: int, y: int) -> bool:
+        return bool(self.types[x, y] == PATH)
+
+    def can_build(self, x: int, y: int) -> bool:
+        """Whether the cell is empty and has no tower on it."""
+        return bool(self.buildable[x, y])
+
+    def track(self, tower_map: ITowerMap) -> None:
+        """Keep the occupied and buildable layers in step with `tower_map`."""
+
+        def changed(p: grid.Point) -> None:
+            self.occupied[p] = p in tower_map
+            self.buildable[p] = self.types[p] == EMPTY and not self.occupied[p]
+
+        for p in tower_map:
+            changed(p)
+        tower_map.subscribe(changed)
+
+    def spawn(self) -> grid.Point:
+        """The first path cell along the top edge, else along the left edge."""
+        top = np.flatnonzero(self.types[:, 0] == PATH)
+        if top.size:
+            return grid.Point(int(top[0]), 0)
+        left = np.flatnonzero(self.types[0, :] == PATH)
+        if left.size:
+            return grid.Point(0, int(left[0]))
+        raise ValueError('Some invalid config of blocks')
+
+    @cached_property
+    def path(self) -> tuple[Sequence[grid.Point], Sequence[int]]:
+        """Trace the path from the spawn, returning its cells and directions.
+
+        Each step goes right, left, down or up, in that order of preference,
+        but never straight back. The directions end with `END`.
+        """
+        x, y = self.spawn()
+        cells = [grid.Point(x, y)]
+        directions: list[int] = []
+        previous = None
+        while True:
+            for direction, dx, dy in _STEPS:
+                nx, ny = x + dx, y + dy
+                if (
+                    _OPPOSITE[direction] != previous
+                    and 0 <= nx < self.dim
+                    and 0 <= ny < self.dim
+                    and self.types[nx, ny] == PATH
+                ):
+                    break
+            else:
+                directions.append(END)
+                return cells, directions
+            if len(cells) > self.types.size:
+                raise ValueError('The path loops back on itself')
+            x, y, previous = nx, ny, direction
+            directions.append(direction)
+            cells.append(grid.Point(x, y))
+
+    @cached_property
+    def path_distance(self) -> np.ndarray:
+        """Blocks along the path from the spawn to each path cell, else -1."""
+        distance = np.full(self.types.shape, -1, dtype=np.int32)
+        cells, _ = self.path
+        xs, ys = _coords(cells)
+        distance[xs, ys] = np.arange(len(cells), dtype=np.int32)
+        return distance
+
+
+class _Column(Sequence[Block]):
+    def __init__(self, grid_: MapGrid, x: int):
+        self._grid = grid_
+        self._x = x
+
+    def __len__(self) -> int:
+        return self._grid.dim
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self._grid.block(self._x, i) for i in range(self._grid.dim)[y]]
+        if not -self._grid.dim <= y < self._grid.dim:
+            raise IndexError(y)
+        return self._grid.block(self._x, y % self._grid.dim)
+
+
+def _coords(cells: Sequence[grid.Point]) -> tuple[np.ndarray, np.ndarray]:
+    points = np.array(cells, dtype=np.intp).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
 
 
 def size(grid_dim: Dimension, block_dim: Dimension) -> Dimension:
@@ -39,29 +184,34 @@ def img_path(map_name: str) -> Path:
     return C.Paths.IMAGES.join('map', f'{map_name}.png')
 
 
-def load_template(map_name: str) -> Sequence[int]:
-    fp = Path(f'map/{map_name}.txt')
-    grid_vals = tuple(map(int, io.load_map_text(fp).split()))
-    return grid_vals
-
-
-def make_grid(map_name: str, block_dim: Dimension, grid_dim: Dimension) -> Grid[Block]:
-    grid_vals = load_template(map_name)
-
-    def make_row(x: int) -> Sequence[Block]:
-        return [make_block(x, y) for y in range(grid_dim)]
-
-    def make_block(x: int, y: int) -> Block:
-        block_num = grid_vals[grid_dim * y + x]
-        return block.factory(
-            x * block_dim + block_dim / 2,
-            y * block_dim + block_dim / 2,
-            block_num,
-            x,
-            y,
-        )
-
-    return [make_row(x) for x in range(grid_dim)]
+def load_template(map_name: str) -> np.ndarray:
+    """Return the map's block types, in rows of y."""
+    data = np.frombuffer(io.load_map_data(Path(f'map/{map_name}.txt')), np.uint8)
+    digits = (data >= ord('0')) & (data <= ord('9'))
+    # Block types are single digits, so parse the bytes without splitting them
+    starts = digits & ~np.concatenate(([False], digits[:-1]))
+    if np.count_nonzero(starts) == np.count_nonzero(digits):
+        return data[digits] - ord('0')
+    return np.array([int(v) for v in data.tobytes().split()], dtype=np.uint8)
+
+
+def make_grid(map_name: str, block_dim: Dimension, grid_dim: Dimension) -> MapGrid:
+    """A new grid of the map, sharing its read-only layers with every other."""
+    return _shared_grid(map_name, block_dim, grid_dim).copy()
+
+
+@cache
+def _shared_grid(map_name: str, block_dim: Dimension, grid_dim: Dimension) -> MapGrid:
+    types = load_template(map_name)[: grid_dim * grid_dim]
+    grid_ = MapGrid(
+        np.ascontiguousarray(types.reshape(grid_dim, grid_dim).T), block_dim
+    )
+    grid_.types.flags.writeable = False
+    for layer in _SHARED:
+        value = getattr(grid_, layer)
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return grid_
 
 
 def create_map(
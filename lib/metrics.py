@@ -0,0 +1,200 @@
+"""Runtime measurements of the engine, each off until enabled."""
+from __future__ import annotations
+import sys
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Final
+
+_OFF: AbstractContextManager[None] = nullcontext()
+# Upper bounds of the latency histogram buckets in seconds, from 1 ms to about 1 s
+LATENCY_BUCKETS: Final = tuple(2**i / 1000 for i in range(11))
+
+
+@dataclass
+class Usage:
+    """Allocations of one subsystem, summed over the ticks it was measured."""
+
+    ticks: int = 0
+    # Bytes allocated: the traced memory's peak above where the tick started
+    allocated: int = 0
+    retained: int = 0
+    blocks: int = 0
+    max_allocated: int = 0
+
+    @property
+    def allocated_per_tick(self) -> float:
+        return self.allocated / self.ticks if self.ticks else 0.0
+
+    @property
+    def blocks_per_tick(self) -> float:
+        return self.blocks / self.ticks if self.ticks else 0.0
+
+
+class Allocations:
+    """Per-tick allocations of each subsystem, traced with `tracemalloc`.
+
+    Measurements must not be nested, as each resets the traced peak.
+    """
+
+    def __init__(self):
+        self.usage: dict[str, Usage] = {}
+        self._started = False
+        # What measuring an empty block costs, subtracted from each measurement
+        self._overhead = (0, 0, 0)
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        for _ in range(3):
+            with self.measure(''):
+                pass
+        empty = self.usage.pop('')
+        self._overhead = (
+            empty.max_allocated,
+            empty.retained // empty.ticks,
+            empty.blocks // empty.ticks,
+        )
+
+    def stop(self) -> None:
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def reset(self) -> None:
+        self.usage.clear()
+
+    @contextmanager
+    def measure(self, subsystem: str) -> Iterator[None]:
+        blocks = sys.getallocatedblocks()
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        yield
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks() - blocks
+        allocated, retained, overhead_blocks = self._overhead
+        allocated = max(peak - start - allocated, 0)
+        usage = self.usage.get(subsystem)
+        if usage is None:
+            usage = self.usage[subsystem] = Usage()
+        usage.ticks += 1
+        usage.allocated += allocated
+        usage.retained += current - start - retained
+        usage.blocks += blocks - overhead_blocks
+        usage.max_allocated = max(usage.max_allocated, allocated)
+
+    def report(self) -> str:
+        header = f'{"subsystem":<16} {"B/tick":>10} {"max B":>10} {"blocks/tick":>12}'
+        lines = [f'  {header}']
+        for name, usage in sorted(self.usage.items()):
+            lines.append(
+                f'  {name:<16} {usage.allocated_per_tick:10.0f} '
+                f'{usage.max_allocated:10d} {usage.blocks_per_tick:12.1f}'
+            )
+        return '\n'.join(lines)
+
+
+@dataclass
+class Histogram:
+    """Latencies counted in `LATENCY_BUCKETS`, with a last bucket for any longer."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """The upper bound of the bucket holding the `q` quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Latency:
+    """Input to photon latency, by the effect an input had.
+
+    Each input is timed from the arrival of its Tk event until the paint that
+    first shows its effect has been drawn.
+    """
+
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self._pending: list[tuple[str, float]] = []
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending)
+
+    def consumed(self, effect: str, received: float) -> None:
+        """An input received at `received` (a `perf_counter` time) had `effect`."""
+        self._pending.append((effect, received))
+
+    def shown(self) -> None:
+        """The effects of every input consumed since the last call are drawn."""
+        now = time.perf_counter()
+        for effect, received in self._pending:
+            histogram = self.histograms.get(effect)
+            if histogram is None:
+                histogram = self.histograms[effect] = Histogram()
+            histogram.add(now - received)
+        self._pending.clear()
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self._pending.clear()
+
+    def report(self) -> str:
+        bounds = ' '.join(f'{b * 1000:>5.0f}' for b in LATENCY_BUCKETS)
+        header = f'{"effect":<16} {"n":>6} {"p50 ms":>7} {"p95 ms":>7} {"max ms":>7}'
+        lines = [f'  {header}   {bounds}  more']
+        for name, hist in sorted(self.histograms.items()):
+            counts = ' '.join(f'{c:>5d}' for c in hist.counts)
+            lines.append(
+                f'  {name:<16} {hist.count:6d} {hist.quantile(0.5) * 1000:7.1f} '
+                f'{hist.quantile(0.95) * 1000:7.1f} {hist.max * 1000:7.1f}   {counts}'
+            )
+        return '\n'.join(lines)
+
+
+class Metrics:
+    def __init__(self):
+        self.allocations: Allocations | None = None
+        self.latency: Latency | None = None
+
+    def track_allocations(self) -> Allocations:
+        if self.allocations is None:
+            self.allocations = Allocations()
+            self.allocations.start()
+        return self.allocations
+
+    def track_latency(self) -> Latency:
+        if self.latency is None:
+            self.latency = Latency()
+        return self.latency
+
+    def consumed(self, effect: str, received: float) -> None:
+        """Time an input with `effect` until it is shown, if latency is tracked."""
+        if self.latency is not None:
+            self.latency.consumed(effect, received)
+
+    def measure(self, subsystem: str) -> AbstractContextManager[None]:
+        """Measure the allocations of `subsystem` within the block, if tracked."""
+        if self.allocations is None:
+            return _OFF
+        return self.allocations.measure(subsystem)
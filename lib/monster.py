@@ -2,20 +2,30 @@ from __future__ import annotations
 from collections.abc import (
     Sequence,
 )
+from dataclasses import dataclass
+from functools import cache
+from operator import attrgetter
 from pathlib import Path
 from typing import (
+    TYPE_CHECKING,
     Protocol,
     runtime_checkable,
 )
 
+import tkinter as tk
 from PIL import ImageTk
 
 from . import io
+from .lod import Box
+from .prefetch import Prefetcher
 from .protocols import (
     Movable,
     GameObject,
 )
 
+if TYPE_CHECKING:
+    from .framebuffer import Frame
+
 
 @runtime_checkable
 class IMonster(GameObject, Movable, Protocol):
@@ -26,29 +36,94 @@ class IMonster(GameObject, Movable, Protocol):
     got_through: bool
     damage: int
     children: list[IMonster]
+    # Bumped each time the monster is recycled, so stale references can tell
+    generation: int
+    # Unique across recycling, unlike the object's id
+    uid: int
+
+    def paint_sprite(self, canvas: tk.Canvas) -> None:
+        ...
+
+    def blit(self, frame: Frame) -> None:
+        """Draw the monster and its health bar into a framebuffer."""
+
+    def health_bar(self) -> tuple[Box, Box] | None:
+        """Return the health bar's background and fill, or None at full health."""
+
+
+@dataclass(frozen=True)
+class Prefab:
+    """Stats shared by every monster of a type, compiled by `units`.
+
+    speed, movement and axis are in blocks.
+    """
+
+    name: str
+    sprite: str
+    health: int
+    value: int
+    speed: float
+    movement: float
+    axis: float
+    # The type id and number of monsters it splits into when killed
+    spawns: int | None = None
+    spawn_count: int = 0
 
+    @property
+    def image(self) -> ImageTk.PhotoImage:
+        return _load_img(self.sprite)
 
-def gen_list(monsters: list[IMonster]) -> list[list[IMonster]]:
+    @property
+    def sprite_path(self) -> Path:
+        return _img_path(self.sprite)
 
-    monstersByHealth = sorted(monsters, key=lambda x: x.health, reverse=True)
-    monstersByHealthReversed = sorted(monsters, key=lambda x: x.health, reverse=False)
-    return [
-        monstersByHealth,
-        monstersByHealthReversed,
-        sort_distance(monsters),
-        sort_distance(monsters, reverse=True),
-    ]
+
+_health = attrgetter('health')
+_distance = attrgetter('distance_travelled')
+
+
+def target_order(monsters: Sequence[IMonster], target_list: int) -> list[IMonster]:
+    """Sort monsters for a tower's target list.
+
+    The lists are: most health first, least health first, least distance
+    travelled first and most distance travelled first.
+    """
+    if target_list < 2:
+        return sorted(monsters, key=_health, reverse=target_list == 0)
+    return sort_distance(monsters, reverse=target_list == 3)
 
 
 def sort_distance(
     monsters: Sequence[IMonster], reverse: bool = False
 ) -> list[IMonster]:
-    return sorted(monsters, key=lambda x: x.distance_travelled, reverse=reverse)
+    return sorted(monsters, key=_distance, reverse=reverse)
+
+
+def prefetch(prefetcher: Prefetcher, prefab: Prefab) -> None:
+    prefetcher.request(_img_path(prefab.sprite), lambda: prefab.image)
+
+
+@cache
+def _load_img(monster_type: str) -> ImageTk.PhotoImage:
+    return io.load_img_tk(_img_path(monster_type))
+
+
+def _img_path(monster_type: str) -> Path:
+    return Path(f'monster/{monster_type}.png')
 
 
-def load_img(monster: IMonster) -> ImageTk.PhotoImage:
-    img_fp = Path(f'monster/{monster.__class__.__name__}.png')
-    return io.load_img_tk(img_fp)
+def health_bar(
+    x: float, y: float, axis: float, health: int, max_health: int
+) -> tuple[Box, Box]:
+    """The background and fill of the health bar above a monster at (x, y)."""
+    back = (x - axis, y - 3 * axis / 2, x + axis - 1, y - axis - 1)
+    fill = (
+        x - axis + 1,
+        y - 3 * axis / 2 + 1,
+        x - axis + (axis * 2 - 2) * health / max_health,
+        y - axis - 2,
+    )
+    return back, fill
 
 
 def is_dead(monster: IMonster) -> bool:
@@ -1,8 +1,57 @@
+import time
+import tkinter as tk
+from collections import deque
+from collections.abc import Iterator
+from enum import Enum, auto
+from functools import cache
 from pathlib import Path
 from PIL import ImageTk
 
 from . import io
+from .prefetch import Prefetcher
 
 
+class Action(Enum):
+    PRESS = auto()
+    RELEASE = auto()
+
+
+class InputQueue:
+    """Buffers raw Tk events until the game consumes them once per tick.
+
+    Actions are stamped with the `perf_counter` time they arrived at. Motion is
+    coalesced: only the latest pointer position is kept.
+    """
+
+    def __init__(self):
+        self._actions: deque[tuple[Action, tk.Event, float]] = deque()
+        self._motion: tk.Event | None = None
+
+    def motion(self, event: tk.Event) -> None:
+        self._motion = event
+
+    def push(self, action: Action, event: tk.Event) -> None:
+        self._actions.append((action, event, time.perf_counter()))
+        # The action carries its own position, superseding earlier motion
+        self._motion = None
+
+    def actions(self) -> Iterator[tuple[Action, tk.Event, float]]:
+        while self._actions:
+            yield self._actions.popleft()
+
+    def pop_motion(self) -> tk.Event | None:
+        event, self._motion = self._motion, None
+        return event
+
+
+def prefetch(prefetcher: Prefetcher, cond: str) -> None:
+    prefetcher.request(_img_path(cond), lambda: load_img(cond))
+
+
+@cache
 def load_img(cond: str) -> ImageTk.PhotoImage:
-    return io.load_img_tk(Path(f'mouseImages/{cond}.png'))
+    return io.load_img_tk(_img_path(cond))
+
+
+def _img_path(cond: str) -> Path:
+    return Path(f'mouseImages/{cond}.png')
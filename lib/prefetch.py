@@ -0,0 +1,82 @@
+"""Decodes sprites on a worker thread, before the game first draws them."""
+from __future__ import annotations
+import queue
+import threading
+import tkinter as tk
+from collections.abc import Callable
+from pathlib import Path
+from typing import Final
+
+from . import io
+
+# How often the Tk thread looks for decoded sprites, while any are outstanding
+POLL_MS: Final = 20
+
+Loader = Callable[[], object]
+
+
+class Prefetcher:
+    """Decodes requested sprites on a worker thread, then calls their loaders on
+    the Tk thread once it is idle.
+
+    A loader creates and caches the sprite's PhotoImage, as its first use would,
+    but from the image already decoded by `io.decode`.
+    """
+
+    def __init__(self, root: tk.Misc):
+        self._root = root
+        self._requested: set[tuple[Path, int]] = set()
+        self._todo: queue.SimpleQueue[
+            tuple[Path, int, Loader] | None
+        ] = queue.SimpleQueue()
+        self._decoded: queue.SimpleQueue[Loader | None] = queue.SimpleQueue()
+        self._outstanding = 0
+        self._polling = False
+        self._thread = threading.Thread(target=self._work, name='prefetch', daemon=True)
+        self._thread.start()
+
+    def request(self, fp: Path, loader: Loader, rotation: int = 0) -> None:
+        """Decode the sprite at `fp`, rotated by `rotation` degrees, in the
+        background, then call `loader` at idle.
+
+        Must be called on the Tk thread. Sprites already requested are skipped.
+        """
+        if (fp, rotation) in self._requested:
+            return
+        self._requested.add((fp, rotation))
+        self._outstanding += 1
+        self._todo.put((fp, rotation, loader))
+        if not self._polling:
+            self._polling = True
+            self._root.after(POLL_MS, self._poll)
+
+    def close(self) -> None:
+        self._todo.put(None)
+
+    def _work(self) -> None:
+        while (item := self._todo.get()) is not None:
+            fp, rotation, loader = item
+            try:
+                io.decode(fp, rotation)
+            except OSError:
+                # Left for its first use to fail loudly on the Tk thread
+                self._decoded.put(None)
+            else:
+                self._decoded.put(loader)
+
+    def _poll(self) -> None:
+        self._root.after_idle(self._load)
+
+    def _load(self) -> None:
+        while True:
+            try:
+                loader = self._decoded.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if loader is not None:
+                loader()
+        if self._outstanding:
+            self._root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
@@ -0,0 +1,116 @@
+"""Offline profiling helpers: a stack sampler and hot-function summaries."""
+from __future__ import annotations
+import pstats
+import sys
+import threading
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import FrameType
+from typing import Final, TextIO
+
+# Game logic modules, reported in the hot function summaries
+GAME_MODULES: Final = ('tower_defense', 'tower', 'projectile', 'monster')
+
+
+class Sampler:
+    """Samples the stack of the thread that started it every `interval` seconds."""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._target = 0
+        self._switch_interval = sys.getswitchinterval()
+
+    def __enter__(self) -> Sampler:
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._stop.clear()
+        # Otherwise the sampler only gets the GIL every 5ms
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self.stacks[_stack(frame)] += 1
+
+    def write_collapsed(self, fp: TextIO) -> None:
+        """Write the samples in the collapsed format read by flame graph tools."""
+        for stack, count in sorted(self.stacks.items()):
+            fp.write(f'{";".join(stack)} {count}\n')
+
+    def hottest(
+        self, modules: Sequence[str] = GAME_MODULES, n: int = 20
+    ) -> list[tuple[str, int, int]]:
+        """Return the `n` functions in `modules` with the most samples.
+
+        Each is (function, self samples, total samples), by self samples.
+        """
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            if _in_modules(stack[-1], modules):
+                own[stack[-1]] += count
+            for label in set(stack):
+                if _in_modules(label, modules):
+                    total[label] += count
+        ranked = sorted(total, key=lambda label: (own[label], total[label]))
+        return [(label, own[label], total[label]) for label in ranked[::-1][:n]]
+
+    def summary(self, modules: Sequence[str] = GAME_MODULES, n: int = 20) -> str:
+        samples = sum(self.stacks.values())
+        lines = [f'{samples} samples every {self.interval * 1000:g} ms']
+        lines.append(f'  {"self":>6} {"total":>6}  function')
+        for label, own, total in self.hottest(modules, n):
+            lines.append(f'  {_share(own, samples)} {_share(total, samples)}  {label}')
+        return '\n'.join(lines)
+
+
+def _stack(frame: FrameType | None) -> tuple[str, ...]:
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f'{Path(code.co_filename).stem}:{code.co_qualname}')
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+def _in_modules(label: str, modules: Iterable[str]) -> bool:
+    return label.partition(':')[0] in modules
+
+
+def _share(count: int, samples: int) -> str:
+    return f'{100 * count / samples if samples else 0:5.1f}%'
+
+
+def stats_summary(
+    stats: pstats.Stats, modules: Sequence[str] = GAME_MODULES, n: int = 20
+) -> str:
+    """Summarise the `n` functions in `modules` with the most internal time."""
+    rows = []
+    # pylint: disable-next=no-member
+    for (filename, line, name), (_, calls, own, total, _) in stats.stats.items():
+        if Path(filename).stem in modules:
+            rows.append((own, total, calls, f'{Path(filename).stem}:{line}({name})'))
+    rows.sort(reverse=True)
+    lines = [f'  {"tottime":>9} {"cumtime":>9} {"calls":>9}  function']
+    for own, total, calls, label in rows[:n]:
+        lines.append(f'  {own:9.3f} {total:9.3f} {calls:9d}  {label}')
+    return '\n'.join(lines)
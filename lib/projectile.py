@@ -2,17 +2,23 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 import math
 import tkinter as tk
+from functools import cache, partial
 from math import degrees
 from pathlib import Path
 from typing import Protocol
 from PIL import ImageTk
 
 from . import (
+    framebuffer,
     io,
+    lod,
     monster,
 )
+from .corridor import PathCorridor, Window
 from .maps import Dimension
 from .monster import IMonster
+from .prefetch import Prefetcher
+from .telemetry import DamageLog, Effect
 
 
 class IProjectile(Protocol):
@@ -24,9 +30,27 @@ class IProjectile(Protocol):
     def paint(self, canvas: tk.Canvas) -> None:
         ...
 
+    def blit(self, frame: framebuffer.Frame) -> None:
+        ...
+
+    def merge_key(self) -> tuple[int, int, int]:
+        ...
+
 
 class _Projectile(ABC):
-    def __init__(self, x, y, damage, speed, block_dim: Dimension):
+    # The name of its sprite in projectileImages
+    _sprite: str
+
+    def __init__(
+        self,
+        x,
+        y,
+        damage,
+        speed,
+        block_dim: Dimension,
+        damage_log: DamageLog | None = None,
+        source: int = -1,
+    ):
         self.hit = False
         self._x = x
         self._y = y
@@ -35,11 +59,17 @@ class _Projectile(ABC):
         self._damage = damage
         self._speed = speed
         self._target: IMonster | None
-        self._image: ImageTk.PhotoImage
+        self._target_generation = 0
         self.should_remove: bool = False
+        self._damage_log = damage_log
+        self._source = source
 
     def update(self, monsters: list[IMonster]) -> None:
-        if self._target and monster.is_dead(self._target):
+        if self._target and (
+            monster.is_dead(self._target)
+            or self._target.generation != self._target_generation
+        ):
+            # Dead, or recycled into another monster since it was targeted
             self.should_remove = True
             return
         if self.hit:
@@ -50,11 +80,39 @@ class _Projectile(ABC):
 
     def _hit_monster(self):
         assert self._target is not None
+        health = self._target.health
         self._target.health -= self._damage
+        self._record(health)
+
+    def _record(self, health: int, effect: Effect = Effect.NONE) -> None:
+        if self._damage_log is not None:
+            assert self._target is not None
+            self._damage_log.record(
+                self._source, self._target, health, self._damage, effect
+            )
 
     def paint(self, canvas: tk.Canvas) -> None:
         canvas.create_image(self._x, self._y, image=self._image)
 
+    def blit(self, frame: framebuffer.Frame) -> None:
+        frame.blit(self._sprite_array, self._x, self._y)
+
+    def merge_key(self) -> tuple[int, int, int]:
+        """Projectiles drawn with the same sprite in about the same place match."""
+        return (
+            id(self._image),
+            round(self._x / lod.MERGE_DISTANCE),
+            round(self._y / lod.MERGE_DISTANCE),
+        )
+
+    @property
+    def _image(self) -> ImageTk.PhotoImage:
+        return _load_img(self._sprite)
+
+    @property
+    def _sprite_array(self) -> framebuffer.Sprite:
+        return framebuffer.sprite(_img_path(self._sprite))
+
     @abstractmethod
     def _move(self) -> None:
         ...
@@ -65,10 +123,22 @@ class _Projectile(ABC):
 
 
 class TrackingBullet(_Projectile):
-    def __init__(self, x, y, damage, speed, target, block_dim: Dimension):
-        super().__init__(x, y, damage, speed, block_dim)
+    _sprite = 'bullet'
+
+    def __init__(
+        self,
+        x,
+        y,
+        damage,
+        speed,
+        target,
+        block_dim: Dimension,
+        damage_log: DamageLog | None = None,
+        source: int = -1,
+    ):
+        super().__init__(x, y, damage, speed, block_dim, damage_log, source)
         self._target = target
-        self._image = _load_img('bullet')
+        self._target_generation = target.generation
 
     def _move(self):
         assert self._target
@@ -90,61 +160,134 @@ class TrackingBullet(_Projectile):
 
 
 class PowerShot(TrackingBullet):
-    def __init__(self, x, y, damage, speed, target, slow, block_dim: Dimension):
-        super().__init__(x, y, damage, speed, target, block_dim)
+    _sprite = 'powerShot'
+
+    def __init__(
+        self,
+        x,
+        y,
+        damage,
+        speed,
+        target,
+        slow,
+        block_dim: Dimension,
+        damage_log: DamageLog | None = None,
+        source: int = -1,
+    ):
+        super().__init__(x, y, damage, speed, target, block_dim, damage_log, source)
         self._slow = slow
-        self._image = _load_img('powerShot')
 
     def _hit_monster(self):
         assert self._target
+        health = self._target.health
         self._target.health -= self._damage
+        effect = Effect.NONE
         if self._target.movement > (self._target.speed) / self._slow:
             self._target.movement = (self._target.speed) / self._slow
+            effect = Effect.SLOW
+        self._record(health, effect)
         self.should_remove = True
 
 
 class AngledProjectile(_Projectile):
-    def __init__(self, x, y, damage, speed, angle, givenRange, block_dim: Dimension):
-        super().__init__(x, y, damage, speed, block_dim)
+    _sprite = 'arrow'
+
+    def __init__(
+        self,
+        x,
+        y,
+        damage,
+        speed,
+        angle,
+        givenRange,
+        block_dim: Dimension,
+        damage_log: DamageLog | None = None,
+        source: int = -1,
+        corridor: PathCorridor | None = None,
+    ):
+        super().__init__(x, y, damage, speed, block_dim, damage_log, source)
         self._x_change = speed * math.cos(angle)
         self._y_change = speed * math.sin(-angle)
         self._range = givenRange
-        self._image = _load_arrow_img(angle)
+        self._angle = angle
+        self._degrees = round(degrees(angle)) % 360
         self._target = None
         self._speed = speed
         self._distance = 0
+        self._corridor = corridor
+        self._windows: list[Window] = []
+        if corridor is not None:
+            self._windows = corridor.windows(
+                x, y, self._x_change, self._y_change, math.ceil(givenRange / speed)
+            )
+            # Crosses no path, so it can never hit anything
+            self.should_remove = not self._windows
 
     def _check_hit(self, monsters: list[IMonster]):
-        for monster_ in monsters:
+        candidates = (
+            monsters
+            if self._corridor is None
+            else self._corridor.candidates(self._windows)
+        )
+        for monster_ in candidates:
             if (monster_.x - self._x) ** 2 + (monster_.y - self._y) ** 2 <= (
                 self._block_dim
             ) ** 2:
                 self.hit = True
                 self._target = monster_
+                self._target_generation = monster_.generation
                 return
 
     def _hit_monster(self):
         assert self._target
+        health = self._target.health
         self._target.health -= self._damage
         self._target.tick = 0
         self._target.maxTick = 5
+        self._record(health, Effect.STUN)
         self.should_remove = True
 
+    @property
+    def _image(self) -> ImageTk.PhotoImage:
+        return _load_arrow_img(self._degrees)
+
+    @property
+    def _sprite_array(self) -> framebuffer.Sprite:
+        return framebuffer.sprite(_img_path('arrow'), self._degrees)
+
     def _move(self):
         self._x += self._x_change
         self._y += self._y_change
         self._distance += self._speed
         if self._distance >= self._range:
             self.should_remove = True
+        elif self._corridor is not None and not self._corridor.in_bounds(
+            self._x, self._y
+        ):
+            self.should_remove = True
+
+
+def prefetch(prefetcher: Prefetcher, type_: type[_Projectile]) -> None:
+    """Have every sprite a projectile type is drawn with decoded before it is
+    needed: each whole degree of the arrow, which is drawn rotated.
+    """
+    fp = _img_path(type_._sprite)
+    if not issubclass(type_, AngledProjectile):
+        prefetcher.request(fp, partial(_load_img, type_._sprite))
+        return
+    for degrees_ in range(360):
+        prefetcher.request(fp, partial(_load_arrow_img, degrees_), degrees_)
 
 
+@cache
 def _load_img(projectile: str) -> ImageTk.PhotoImage:
     return io.load_img_tk(_img_path(projectile))
 
 
-def _load_arrow_img(angle: float) -> ImageTk.PhotoImage:
-    img = io.load_img(_img_path('arrow'))
-    return ImageTk.PhotoImage(img.rotate(degrees(angle)))
+@cache
+def _load_arrow_img(degrees_: int) -> ImageTk.PhotoImage:
+    """Return the arrow rotated to the nearest whole degree."""
+    return io.load_img_tk(_img_path('arrow'), degrees_)
 
 
 def _img_path(p: str) -> Path:
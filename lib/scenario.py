@@ -0,0 +1,157 @@
+"""Scripted, headless games: a map, a wave file and a tower layout."""
+from __future__ import annotations
+import json
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+
+from . import constants as C
+from . import grid
+from .game import Stats
+from .tower_defense import TowerDefenseGame, add_tower, can_add_tower, can_spawn
+
+
+@dataclass(frozen=True)
+class Placement:
+    tower: str
+    x: int
+    y: int
+    level: int = 1
+    # Placed before this wave is sent, counting from 0 for the first
+    wave: int = 0
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    map_name: str
+    wave_name: str
+    money: int
+    health: int
+    towers: Sequence[Placement]
+    # Seeds the game's random numbers, so every play of a scenario is the same
+    seed: int = 0
+    # Allocation budgets per subsystem, in bytes per tick
+    budgets: Mapping[str, int] = field(default_factory=dict)
+
+
+def load(name: str) -> Scenario:
+    fp = C.Paths.TEXTS.join('scenarios', f'{name}.json')
+    data = json.loads(fp.read_text())
+    return Scenario(
+        name,
+        data['map'],
+        data['waves'],
+        data.get('money', 1000),
+        data.get('health', 100),
+        tuple(
+            Placement(t['tower'], *t['at'], t.get('level', 1), t.get('wave', 0))
+            for t in data.get('towers', ())
+        ),
+        data.get('seed', 0),
+        data.get('budgets', {}),
+    )
+
+
+def names() -> list[str]:
+    return sorted(fp.stem for fp in C.Paths.TEXTS.join('scenarios').glob('*.json'))
+
+
+def build(scenario: Scenario) -> TowerDefenseGame:
+    """Create a headless game with the scenario's first towers placed.
+
+    Playing it with the scenario places the towers of each later wave: those
+    of the first are already standing, so are not placed again.
+    """
+    game = new_game(scenario)
+    place(game, scenario)
+    return game
+
+
+def new_game(scenario: Scenario) -> TowerDefenseGame:
+    """Create a headless game on the scenario's map, with no towers."""
+    return TowerDefenseGame(
+        map_name=scenario.map_name,
+        wave_name=scenario.wave_name,
+        stats=Stats(scenario.money, scenario.health),
+        headless=True,
+        seed=scenario.seed,
+    )
+
+
+def place(game: TowerDefenseGame, scenario: Scenario, wave: int = 0) -> None:
+    """Place the scenario's towers for `wave`, paying for each and for each
+    upgrade, raising ValueError if one cannot be placed or paid for.
+    """
+    for placement in scenario.towers:
+        if placement.wave != wave:
+            continue
+        block_ = game.grid[placement.x][placement.y]
+        if not can_add_tower(
+            game.grid, block_.grid_loc, placement.tower, game.stats.money
+        ):
+            raise ValueError(f'Cannot place {placement} in {scenario.name}')
+        game.stats.money -= add_tower(
+            game.tower_map,
+            block_,
+            placement.tower,
+            game.block_dim,
+            game.monsters,
+            game.damage_log,
+            game.corridor,
+        )
+        tower_ = game.tower_map[block_.grid_loc]
+        for _ in range(1, placement.level):
+            cost = tower_.upgradeCost
+            if cost is None or cost > game.stats.money:
+                raise ValueError(f'Cannot upgrade {placement} in {scenario.name}')
+            game.stats.money -= cost
+            tower_.upgrade()
+
+
+def placed(game: TowerDefenseGame, scenario: Scenario, wave: int) -> bool:
+    """Whether every tower the scenario has for `wave` already stands."""
+    return all(
+        grid.Point(p.x, p.y) in game.tower_map
+        for p in scenario.towers
+        if p.wave == wave
+    )
+
+
+def play(
+    game: TowerDefenseGame,
+    ticks: int | None = None,
+    waves: int = 1,
+    scenario: Scenario | None = None,
+) -> int:
+    """Play until `ticks` have passed or, without a limit, `waves` are cleared.
+
+    Each wave is sent as soon as the last is cleared, after placing the towers
+    `scenario` has for it, if given and not already placed. Returns the ticks
+    played.
+    """
+    return sum(1 for _ in steps(game, ticks, waves, scenario))
+
+
+def steps(
+    game: TowerDefenseGame,
+    ticks: int | None = None,
+    waves: int = 1,
+    scenario: Scenario | None = None,
+) -> Iterator[None]:
+    """As `play`, but yielding after each tick."""
+    start = game.tick
+    sent = 0
+    while True:
+        played = game.tick - start
+        if ticks is not None and played >= ticks:
+            return
+        if can_spawn(game, game.monsters):
+            if ticks is None and sent == waves:
+                return
+            wave = game.wavegenerator.wave
+            if scenario is not None and not placed(game, scenario, wave):
+                place(game, scenario, wave)
+            game.start_wave()
+            sent += 1
+        game.step()
+        yield
@@ -0,0 +1,264 @@
+"""Many headless games in one process, stepped in turn by an asyncio scheduler.
+
+Games on the same map share its grid layers, and every game shares the cached
+wave files, unit definitions and sprites, so a session costs little more than
+its own entities.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Any
+
+from .tower_defense import TowerDefenseGame
+
+
+class SessionState(Enum):
+    RUNNING = auto()
+    PAUSED = auto()
+    # Idle with no monsters, so stepping would change nothing until a wave starts
+    SUSPENDED = auto()
+    # Played its tick limit, or every wave with waves sent automatically
+    FINISHED = auto()
+
+
+@dataclass(frozen=True)
+class SessionInfo:
+    id: int
+    state: SessionState
+    tick: int
+    waves_left: int
+    money: int
+    health: int
+    monsters: int
+    towers: int
+
+
+class Session:
+    def __init__(
+        self,
+        id_: int,
+        game: TowerDefenseGame,
+        slice_ticks: int,
+        max_ticks: int | None,
+        auto_waves: bool,
+    ):
+        self.id = id_
+        self.game = game
+        self.state = SessionState.RUNNING
+        self.slice_ticks = slice_ticks
+        self.max_ticks = max_ticks
+        self.auto_waves = auto_waves
+        # Ticks played under the scheduler
+        self.ticks = 0
+
+    def info(self) -> SessionInfo:
+        game = self.game
+        return SessionInfo(
+            self.id,
+            self.state,
+            game.tick,
+            game.wavegenerator.waves_left,
+            game.stats.money,
+            game.stats.health,
+            len(game.monsters),
+            len(game.tower_map),
+        )
+
+    def play(self, ticks: int) -> int:
+        """Play up to `ticks` ticks, stopping early once there is nothing to do.
+
+        Returns the ticks played.
+        """
+        played = 0
+        game = self.game
+        while played < ticks:
+            if self.max_ticks is not None and self.ticks >= self.max_ticks:
+                self.state = SessionState.FINISHED
+                break
+            if game.is_idle and not game.monsters:
+                if not self.auto_waves:
+                    self.state = SessionState.SUSPENDED
+                    break
+                if not game.wavegenerator.waves_left:
+                    self.state = SessionState.FINISHED
+                    break
+                game.start_wave()
+            game.step()
+            self.ticks += 1
+            played += 1
+        return played
+
+
+class Scheduler:
+    """Steps running sessions in turn, a slice of ticks each, yielding to the
+    event loop after every slice.
+
+    Each session may play its own number of ticks a slice, so a round gives each
+    its share. Idle sessions are suspended until a wave is started.
+    """
+
+    def __init__(self, slice_ticks: int = 10):
+        self.slice_ticks = slice_ticks
+        # Session ticks played by `run`, and the seconds it ran, for throughput
+        self.ticks = 0
+        self.elapsed = 0.0
+        self._sessions: dict[int, Session] = {}
+        self._ids = itertools.count()
+        self._wake = asyncio.Event()
+        self._running = False
+
+    def create(
+        self,
+        slice_ticks: int | None = None,
+        max_ticks: int | None = None,
+        auto_waves: bool = False,
+        **options: Any,
+    ) -> int:
+        """Create a headless game, returning its session id.
+
+        options: passed on to `TowerDefenseGame`
+        """
+        return self.add(
+            TowerDefenseGame(headless=True, **options),
+            slice_ticks,
+            max_ticks,
+            auto_waves,
+        )
+
+    def add(
+        self,
+        game: TowerDefenseGame,
+        slice_ticks: int | None = None,
+        max_ticks: int | None = None,
+        auto_waves: bool = False,
+    ) -> int:
+        """Schedule a headless game, returning its session id.
+
+        slice_ticks: ticks per turn, the scheduler's by default
+        max_ticks: finish the session after playing this many ticks
+        auto_waves: send each wave once the last is cleared, finishing after the
+            last, rather than waiting for `start_wave`
+        """
+        if not game.headless:
+            raise ValueError('Only headless games can be scheduled')
+        session = Session(
+            next(self._ids),
+            game,
+            slice_ticks or self.slice_ticks,
+            max_ticks,
+            auto_waves,
+        )
+        self._sessions[session.id] = session
+        self._wake.set()
+        return session.id
+
+    def game(self, id_: int) -> TowerDefenseGame:
+        return self._session(id_).game
+
+    def query(self, id_: int) -> SessionInfo:
+        return self._session(id_).info()
+
+    def sessions(self) -> list[SessionInfo]:
+        return [session.info() for session in self._sessions.values()]
+
+    def step(self, id_: int, ticks: int = 1) -> int:
+        """Play a session now, outside of its turn, returning the ticks played.
+
+        A paused session stays paused.
+        """
+        session = self._session(id_)
+        state = session.state
+        played = session.play(ticks)
+        if state is SessionState.PAUSED and session.state is SessionState.RUNNING:
+            session.state = state
+        return played
+
+    def start_wave(self, id_: int) -> bool:
+        """Send a session's next wave, waking it if it was suspended."""
+        session = self._session(id_)
+        if not session.game.start_wave():
+            return False
+        if session.state is SessionState.SUSPENDED:
+            self._resume(session)
+        return True
+
+    def pause(self, id_: int) -> None:
+        session = self._session(id_)
+        if session.state is not SessionState.FINISHED:
+            session.state = SessionState.PAUSED
+
+    def resume(self, id_: int) -> None:
+        session = self._session(id_)
+        if session.state in (SessionState.PAUSED, SessionState.SUSPENDED):
+            self._resume(session)
+
+    def close(self, id_: int) -> None:
+        self._sessions.pop(id_).game.stop()
+
+    def stop(self) -> None:
+        """Have `run` return after the current slice."""
+        self._running = False
+        self._wake.set()
+
+    async def run(self, until_done: bool = False) -> None:
+        """Step running sessions round robin until stopped.
+
+        until_done: return once no session is running, instead of waiting for
+            sessions to be added or resumed
+        """
+        self._running = True
+        try:
+            while self._running:
+                running = [
+                    session
+                    for session in self._sessions.values()
+                    if session.state is SessionState.RUNNING
+                ]
+                if not running:
+                    if until_done:
+                        return
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                # Timed by round, so time spent waiting for work is left out
+                start = time.perf_counter()
+                for session in running:
+                    if not self._running:
+                        break
+                    # Paused or closed by another task while this one yielded
+                    if session.id not in self._sessions:
+                        continue
+                    if session.state is SessionState.RUNNING:
+                        self.ticks += session.play(session.slice_ticks)
+                        await asyncio.sleep(0)
+                self.elapsed += time.perf_counter() - start
+        finally:
+            self._running = False
+
+    @property
+    def throughput(self) -> float:
+        """Session ticks played per second that `run` had sessions to play."""
+        return self.ticks / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        counts = {state: 0 for state in SessionState}
+        for session in self._sessions.values():
+            counts[session.state] += 1
+        states = ', '.join(f'{n} {state.name.lower()}' for state, n in counts.items())
+        return (
+            f'  {len(self._sessions)} sessions ({states}): {self.ticks} session ticks '
+            f'in {self.elapsed:.2f} s, {self.throughput:.0f} session ticks/s'
+        )
+
+    def _resume(self, session: Session) -> None:
+        session.state = SessionState.RUNNING
+        self._wake.set()
+
+    def _session(self, id_: int) -> Session:
+        try:
+            return self._sessions[id_]
+        except KeyError:
+            raise KeyError(f'No session {id_}') from None
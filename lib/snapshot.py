@@ -0,0 +1,392 @@
+"""Compact, versioned binary snapshots of a game.
+
+Entities are stored column-wise as packed arrays, so saving and loading cost a
+handful of bulk copies rather than pickling an object graph.
+"""
+# pylint: disable=protected-access
+from __future__ import annotations
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+from . import (
+    grid,
+    projectile,
+    tower,
+)
+from .grid import Grid
+from .block import Block
+from .corridor import PathCorridor
+from .maps import Dimension
+from .monster import IMonster
+from .projectile import (
+    AngledProjectile,
+    PowerShot,
+    TrackingBullet,
+)
+from .telemetry import DamageLog
+
+MAGIC: Final = b'TDSV'
+VERSION: Final = 2
+# The Mersenne Twister's words and position, as `random.getstate` gives them
+_RANDOM_CODE: Final = 'I'
+_RANDOM_VERSION: Final = 3
+
+Columns = Sequence[tuple[str, str]]
+Table = dict[str, array]
+
+MONSTER_COLUMNS: Final[Columns] = (
+    ('type', 'B'),
+    ('health', 'i'),
+    ('distance', 'd'),
+    ('tick', 'i'),
+    ('max_tick', 'i'),
+    ('movement', 'd'),
+)
+TOWER_COLUMNS: Final[Columns] = (
+    ('type', 'B'),
+    ('gridx', 'H'),
+    ('gridy', 'H'),
+    ('level', 'B'),
+    ('target_list', 'B'),
+    ('sticky', 'B'),
+    ('cooldown', 'i'),
+    ('target', 'i'),
+)
+PROJECTILE_COLUMNS: Final[Columns] = (
+    ('owner', 'I'),
+    ('kind', 'B'),
+    ('x', 'd'),
+    ('y', 'd'),
+    ('damage', 'i'),
+    ('speed', 'd'),
+    ('target', 'i'),
+    ('angle', 'd'),
+    ('range', 'd'),
+    ('distance', 'd'),
+    ('slow', 'd'),
+    ('hit', 'B'),
+)
+PROJECTILES: Final = (TrackingBullet, PowerShot, AngledProjectile)
+
+_HEADER: Final = struct.Struct('<4sH')
+_GAME: Final = struct.Struct('<IBii')
+_WAVE: Final = struct.Struct('<IIii')
+_COUNT: Final = struct.Struct('<I')
+
+
+@dataclass
+class WavePosition:
+    index: int
+    monster: int
+    ticks: int
+    max_ticks: int
+
+
+@dataclass
+class Snapshot:
+    tick: int
+    state: int
+    money: int
+    health: int
+    wave: WavePosition
+    towers: Table
+    monsters: Table
+    projectiles: Table
+    # The game's random number generator, empty if not captured
+    random: array = field(default_factory=lambda: array(_RANDOM_CODE))
+
+
+def empty_table(columns: Columns) -> Table:
+    return {name: array(code) for name, code in columns}
+
+
+def encode(snap: Snapshot) -> bytes:
+    parts = [
+        _GAME.pack(snap.tick, snap.state, snap.money, snap.health),
+        _WAVE.pack(
+            snap.wave.index, snap.wave.monster, snap.wave.ticks, snap.wave.max_ticks
+        ),
+    ]
+    for table, columns in _tables(snap):
+        parts.append(_COUNT.pack(len(table[columns[0][0]])))
+        for name, _ in columns:
+            parts.append(_to_little(table[name]).tobytes())
+    parts.append(_COUNT.pack(len(snap.random)))
+    parts.append(_to_little(snap.random).tobytes())
+    return _HEADER.pack(MAGIC, VERSION) + zlib.compress(b''.join(parts), 1)
+
+
+def decode(data: bytes) -> Snapshot:
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a saved game')
+    # Version 1 saves have no random state, and load with a fresh one
+    if version not in (1, VERSION):
+        raise ValueError(f'Unsupported save version {version}')
+    body = memoryview(zlib.decompress(data[_HEADER.size :]))
+
+    tick, state, money, health = _GAME.unpack_from(body)
+    offset = _GAME.size
+    wave = WavePosition(*_WAVE.unpack_from(body, offset))
+    offset += _WAVE.size
+
+    tables = []
+    for columns in (TOWER_COLUMNS, MONSTER_COLUMNS, PROJECTILE_COLUMNS):
+        (count,) = _COUNT.unpack_from(body, offset)
+        offset += _COUNT.size
+        table = empty_table(columns)
+        for name, _ in columns:
+            column = table[name]
+            size = count * column.itemsize
+            column.frombytes(body[offset : offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset += size
+        tables.append(table)
+
+    random_state = array(_RANDOM_CODE)
+    if version >= 2:
+        (count,) = _COUNT.unpack_from(body, offset)
+        offset += _COUNT.size
+        random_state.frombytes(body[offset : offset + count * random_state.itemsize])
+        if sys.byteorder == 'big':
+            random_state.byteswap()
+    return Snapshot(tick, state, money, health, wave, *tables, random_state)
+
+
+def _to_little(column: array) -> array:
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def _tables(snap: Snapshot) -> Sequence[tuple[Table, Columns]]:
+    return (
+        (snap.towers, TOWER_COLUMNS),
+        (snap.monsters, MONSTER_COLUMNS),
+        (snap.projectiles, PROJECTILE_COLUMNS),
+    )
+
+
+def save_async(snap: Snapshot, fp: Path) -> threading.Thread:
+    """Encode and write `snap` on a worker thread.
+
+    The snapshot must already be captured, so the game can keep running.
+    """
+    thread = threading.Thread(target=_write, args=(snap, fp), name='save-game')
+    thread.start()
+    return thread
+
+
+def _write(snap: Snapshot, fp: Path) -> None:
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    # A temporary file per save, as saves in quick succession overlap
+    with tempfile.NamedTemporaryFile(
+        dir=fp.parent, prefix=fp.name, suffix='.tmp', delete=False
+    ) as f:
+        tmp = Path(f.name)
+        try:
+            f.write(encode(snap))
+        except BaseException:
+            f.close()
+            tmp.unlink()
+            raise
+    os.replace(tmp, fp)
+
+
+def load(fp: Path) -> Snapshot:
+    return decode(fp.read_bytes())
+
+
+def capture_random(random_: random.Random) -> array:
+    _, state, _ = random_.getstate()
+    return array(_RANDOM_CODE, state)
+
+
+def restore_random(random_: random.Random, state: array) -> None:
+    """Restore a captured random state, leaving `random_` as it is if none was."""
+    if state:
+        random_.setstate((_RANDOM_VERSION, tuple(state), None))
+
+
+def capture_monsters(
+    monsters: Sequence[IMonster], monster_types: Sequence[type]
+) -> Table:
+    type_ids = {type_: i for i, type_ in enumerate(monster_types)}
+    table = empty_table(MONSTER_COLUMNS)
+    types, healths, distances = table['type'], table['health'], table['distance']
+    ticks, max_ticks, movements = table['tick'], table['max_tick'], table['movement']
+    for monster_ in monsters:
+        types.append(type_ids[type(monster_)])
+        healths.append(monster_.health)
+        distances.append(monster_.distance_travelled)
+        ticks.append(monster_.tick)
+        max_ticks.append(monster_.maxTick)
+        movements.append(monster_.movement)
+    return table
+
+
+def restore_monsters(
+    table: Table, factory: Callable[[int, float], IMonster]
+) -> list[IMonster]:
+    """Rebuild monsters with `factory(type_id, distance)`."""
+    monsters = []
+    for i, type_id in enumerate(table['type']):
+        monster_ = factory(type_id, table['distance'][i])
+        monster_.health = table['health'][i]
+        monster_.tick = table['tick'][i]
+        monster_.maxTick = table['max_tick'][i]
+        monster_.movement = table['movement'][i]
+        monsters.append(monster_)
+    return monsters
+
+
+def capture_towers(
+    tower_map: tower.TowerMap, monsters: Sequence[IMonster]
+) -> tuple[Table, Table]:
+    """Capture the towers and their projectiles in flight."""
+    tower_ids = {name: i for i, name in enumerate(tower.TOWERS)}
+    monster_ids = {id(monster_): i for i, monster_ in enumerate(monsters)}
+    towers = empty_table(TOWER_COLUMNS)
+    projectiles = empty_table(PROJECTILE_COLUMNS)
+
+    for owner, point in enumerate(tower_map):
+        tower_ = tower_map[point]
+        assert isinstance(tower_, tower._TargetingTower)
+        towers['type'].append(tower_ids[tower_.name])
+        towers['gridx'].append(point.x)
+        towers['gridy'].append(point.y)
+        towers['level'].append(tower_.level)
+        towers['target_list'].append(tower_.targetList)
+        towers['sticky'].append(tower_.stickyTarget)
+        towers['cooldown'].append(tower_._ticks)
+        towers['target'].append(monster_ids.get(id(tower_._target), -1))
+        for proj in tower_._projectiles:
+            _capture_projectile(projectiles, owner, proj, monster_ids)
+
+    return towers, projectiles
+
+
+def _capture_projectile(
+    table: Table,
+    owner: int,
+    proj: projectile._Projectile,
+    monster_ids: dict[int, int],
+) -> None:
+    table['owner'].append(owner)
+    table['kind'].append(PROJECTILES.index(type(proj)))
+    table['x'].append(proj._x)
+    table['y'].append(proj._y)
+    table['damage'].append(proj._damage)
+    table['speed'].append(proj._speed)
+    table['target'].append(monster_ids.get(id(proj._target), -1))
+    table['angle'].append(getattr(proj, '_angle', 0.0))
+    table['range'].append(getattr(proj, '_range', 0.0))
+    table['distance'].append(getattr(proj, '_distance', 0.0))
+    table['slow'].append(getattr(proj, '_slow', 0.0))
+    table['hit'].append(proj.hit)
+
+
+def restore_towers(
+    snap: Snapshot,
+    tower_map: tower.TowerMap,
+    grid_: Grid[Block],
+    block_dim: Dimension,
+    monsters: list[IMonster],
+    damage_log: DamageLog | None = None,
+    corridor: PathCorridor | None = None,
+) -> None:
+    """Place the snapshot's towers, with their projectiles, on `tower_map`."""
+    names = tuple(tower.TOWERS)
+    towers = snap.towers
+    owners: list[tower._TargetingTower] = []
+
+    for i, type_id in enumerate(towers['type']):
+        point = grid.Point(towers['gridx'][i], towers['gridy'][i])
+        tower_ = tower.tower_factory(
+            names[type_id],
+            grid_[point.x][point.y].loc,
+            point,
+            block_dim,
+            monsters,
+            damage_log,
+            corridor,
+        )
+        assert isinstance(tower_, tower._TargetingTower)
+        for _ in range(1, towers['level'][i]):
+            tower_.upgrade()
+        tower_.targetList = towers['target_list'][i]
+        tower_.stickyTarget = bool(towers['sticky'][i])
+        tower_._ticks = towers['cooldown'][i]
+        target = _monster(monsters, towers['target'][i])
+        if target is not None:
+            tower_._lock(target)
+        tower_map[point] = tower_
+        owners.append(tower_)
+
+    projectiles = snap.projectiles
+    for i, owner in enumerate(projectiles['owner']):
+        proj = _restore_projectile(projectiles, i, owners[owner], monsters)
+        if proj is not None:
+            owners[owner]._add(proj)
+
+
+def _restore_projectile(
+    table: Table,
+    i: int,
+    owner: tower._TargetingTower,
+    monsters: Sequence[IMonster],
+) -> projectile._Projectile | None:
+    kind = PROJECTILES[table['kind'][i]]
+    x, y = table['x'][i], table['y'][i]
+    damage, speed = table['damage'][i], table['speed'][i]
+    target = _monster(monsters, table['target'][i])
+    log, source = owner._damage_log, owner.telemetry_id
+
+    if kind is not AngledProjectile and target is None:
+        # Its target was already removed, so it would vanish next tick anyway
+        return None
+
+    proj: projectile._Projectile
+    if kind is PowerShot:
+        proj = PowerShot(
+            x, y, damage, speed, target, table['slow'][i], owner._block_dim, log, source
+        )
+    elif kind is TrackingBullet:
+        proj = TrackingBullet(
+            x, y, damage, speed, target, owner._block_dim, log, source
+        )
+    else:
+        proj = AngledProjectile(
+            x,
+            y,
+            damage,
+            speed,
+            table['angle'][i],
+            table['range'][i],
+            owner._block_dim,
+            log,
+            source,
+            owner._corridor,
+        )
+        proj._distance = table['distance'][i]
+        if target is not None:
+            proj._target = target
+            proj._target_generation = target.generation
+    proj.hit = bool(table['hit'][i])
+    return proj
+
+
+def _monster(monsters: Sequence[IMonster], idx: int) -> IMonster | None:
+    return monsters[idx] if idx >= 0 else None
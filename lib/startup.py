@@ -0,0 +1,53 @@
+"""Opt-in profiler for the time to the first interactive frame."""
+from __future__ import annotations
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self._origin = time.perf_counter()
+        self._phases: list[tuple[str, float]] = []
+        self.total: float | None = None
+
+    def enable(self, origin: float | None = None) -> None:
+        """Start profiling, measuring from `origin` (a `perf_counter` time)."""
+        self.enabled = True
+        self._origin = time.perf_counter() if origin is None else origin
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, time.perf_counter() - start))
+
+    def finish(self) -> float:
+        """Mark the first interactive frame, returning the startup time in seconds."""
+        self.total = time.perf_counter() - self._origin
+        return self.total
+
+    def report(self) -> str:
+        total = self.total if self.total is not None else self.finish()
+        lines = [f'Startup: {total * 1000:.1f} ms to first interactive frame']
+        accounted = 0.0
+        for name, duration in self._phases:
+            accounted += duration
+            lines.append(_line(name, duration, total))
+        lines.append(_line('(other)', total - accounted, total))
+        return '\n'.join(lines)
+
+
+def _line(name: str, duration: float, total: float) -> str:
+    share = 100 * duration / total if total else 0.0
+    return f'  {name:<20} {duration * 1000:8.1f} ms {share:5.1f}%'
+
+
+profiler = StartupProfiler()
+phase = profiler.phase
@@ -0,0 +1,441 @@
+"""A compact, binary stream of per-tick state changes, for external viewers.
+
+The stream opens with a header naming the map and the type ids, then carries
+one length-prefixed message per tick. A message lists what changed since the
+last: stats, towers, and monsters and projectiles spawned, moved and removed.
+Positions are quantized to `1 / quantum` pixels, and moves are sent as a byte
+per axis; anything moving further is sent again as if spawned. Every
+`keyframe_ticks` ticks a keyframe lists the whole state instead, so a viewer
+can start from any.
+"""
+# pylint: disable=protected-access
+from __future__ import annotations
+import json
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Final
+
+from . import snapshot, tower
+from .game import Stats
+from .monster import IMonster
+from .tower import TowerMap
+
+MAGIC: Final = b'TDDS'
+VERSION: Final = 1
+STATS: Final = ('money', 'health')
+
+_HEADER: Final = struct.Struct('<4sHI')
+_LENGTH: Final = struct.Struct('<I')
+_TICK: Final = struct.Struct('<BI')
+_COUNT: Final = struct.Struct('<H')
+_STAT: Final = struct.Struct('<Bi')
+# A type of -1 removes the tower
+_TOWER: Final = struct.Struct('<HHbB')
+_MONSTER_SPAWN: Final = struct.Struct('<IBhhi')
+_MOVE: Final = struct.Struct('<Ibb')
+_HEALTH: Final = struct.Struct('<Ii')
+_ID: Final = struct.Struct('<I')
+# Projectile kinds are the indices of `snapshot.PROJECTILES`, and the angle is
+# an arrow's rotation in degrees
+_PROJECTILE_SPAWN: Final = struct.Struct('<IBhhH')
+_INT8: Final = (-(1 << 7), (1 << 7) - 1)
+_INT16: Final = (-(1 << 15), (1 << 15) - 1)
+# Seconds `close` waits for the writer to take the end of the stream
+_CLOSE_TIMEOUT: Final = 1.0
+
+Record = tuple[int, ...]
+
+
+@dataclass
+class Message:
+    keyframe: bool
+    tick: int
+    stats: list[Record] = field(default_factory=list)
+    towers: list[Record] = field(default_factory=list)
+    spawned: list[Record] = field(default_factory=list)
+    moved: list[Record] = field(default_factory=list)
+    hurt: list[Record] = field(default_factory=list)
+    despawned: list[Record] = field(default_factory=list)
+    shots: list[Record] = field(default_factory=list)
+    shots_moved: list[Record] = field(default_factory=list)
+    shots_removed: list[Record] = field(default_factory=list)
+
+    def sections(self) -> Sequence[tuple[list[Record], struct.Struct]]:
+        return (
+            (self.stats, _STAT),
+            (self.towers, _TOWER),
+            (self.spawned, _MONSTER_SPAWN),
+            (self.moved, _MOVE),
+            (self.hurt, _HEALTH),
+            (self.despawned, _ID),
+            (self.shots, _PROJECTILE_SPAWN),
+            (self.shots_moved, _MOVE),
+            (self.shots_removed, _ID),
+        )
+
+
+class Encoder:
+    """Diffs the game state each tick against the state last encoded."""
+
+    def __init__(
+        self,
+        monster_types: Sequence[type],
+        keyframe_ticks: int = 100,
+        quantum: int = 4,
+    ):
+        self.keyframe_ticks = keyframe_ticks
+        self.quantum = quantum
+        self._monster_ids = {type_: i for i, type_ in enumerate(monster_types)}
+        self._tower_ids = {name: i for i, name in enumerate(tower.TOWERS)}
+        self._last_keyframe: int | None = None
+        self._stats: dict[str, int] = {}
+        self._towers: dict[tuple[int, int], tuple[int, int]] = {}
+        self._monsters: dict[int, Record] = {}
+        # Projectiles have no ids of their own, so are numbered as first seen
+        self._projectiles: dict[object, Record] = {}
+        self._next_projectile = 0
+
+    def header(self, map_name: str, block_dim: int) -> bytes:
+        meta = {
+            'map': map_name,
+            'block_dim': block_dim,
+            'quantum': self.quantum,
+            'keyframe_ticks': self.keyframe_ticks,
+            'monster_types': [type_.__name__ for type_ in self._monster_ids],
+            'tower_types': list(tower.TOWERS),
+            'projectile_kinds': [type_.__name__ for type_ in snapshot.PROJECTILES],
+            'stats': list(STATS),
+        }
+        data = json.dumps(meta).encode()
+        return _HEADER.pack(MAGIC, VERSION, len(data)) + data
+
+    def encode(
+        self,
+        tick: int,
+        monsters: Sequence[IMonster],
+        tower_map: TowerMap,
+        stats: Stats,
+        keyframe: bool = False,
+    ) -> bytes:
+        """Encode the state at the end of `tick`, length prefixed.
+
+        keyframe: send the whole state even if a keyframe is not due
+        """
+        last = self._last_keyframe
+        keyframe = keyframe or last is None or tick - last >= self.keyframe_ticks
+        if keyframe:
+            self._last_keyframe = tick
+            self._stats.clear()
+            self._towers.clear()
+            self._monsters.clear()
+            self._projectiles.clear()
+        message = Message(keyframe, tick)
+        self._diff_stats(message, stats)
+        self._diff_towers(message, tower_map)
+        self._diff_monsters(message, monsters)
+        self._diff_projectiles(message, tower_map)
+        return encode(message)
+
+    def _diff_stats(self, message: Message, stats: Stats) -> None:
+        for i, name in enumerate(STATS):
+            value = getattr(stats, name)
+            if self._stats.get(name) != value:
+                self._stats[name] = value
+                message.stats.append((i, value))
+
+    def _diff_towers(self, message: Message, tower_map: TowerMap) -> None:
+        seen = {}
+        for point in tower_map:
+            tower_ = tower_map[point]
+            seen[point.x, point.y] = (self._tower_ids[tower_.name], tower_.level)
+        for point, state in seen.items():
+            if self._towers.get(point) != state:
+                message.towers.append((*point, *state))
+        for point in self._towers.keys() - seen.keys():
+            message.towers.append((*point, -1, 0))
+        self._towers = seen
+
+    def _diff_monsters(self, message: Message, monsters: Sequence[IMonster]) -> None:
+        q = self.quantum
+        seen = {}
+        for monster_ in monsters:
+            x, y = _quantize(monster_.x, q), _quantize(monster_.y, q)
+            state = (x, y, monster_.health)
+            seen[monster_.uid] = state
+            last = self._monsters.get(monster_.uid)
+            if last is None or not _is_step(x - last[0], y - last[1]):
+                type_ = self._monster_ids[type(monster_)]
+                message.spawned.append((monster_.uid, type_, *state))
+                continue
+            if (x, y) != last[:2]:
+                message.moved.append((monster_.uid, x - last[0], y - last[1]))
+            if monster_.health != last[2]:
+                message.hurt.append((monster_.uid, monster_.health))
+        message.despawned.extend((uid,) for uid in self._monsters.keys() - seen.keys())
+        self._monsters = seen
+
+    def _diff_projectiles(self, message: Message, tower_map: TowerMap) -> None:
+        q = self.quantum
+        seen = {}
+        for point in tower_map:
+            for proj in tower_map[point]._projectiles:
+                x, y = _quantize(proj._x, q), _quantize(proj._y, q)
+                last = self._projectiles.get(proj)
+                if last is None:
+                    id_ = self._next_projectile
+                    self._next_projectile += 1
+                    kind = snapshot.PROJECTILES.index(type(proj))
+                    angle = getattr(proj, '_degrees', 0)
+                    message.shots.append((id_, kind, x, y, angle))
+                else:
+                    id_, kind, last_x, last_y, angle = last
+                    if not _is_step(x - last_x, y - last_y):
+                        message.shots.append((id_, kind, x, y, angle))
+                    elif (x, y) != (last_x, last_y):
+                        message.shots_moved.append((id_, x - last_x, y - last_y))
+                seen[proj] = (id_, kind, x, y, angle)
+        message.shots_removed.extend(
+            (self._projectiles[proj][0],)
+            for proj in self._projectiles.keys() - seen.keys()
+        )
+        self._projectiles = seen
+
+
+def encode(message: Message) -> bytes:
+    parts = [_TICK.pack(message.keyframe, message.tick)]
+    for records, record in message.sections():
+        parts.append(_COUNT.pack(len(records)))
+        parts.extend(record.pack(*r) for r in records)
+    body = b''.join(parts)
+    return _LENGTH.pack(len(body)) + body
+
+
+def decode(body: bytes | memoryview) -> Message:
+    """Decode a message, without its length prefix."""
+    keyframe, tick = _TICK.unpack_from(body)
+    message = Message(bool(keyframe), tick)
+    offset = _TICK.size
+    for records, record in message.sections():
+        (count,) = _COUNT.unpack_from(body, offset)
+        offset += _COUNT.size
+        size = count * record.size
+        records.extend(record.iter_unpack(body[offset : offset + size]))
+        offset += size
+    return message
+
+
+def read_header(fp: BinaryIO) -> dict[str, Any]:
+    magic, version, length = _HEADER.unpack(_read(fp, _HEADER.size))
+    if magic != MAGIC:
+        raise ValueError('Not a state stream')
+    if version != VERSION:
+        raise ValueError(f'Unsupported stream version {version}')
+    return json.loads(_read(fp, length))
+
+
+def read_messages(fp: BinaryIO) -> Iterator[Message]:
+    """Decode messages until the stream ends."""
+    while prefix := fp.read(_LENGTH.size):
+        (length,) = _LENGTH.unpack(prefix)
+        yield decode(_read(fp, length))
+
+
+def _read(fp: BinaryIO, size: int) -> bytes:
+    data = fp.read(size)
+    if len(data) != size:
+        raise EOFError('The stream ended mid-message')
+    return data
+
+
+def _quantize(value: float, quantum: int) -> int:
+    low, high = _INT16
+    return min(max(round(value * quantum), low), high)
+
+
+def _is_step(dx: int, dy: int) -> bool:
+    """Whether a move fits in a byte per axis."""
+    low, high = _INT8
+    return low <= dx <= high and low <= dy <= high
+
+
+class View:
+    """The game state as a viewer knows it, rebuilt from messages alone.
+
+    Positions are in pixels. Nothing is known until the first keyframe.
+    """
+
+    def __init__(self, header: dict[str, Any]):
+        self.header = header
+        self.tick = -1
+        self.synced = False
+        self.stats: dict[str, int] = {}
+        # Cell to tower type and level
+        self.towers: dict[tuple[int, int], tuple[int, int]] = {}
+        # Uid to type, x, y and health
+        self.monsters: dict[int, tuple[int, float, float, int]] = {}
+        # Id to kind, x, y and angle
+        self.projectiles: dict[int, tuple[int, float, float, int]] = {}
+
+    def apply(self, message: Message) -> None:
+        if message.keyframe:
+            self.synced = True
+            self.towers.clear()
+            self.monsters.clear()
+            self.projectiles.clear()
+        if not self.synced:
+            return
+        q = self.header['quantum']
+        self.tick = message.tick
+        for i, value in message.stats:
+            self.stats[STATS[i]] = value
+        for x, y, type_, level in message.towers:
+            if type_ < 0:
+                self.towers.pop((x, y), None)
+            else:
+                self.towers[x, y] = (type_, level)
+        for uid, type_, x, y, health in message.spawned:
+            self.monsters[uid] = (type_, x / q, y / q, health)
+        # Quarters and other powers of two in steps add up exactly as floats
+        for uid, dx, dy in message.moved:
+            type_, x, y, health = self.monsters[uid]
+            self.monsters[uid] = (type_, x + dx / q, y + dy / q, health)
+        for uid, health in message.hurt:
+            type_, x, y, _ = self.monsters[uid]
+            self.monsters[uid] = (type_, x, y, health)
+        for (uid,) in message.despawned:
+            del self.monsters[uid]
+        for id_, kind, x, y, angle in message.shots:
+            self.projectiles[id_] = (kind, x / q, y / q, angle)
+        for id_, dx, dy in message.shots_moved:
+            kind, x, y, angle = self.projectiles[id_]
+            self.projectiles[id_] = (kind, x + dx / q, y + dy / q, angle)
+        for (id_,) in message.shots_removed:
+            del self.projectiles[id_]
+
+
+class StateStream:
+    """Encodes the game each tick and writes it to `out` on a worker thread.
+
+    The game never waits on a slow reader: once `backlog` messages are waiting,
+    messages are dropped until one can be queued, which is sent as a keyframe.
+    The stream closes itself if the reader goes away.
+    """
+
+    def __init__(
+        self,
+        out: BinaryIO,
+        monster_types: Sequence[type],
+        map_name: str,
+        block_dim: int,
+        keyframe_ticks: int = 100,
+        backlog: int = 64,
+    ):
+        self.closed = False
+        self.dropped = 0
+        self.sent = 0
+        self._out = out
+        self._encoder = Encoder(monster_types, keyframe_ticks)
+        self._resync = False
+        self._queue: queue.Queue[bytes | None] = queue.Queue(backlog)
+        self._queue.put(self._encoder.header(map_name, block_dim))
+        self._thread = threading.Thread(
+            target=self._write, name='state-stream', daemon=True
+        )
+        self._thread.start()
+
+    def record(
+        self, tick: int, monsters: Sequence[IMonster], tower_map: TowerMap, stats: Stats
+    ) -> None:
+        if self.closed:
+            return
+        data = self._encoder.encode(
+            tick, monsters, tower_map, stats, keyframe=self._resync
+        )
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+            self._resync = True
+        else:
+            self._resync = False
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._queue.put(None, timeout=_CLOSE_TIMEOUT)
+        except queue.Full:
+            return
+        self._thread.join(_CLOSE_TIMEOUT)
+
+    def _write(self) -> None:
+        try:
+            while (data := self._queue.get()) is not None:
+                self._out.write(data)
+                self._out.flush()
+                self.sent += len(data)
+        except OSError:
+            # The reader went away
+            self.closed = True
+        finally:
+            try:
+                self._out.close()
+            except OSError:
+                pass
+
+
+def connect(address: str) -> BinaryIO:
+    """Open a stream to a viewer at `address`: ``host:port`` for TCP, else the
+    path of a Unix socket. ``-`` is standard output, e.g. a pipe.
+    """
+    if address == '-':
+        return sys.stdout.buffer
+    sock = socket.create_connection(_tcp(address)) if _is_tcp(address) else None
+    if sock is None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address)
+    return sock.makefile('wb')
+
+
+def accept(address: str) -> BinaryIO:
+    """Wait for a game to connect to `address`, as for `connect`, then return
+    the stream. ``-`` is standard input.
+    """
+    if address == '-':
+        return sys.stdin.buffer
+    if _is_tcp(address):
+        server = socket.create_server(_tcp(address))
+    else:
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(address)
+        server.listen(1)
+    with server:
+        sock, _ = server.accept()
+    if not _is_tcp(address):
+        os.unlink(address)
+    return sock.makefile('rb')
+
+
+def resolve(address: str, cwd: Path) -> str:
+    """The address with a relative Unix socket path made absolute from `cwd`."""
+    if address == '-' or _is_tcp(address):
+        return address
+    return str(cwd / address)
+
+
+def _is_tcp(address: str) -> bool:
+    host, _, port = address.rpartition(':')
+    return bool(host) and port.isdigit()
+
+
+def _tcp(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    return host, int(port)
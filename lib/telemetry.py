@@ -0,0 +1,213 @@
+"""Damage telemetry, recorded into fixed-size ring buffers."""
+from __future__ import annotations
+import csv
+from array import array
+from collections.abc import Iterator
+from enum import IntEnum
+from pathlib import Path
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from . import grid
+from .monster import IMonster
+
+if TYPE_CHECKING:
+    from .tower import ITowerMap
+
+TICKS_PER_SECOND: Final = 20  # Game timestep is 50ms
+
+
+class Effect(IntEnum):
+    NONE = 0
+    SLOW = 1
+    STUN = 2
+
+
+class Record(NamedTuple):
+    tick: int
+    tower: int
+    target: int
+    damage: int
+    overkill: int
+    effect: Effect
+
+
+class RingBuffer:
+    """Fixed capacity store of damage records.
+
+    Each field is a preallocated column, so appending only overwrites slots.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0
+        self._head = 0
+        self._ticks = array('q', [0]) * capacity
+        self._towers = array('l', [0]) * capacity
+        self._targets = array('l', [0]) * capacity
+        self._damages = array('l', [0]) * capacity
+        self._overkills = array('l', [0]) * capacity
+        self._effects = array('b', [0]) * capacity
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self) -> None:
+        self.count = 0
+        self._head = 0
+
+    def append(
+        self,
+        tick: int,
+        tower: int,
+        target: int,
+        damage: int,
+        overkill: int,
+        effect: int,
+    ) -> None:
+        i = self._head
+        self._ticks[i] = tick
+        self._towers[i] = tower
+        self._targets[i] = target
+        self._damages[i] = damage
+        self._overkills[i] = overkill
+        self._effects[i] = effect
+        self._head = 0 if i + 1 == self.capacity else i + 1
+        if self.count < self.capacity:
+            self.count += 1
+
+    def damage_since(self, tick: int) -> int:
+        """Return the damage dealt (excluding overkill) from `tick` onwards."""
+        total = 0
+        i = self._head
+        for _ in range(self.count):
+            i = self.capacity - 1 if i == 0 else i - 1
+            if self._ticks[i] < tick:
+                break
+            total += self._damages[i] - self._overkills[i]
+        return total
+
+    def __iter__(self) -> Iterator[Record]:
+        """Iterate over records, oldest first."""
+        start = (self._head - self.count) % self.capacity
+        for n in range(self.count):
+            i = (start + n) % self.capacity
+            yield Record(
+                self._ticks[i],
+                self._towers[i],
+                self._targets[i],
+                self._damages[i],
+                self._overkills[i],
+                Effect(self._effects[i]),
+            )
+
+
+class DamageLog:
+    """Per-tower and per-monster-type damage history."""
+
+    def __init__(self, capacity: int = 1024):
+        self.tick = 0
+        self._capacity = capacity
+        self._towers: list[str] = []
+        self._types: list[str] = []
+        self._type_ids: dict[str, int] = {}
+        self._by_tower: dict[int, RingBuffer] = {}
+        self._by_type: list[RingBuffer] = []
+        # Buffers of towers no longer on the map, cleared for the next towers
+        self._spare: list[RingBuffer] = []
+
+    def register(self, tower_name: str) -> int:
+        """Register a tower, returning its telemetry id. Ids are never reused."""
+        tower = len(self._towers)
+        self._towers.append(tower_name)
+        self._by_tower[tower] = (
+            self._spare.pop() if self._spare else RingBuffer(self._capacity)
+        )
+        return tower
+
+    def release(self, tower: int) -> None:
+        """Drop a removed tower's records, leaving its buffer to the next tower."""
+        buffer = self._by_tower.pop(tower)
+        buffer.clear()
+        self._spare.append(buffer)
+
+    def track(self, tower_map: ITowerMap) -> None:
+        """Release the ids of towers as they are sold or cleared from `tower_map`."""
+        ids: dict[grid.Point, int] = {}
+
+        def changed(p: grid.Point) -> None:
+            tower = tower_map[p].telemetry_id if p in tower_map else -1
+            old = ids.pop(p, -1)
+            if old >= 0 and old != tower:
+                self.release(old)
+            if tower >= 0:
+                ids[p] = tower
+
+        for p in tower_map:
+            changed(p)
+        tower_map.subscribe(changed)
+
+    def record(
+        self,
+        tower: int,
+        target: IMonster,
+        health: int,
+        damage: int,
+        effect: Effect = Effect.NONE,
+    ) -> None:
+        """Record `damage` dealt by `tower` to `target` that had `health` left."""
+        target_type = self._type_id(target.__class__.__name__)
+        overkill = damage - min(damage, max(health, 0))
+        buffer = self._by_tower.get(tower)
+        # None for the projectiles of a tower removed while they were in flight
+        if buffer is not None:
+            buffer.append(self.tick, tower, target_type, damage, overkill, effect)
+        self._by_type[target_type].append(
+            self.tick, tower, target_type, damage, overkill, effect
+        )
+
+    def _type_id(self, name: str) -> int:
+        type_id = self._type_ids.get(name)
+        if type_id is None:
+            type_id = self._type_ids[name] = len(self._types)
+            self._types.append(name)
+            self._by_type.append(RingBuffer(self._capacity))
+        return type_id
+
+    def dps(self, tower: int, window: int = 5 * TICKS_PER_SECOND) -> float:
+        """Rolling damage per second of `tower` over the last `window` ticks."""
+        elapsed = min(window, self.tick)
+        if elapsed <= 0:
+            return 0.0
+        damage = self._by_tower[tower].damage_since(self.tick - elapsed + 1)
+        return damage * TICKS_PER_SECOND / elapsed
+
+    def tower_records(self, tower: int) -> RingBuffer:
+        return self._by_tower[tower]
+
+    def type_records(self, monster_type: str) -> RingBuffer | None:
+        type_id = self._type_ids.get(monster_type)
+        return None if type_id is None else self._by_type[type_id]
+
+    def export_csv(self, fp: Path | str) -> None:
+        """Write every retained record, ordered by tick, as CSV."""
+        records = sorted(
+            (rec for buffer in self._by_tower.values() for rec in buffer),
+            key=lambda rec: rec.tick,
+        )
+        with open(fp, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                ['tick', 'tower_id', 'tower', 'target', 'damage', 'overkill', 'effect']
+            )
+            for rec in records:
+                writer.writerow(
+                    [
+                        rec.tick,
+                        rec.tower,
+                        self._towers[rec.tower],
+                        self._types[rec.target],
+                        rec.damage,
+                        rec.overkill,
+                        rec.effect.name.lower(),
+                    ]
+                )
@@ -2,21 +2,30 @@ from __future__ import annotations
 import math
 import tkinter as tk
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Mapping
 from dataclasses import dataclass, field
+from functools import cache
 from pathlib import Path
 from typing import Final, Protocol, runtime_checkable
 
-from PIL import ImageTk
+from PIL import Image, ImageTk
 
 from . import (
+    framebuffer,
     grid,
     io,
+    lod,
     monster,
+    projectile,
+    units,
 )
+from .framebuffer import Frame
+from .prefetch import Prefetcher
 from .protocols import GameObject
 from .maps import Dimension
 from .monster import IMonster
+from .corridor import PathCorridor
+from .telemetry import DamageLog
 from .projectile import (
     IProjectile,
     AngledProjectile,
@@ -25,6 +34,10 @@ from .projectile import (
 )
 
 
+# Called with the cell whose tower was placed, upgraded or removed
+TowerMapListener = Callable[[grid.Point], None]
+
+
 @runtime_checkable
 class ITowerMap(GameObject, Protocol):
     displayed: ITower | None
@@ -50,11 +63,48 @@ class ITowerMap(GameObject, Protocol):
     def remove(self, tower: ITower) -> None:
         ...
 
+    def point_of(self, tower: ITower) -> grid.Point:
+        ...
+
+    def covering(self, p: grid.Point) -> list[ITower]:
+        ...
+
+    def within(self, p: grid.Point, radius: float) -> list[ITower]:
+        ...
+
+    def subscribe(self, listener: TowerMapListener) -> None:
+        ...
+
 
 @dataclass(order=False)
 class TowerMap(GameObject):
+    """The placed towers by cell, indexed by tower, by type and by area."""
+
     _towers: dict[grid.Point, _Tower] = field(default_factory=dict)
     displayed: _Tower | None = None
+    # Tower sprites are drawn by a baked background, so only projectiles are
+    baked: bool = False
+    # Projectiles are drawn into a framebuffer as well, so only the selection is
+    blitted: bool = False
+    quality: lod.QualityController | None = None
+    _select_item: int | None = field(default=None, repr=False, compare=False)
+    _selected: tuple[int, int] | None = field(default=None, repr=False, compare=False)
+    _listeners: list[TowerMapListener] = field(
+        default_factory=list, repr=False, compare=False
+    )
+    _points: dict[_Tower, grid.Point] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    _by_type: dict[type[_Tower], dict[grid.Point, _Tower]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    # Towers by the cell they are on, and by the cells their range reaches
+    _positions: grid.Buckets[_Tower] = field(
+        default_factory=grid.Buckets, repr=False, compare=False
+    )
+    _reaches: grid.Buckets[_Tower] = field(
+        default_factory=grid.Buckets, repr=False, compare=False
+    )
 
     def __iter__(self) -> Iterable[grid.Point]:
         yield from self._towers
@@ -72,28 +122,120 @@ class TowerMap(GameObject):
         if p in self._towers:
             raise KeyError(f'Point {p} already taken!')
         self._towers[p] = tower
+        self._points[tower] = p
+        self._by_type.setdefault(type(tower), {})[p] = tower
+        self._positions.add(tower, p.x, p.y, p.x, p.y)
+        self._index_reach(tower, p)
+        tower.on_upgrade = lambda: self._upgraded(p)
+        self._changed(p)
 
     def select(self, p: grid.Point) -> None:
         tower = self[p]
         self.displayed = tower
 
+    def subscribe(self, listener: TowerMapListener) -> None:
+        self._listeners.append(listener)
+
+    def point_of(self, tower: _Tower) -> grid.Point:
+        return self._points[tower]
+
+    def of_type(self, type_: type[_Tower]) -> Mapping[grid.Point, _Tower]:
+        return self._by_type.get(type_, {})
+
+    def covering(self, p: grid.Point) -> list[_Tower]:
+        """The towers whose range reaches the centre of cell `p`."""
+        return [
+            tower
+            for tower in self._reaches.near(p.x, p.y, p.x, p.y)
+            if _distance2(self._points[tower], p) <= tower.reach**2
+        ]
+
+    def within(self, p: grid.Point, radius: float) -> list[_Tower]:
+        """The towers on cells whose centres are within `radius` cells of `p`'s."""
+        r = math.floor(radius)
+        return [
+            tower
+            for tower in self._positions.near(p.x - r, p.y - r, p.x + r, p.y + r)
+            if _distance2(self._points[tower], p) <= radius**2
+        ]
+
+    def clear(self) -> None:
+        points = list(self._towers)
+        self._towers.clear()
+        self._points.clear()
+        self._by_type.clear()
+        self._positions.clear()
+        self._reaches.clear()
+        self.displayed = None
+        for point in points:
+            self._changed(point)
+
     def update(self) -> None:
         for tower in self._towers.values():
             tower.update()
 
     def paint(self, canvas: tk.Canvas) -> None:
+        merged = None
+        if self.quality is not None and self.quality.quality is lod.Quality.MINIMAL:
+            merged = set()
+        if not self.blitted:
+            for tower in self._towers.values():
+                if self.baked:
+                    tower.paint_projectiles(canvas, merged)
+                else:
+                    tower.paint(canvas, merged)
+        self._paint_select(canvas)
+
+    def blit(self, frame: Frame) -> None:
+        """Draw every tower's projectiles into a framebuffer."""
         for tower in self._towers.values():
-            tower.paint(canvas)
-
-        if self.displayed is not None:
-            self.displayed.paintSelect(canvas)
+            tower.blit_projectiles(frame)
+
+    def _paint_select(self, canvas: tk.Canvas) -> None:
+        # A persistent item, only touched when the selection or its range changes
+        if self._select_item is None:
+            self._select_item = canvas.create_oval(
+                0,
+                0,
+                0,
+                0,
+                fill='',
+                outline="white",
+                state=tk.HIDDEN,
+                tags=lod.PERSISTENT,
+            )
+        displayed = self.displayed
+        selected = None if displayed is None else (id(displayed), displayed.level)
+        if selected == self._selected:
+            return
+        self._selected = selected
+        if displayed is None:
+            canvas.itemconfigure(self._select_item, state=tk.HIDDEN)
+        else:
+            canvas.coords(self._select_item, *displayed.range_box())
+            canvas.itemconfigure(self._select_item, state=tk.NORMAL)
 
     def remove(self, tower: _Tower) -> None:
-        for point, _tower in self._towers.items():
-            if _tower == tower:
-                self._towers.pop(point)
-                return None
-        raise KeyError(f'No such tower {tower} found.')
+        point = self._points.pop(tower, None)
+        if point is None:
+            raise KeyError(f'No such tower {tower} found.')
+        del self._towers[point]
+        del self._by_type[type(tower)][point]
+        self._positions.discard(tower)
+        self._reaches.discard(tower)
+        self._changed(point)
+
+    def _index_reach(self, tower: _Tower, p: grid.Point) -> None:
+        r = math.floor(tower.reach)
+        self._reaches.add(tower, p.x - r, p.y - r, p.x + r, p.y + r)
+
+    def _upgraded(self, p: grid.Point) -> None:
+        self._index_reach(self._towers[p], p)
+        self._changed(p)
+
+    def _changed(self, p: grid.Point) -> None:
+        for listener in self._listeners:
+            listener(p)
 
 
 @runtime_checkable
@@ -102,6 +244,13 @@ class ITower(Protocol):
     stickyTarget: bool
     name: str
     upgradeCost: int | None
+    telemetry_id: int
+    level: int
+    shots: int
+
+    @property
+    def target(self) -> IMonster | None:
+        ...
 
     def upgrade(self) -> None:
         ...
@@ -111,15 +260,18 @@ class _Tower(ABC):
     def __init__(self, x: float, y: float, gridx: int, gridy: int):
         self.level: int = 1
         self._range: int
+        self._block_dim: Dimension
         self._x = x
         self._y = y
         self._gridx = gridx
         self.gridy = gridy
-        self.image = load_img(self)
         self.targetList = 0
         self.stickyTarget = False
         self.name: str
         self.upgradeCost: int | None
+        self.telemetry_id = -1
+        self.shots = 0
+        self.on_upgrade: Callable[[], None] | None = None
         self._projectiles: list[IProjectile] = []
 
     @abstractmethod
@@ -132,30 +284,59 @@ class _Tower(ABC):
 
     def upgrade(self) -> None:
         self.level = self.level + 1
-        self.image = load_img(self)
         self.nextLevel()
+        if self.on_upgrade is not None:
+            self.on_upgrade()
 
-    def sold(self, tower_map: dict[grid.Point, _Tower]) -> None:
-        point = grid.Point(self._gridx, self.gridy)
-        tower_map.pop(point)
+    @property
+    def target(self) -> IMonster | None:
+        return None
+
+    @property
+    def image(self) -> ImageTk.PhotoImage:
+        # Resolved on paint, so images of unreached levels are never loaded
+        return load_img(self)
+
+    @property
+    def reach(self) -> float:
+        """How far it can target, in blocks from its centre."""
+        return self._range / self._block_dim + 0.5
+
+    def sold(self, tower_map: TowerMap) -> None:
+        tower_map.remove(self)
+
+    def range_box(self) -> lod.Box:
+        return range_box(self._x, self._y, self._range)
 
     def paintSelect(self, canvas: tk.Canvas) -> None:
-        canvas.create_oval(
-            self._x - self._range,
-            self._y - self._range,
-            self._x + self._range,
-            self._y + self._range,
-            fill='',
-            outline="white",
-        )
+        canvas.create_oval(*self.range_box(), fill='', outline="white")
 
-    def paint(self, canvas: tk.Canvas) -> None:
+    def paint(
+        self, canvas: tk.Canvas, merged: set[tuple[int, int, int]] | None = None
+    ) -> None:
         canvas.create_image(self._x, self._y, image=self.image, anchor=tk.CENTER)
+        self.paint_projectiles(canvas, merged)
+
+    def paint_projectiles(
+        self, canvas: tk.Canvas, merged: set[tuple[int, int, int]] | None = None
+    ) -> None:
+        """Paint the projectiles, skipping any matching one in `merged`."""
         for proj in self._projectiles:
+            if merged is not None:
+                key = proj.merge_key()
+                if key in merged:
+                    continue
+                merged.add(key)
             proj.paint(canvas)
 
+    def blit_projectiles(self, frame: Frame) -> None:
+        for proj in self._projectiles:
+            proj.blit(frame)
+
 
 class _TargetingTower(_Tower):
+    _projectile_type: type[projectile._Projectile]
+
     def __init__(
         self,
         x: float,
@@ -164,14 +345,25 @@ class _TargetingTower(_Tower):
         gridy: int,
         block_dim: Dimension,
         monsters: list[IMonster],
+        damage_log: DamageLog | None = None,
+        corridor: PathCorridor | None = None,
     ):
         super().__init__(x, y, gridx, gridy)
         self._bullets_per_second: int
         self._ticks = 0
         self._damage = 0
         self._block_dim = block_dim
-        self._target = None
+        self._target: IMonster | None = None
+        self._target_generation = 0
         self._monsters = monsters
+        self._damage_log = damage_log
+        self._corridor = corridor
+        if damage_log is not None:
+            self.telemetry_id = damage_log.register(self.__class__.__name__)
+        self.unit = _UNITS[self.__class__.__name__]
+        self.name = self.unit.name
+        self.infotext = f'{self.__class__.__name__} at [{gridx},{gridy}].'
+        self._apply(self.unit.levels[0])
 
     def update(self) -> None:
         self._prepareShot()
@@ -181,10 +373,23 @@ class _TargetingTower(_Tower):
                 self._projectiles.remove(proj)
 
     def nextLevel(self) -> None:
-        ...
+        self._apply(self.unit.levels[self.level - 1])
+
+    def _apply(self, stats: units.TowerLevel) -> None:
+        b_dim = self._block_dim
+        self._range = stats.range * b_dim
+        self._bullets_per_second = stats.fire_rate
+        self._damage = stats.damage
+        self._speed = stats.speed * b_dim
+        self._slow = stats.slow
+        self.upgradeCost = stats.upgrade_cost
+
+    @property
+    def target(self) -> IMonster | None:
+        return self._target
 
     def _prepareShot(self):
-        monster_list = monster.gen_list(self._monsters)[self.targetList]
+        monster_list = monster.target_order(self._monsters, self.targetList)
         if self._ticks != 20 / self._bullets_per_second:
             self._ticks += 1
 
@@ -193,17 +398,19 @@ class _TargetingTower(_Tower):
                 if (self._range + self._block_dim / 2) ** 2 >= (
                     self._x - monster_.x
                 ) ** 2 + (self._y - monster_.y) ** 2:
-                    self._target = monster_
+                    self._lock(monster_)
 
         if self._target:
             if (
                 not monster.is_dead(self._target)
+                and self._target.generation == self._target_generation
                 and (self._range + self._block_dim / 2)
                 >= ((self._x - self._target.x) ** 2 + (self._y - self._target.y) ** 2)
                 ** 0.5
             ):
                 if self._ticks >= 20 / self._bullets_per_second:
                     self._shoot()
+                    self.shots += 1
                     self._ticks = 0
             else:
                 self._target = None
@@ -212,46 +419,31 @@ class _TargetingTower(_Tower):
                 if (self._range + self._block_dim / 2) ** 2 >= (
                     self._x - monster_.x
                 ) ** 2 + (self._y - monster_.y) ** 2:
-                    self._target = monster_
+                    self._lock(monster_)
 
     def _shoot(self) -> None:
         ...
 
+    def _lock(self, monster_: IMonster) -> None:
+        self._target = monster_
+        self._target_generation = monster_.generation
+
     def _add(self, proj: IProjectile) -> None:
-        self._projectiles.append(proj)
+        if not proj.should_remove:
+            self._projectiles.append(proj)
 
     def _remove(self, proj: IProjectile) -> None:
         self._projectiles.remove(proj)
 
 
 class ArrowShooterTower(_TargetingTower):
-    def __init__(
-        self, x, y, gridx, gridy, block_dim: Dimension, monsters: list[IMonster]
-    ):
-        super().__init__(x, y, gridx, gridy, block_dim, monsters)
-        self.name = "Arrow Shooter"
-        self.infotext = "ArrowShooterTower at [" + str(gridx) + "," + str(gridy) + "]."
-        self._range = block_dim * 10
-        self._bullets_per_second = 1
-        self._damage = 10
-        self._speed = block_dim
-        self.upgradeCost = 50
-        self._projectile_type = AngledProjectile
+    _projectile_type = AngledProjectile
 
     @property
     def _angle(self) -> float:
         assert self._target is not None
         return math.atan2(self._y - self._target.y, self._target.x - self._x)
 
-    def nextLevel(self):
-        if self.level == 2:
-            self.upgradeCost = 100
-            self._range = self._block_dim * 11
-            self._damage = 12
-        elif self.level == 3:
-            self.upgradeCost = None
-            self._bullets_per_second = 2
-
     def _shoot(self):
         self._add(
             self._projectile_type(
@@ -262,22 +454,15 @@ class ArrowShooterTower(_TargetingTower):
                 self._angle,
                 self._range + self._block_dim / 2,
                 self._block_dim,
+                self._damage_log,
+                self.telemetry_id,
+                self._corridor,
             )
         )
 
 
 class BulletShooterTower(_TargetingTower):
-    def __init__(
-        self, x, y, gridx, gridy, block_dim: Dimension, monsters: list[IMonster]
-    ):
-        super().__init__(x, y, gridx, gridy, block_dim, monsters)
-        self.name = "Bullet Shooter"
-        self.infotext = "BulletShooterTower at [" + str(gridx) + "," + str(gridy) + "]."
-        self._range = block_dim * 6
-        self._bullets_per_second = 4
-        self._damage = 5
-        self._speed = block_dim / 2
-        self._projectile_type = TrackingBullet
+    _projectile_type = TrackingBullet
 
     def _shoot(self):
         self._add(
@@ -288,26 +473,14 @@ class BulletShooterTower(_TargetingTower):
                 self._speed,
                 self._target,
                 self._block_dim,
+                self._damage_log,
+                self.telemetry_id,
             )
         )
 
-    def nextLevel(self) -> None:
-        ...
-
 
 class PowerTower(_TargetingTower):
-    def __init__(
-        self, x, y, gridx, gridy, block_dim: Dimension, monsters: list[IMonster]
-    ):
-        super().__init__(x, y, gridx, gridy, block_dim, monsters)
-        self.name = "Power Tower"
-        self.infotext = "PowerTower at [" + str(gridx) + "," + str(gridy) + "]."
-        self._range = block_dim * 8
-        self._bullets_per_second = 10
-        self._damage = 1
-        self._speed = block_dim
-        self._slow = 3
-        self._projectile_type = PowerShot
+    _projectile_type = PowerShot
 
     def _shoot(self):
         self._add(
@@ -319,26 +492,15 @@ class PowerTower(_TargetingTower):
                 self._target,
                 self._slow,
                 self._block_dim,
+                self._damage_log,
+                self.telemetry_id,
             )
         )
 
-    def nextLevel(self) -> None:
-        ...
-
 
 class TackTower(_TargetingTower):
-    def __init__(
-        self, x, y, gridx, gridy, block_dim: Dimension, monsters: list[IMonster]
-    ):
-        super().__init__(x, y, gridx, gridy, block_dim, monsters)
-        self.name = "Tack Tower"
-        self.infotext = "TackTower at [" + str(gridx) + "," + str(gridy) + "]."
-        self._range = block_dim * 5
-        self._bullets_per_second = 1
-        self._damage = 10
-        self._speed = block_dim
-        self.angle: float
-        self._projectile_type = AngledProjectile
+    _projectile_type = AngledProjectile
+    angle: float
 
     def _shoot(self):
         for i in range(8):
@@ -352,11 +514,23 @@ class TackTower(_TargetingTower):
                     self.angle,
                     self._range,
                     self._block_dim,
+                    self._damage_log,
+                    self.telemetry_id,
+                    self._corridor,
                 )
             )
 
-    def nextLevel(self) -> None:
-        ...
+
+_UNITS: Final = {unit.type: unit for unit in units.load().towers}
+_BY_NAME: Final = {unit.name: unit for unit in units.load().towers}
+_CLASSES: Final[dict[str, type[_TargetingTower]]] = {
+    type_.__name__: type_
+    for type_ in (ArrowShooterTower, BulletShooterTower, TackTower, PowerTower)
+}
+
+
+def _distance2(a: grid.Point, b: grid.Point) -> int:
+    return (a.x - b.x) ** 2 + (a.y - b.y) ** 2
 
 
 def tower_factory(
@@ -365,42 +539,77 @@ def tower_factory(
     grid_: grid.Point,
     block_dim: Dimension,
     monsters: list[IMonster],
+    damage_log: DamageLog | None = None,
+    corridor: PathCorridor | None = None,
 ) -> _Tower:
-    towers_ = {
-        "Arrow Shooter": ArrowShooterTower,
-        "Bullet Shooter": BulletShooterTower,
-        "Tack Tower": TackTower,
-        "Power Tower": PowerTower,
-    }
-    tower_type = towers_[tower_]
-    return tower_type(loc.x, loc.y, grid_.x, grid_.y, block_dim, monsters)
+    tower_type = _CLASSES[TOWERS[tower_]]
+    return tower_type(
+        loc.x, loc.y, grid_.x, grid_.y, block_dim, monsters, damage_log, corridor
+    )
+
+
+def reach(tower_: str, level: int = 1) -> float:
+    """How far, in blocks from its centre, a tower at `level` can target."""
+    return _BY_NAME[tower_].levels[level - 1].range + 0.5
+
+
+def range_box(x: float, y: float, radius: float) -> lod.Box:
+    """The box of a tower's range circle, as outlined when it is selected."""
+    return x - radius, y - radius, x + radius, y + radius
+
+
+def prefetch(prefetcher: Prefetcher, tower_type: str, level: int) -> None:
+    """Have the sprite of a tower type at `level` decoded before it is needed,
+    with the sprites of its projectiles.
+    """
+    prefetcher.request(
+        _img_path(tower_type, level), lambda: _load_img(tower_type, level)
+    )
+    projectile.prefetch(prefetcher, _CLASSES[tower_type]._projectile_type)
+
+
+def prefetch_upgrade(prefetcher: Prefetcher, tower: _Tower) -> None:
+    if tower.upgradeCost is not None:
+        prefetch(prefetcher, tower.__class__.__name__, tower.level + 1)
 
 
 def load_img(tower: ITower | _Tower | str) -> ImageTk.PhotoImage:
     match tower:
         case _Tower():
-            img_fp = Path(f'tower/{tower.__class__.__name__}/{tower.level}.png')
+            return _load_img(tower.__class__.__name__, tower.level)
         case str():
-            img_fp = Path(f'tower/{TOWERS[tower]}/1.png')
+            return _load_img(TOWERS[tower], 1)
         case _:
             raise ValueError(f"Unhandled type {type(tower)}")
 
-    return io.load_img_tk(img_fp)
 
+@cache
+def _load_img(tower_type: str, level: int) -> ImageTk.PhotoImage:
+    return io.load_img_tk(_img_path(tower_type, level))
 
-TOWERS: Final = {
-    "Arrow Shooter": "ArrowShooterTower",
-    "Bullet Shooter": "BulletShooterTower",
-    "Tack Tower": "TackTower",
-    "Power Tower": "PowerTower",
-}
+
+def load_sprite(tower: _Tower) -> Image.Image:
+    """Return the tower's sprite as an RGBA image, for compositing."""
+    return _load_sprite(tower.__class__.__name__, tower.level)
+
+
+@cache
+def _load_sprite(tower_type: str, level: int) -> Image.Image:
+    return io.load_img(_img_path(tower_type, level)).convert('RGBA')
+
+
+def sprite(tower_type: str, level: int) -> framebuffer.Sprite:
+    """The sprite of a tower type at `level`, for blending into a framebuffer."""
+    return framebuffer.sprite(_img_path(tower_type, level))
+
+
+def _img_path(tower_type: str, level: int) -> Path:
+    return Path(f'tower/{tower_type}/{level}.png')
+
+
+# Display names to class names, in the order of the unit file
+TOWERS: Final = {unit.name: unit.type for unit in units.load().towers}
 
 
 def cost(tower: str) -> int:
-    _costs = {
-        "Arrow Shooter": 150,
-        "Bullet Shooter": 150,
-        "Tack Tower": 150,
-        "Power Tower": 200,
-    }
-    return _costs[tower]
+    return _BY_NAME[tower].cost
@@ -1,29 +1,48 @@
 from __future__ import annotations
+import itertools
 import random
-from collections.abc import Sequence
-from functools import cached_property
+import threading
+from collections.abc import Iterable, Sequence
+from functools import cache, cached_property
+from pathlib import Path
+from typing import BinaryIO, Final
 
 import tkinter as tk
+from PIL import ImageTk
 
 from . import (
+    background,
     buttons,
-    block,
+    constants as C,
+    corridor,
     display,
+    framebuffer,
     grid,
+    heatmap,
+    io,
+    lod,
     maps,
     monster,
     mouse,
+    prefetch,
+    snapshot,
+    startup,
+    stream,
+    telemetry,
     tower,
+    trace,
+    units,
 )
 from .block import Block
-from .grid import Grid
 from .maps import Dimension
 from .monster import IMonster
 from .tower import ITowerMap
 
 from .game import Game, GameState, Stats
 
-pathList = []
+QUICKSAVE = C.Paths.SAVES.join('quicksave.tds')
+# Canvas items per sprite and health bar, or one framebuffer image per frame
+RENDERERS: Final = ('canvas', 'framebuffer')
 
 
 class TowerDefenseGame(Game):
@@ -33,179 +52,338 @@ class TowerDefenseGame(Game):
         grid_dim: Dimension = Dimension(30),
         block_dim: Dimension = Dimension(20),
         map_name: str = 'LeoMap',
-        stats: Stats = Stats(1000, 100),
+        stats: Stats | None = None,
+        wave_name: str = 'WaveGenerator2',
+        headless: bool = False,
+        renderer: str = 'canvas',
+        seed: int | None = None,
     ):
         """Create Tower Defense game.
 
         grid_dim: the height and width of the array of blocks
         block_dim: pixels width of each block
+        headless: run without a window or side panels, e.g. for profiling
+        renderer: how the playfield is drawn, one of `RENDERERS`
+        seed: seeds the game's random numbers, so that a game can be replayed
         """
+        if renderer not in RENDERERS:
+            raise ValueError(f'Unknown renderer {renderer!r}')
         size = maps.size(grid_dim, block_dim)
-        super().__init__(title, size, size)
+        with startup.phase('tk root'):
+            super().__init__(title, size, size, headless=headless)
+        self.map_name = map_name
         self.grid_dim = grid_dim
         self.block_dim = block_dim
         self.state = GameState.IDLE
-        self.stats = stats
-
-        self.displayboard = display.Displayboard(self.frame, self.stats)
-        tower_map = tower.TowerMap()
-        infoboard = display.Infoboard(self.frame, tower_map)  # type: ignore
-        self.towerbox = display.Towerbox(self.frame, infoboard, tower_map)  # type: ignore
-        self.grid = self._load_grid(map_name)
+        self.stats = stats if stats is not None else Stats(1000, 100)
+        self.damage_log = telemetry.DamageLog()
+        self.random = random.Random(seed)
+        self.tracer: trace.Tracer | None = None
+        self.stream: stream.StateStream | None = None
+        self.playfield: framebuffer.Playfield | None = None
+        # Nothing is drawn headless, so there are no sprites to prefetch
+        self.prefetcher = None if headless else prefetch.Prefetcher(self.root)
+
+        self.tower_map = tower.TowerMap(quality=self.quality)
+        self.damage_log.track(self.tower_map)
+        if self.prefetcher is not None:
+            for tower_type in tower.TOWERS.values():
+                tower.prefetch(self.prefetcher, tower_type, 1)
+            self.tower_map.subscribe(self._prefetch_upgrade)
+        if not headless:
+            with startup.phase('side panels'):
+                self.displayboard = display.Displayboard(self.frame, self.stats)
+                self.infoboard = display.Infoboard(
+                    self.frame, self.tower_map, self.damage_log  # type: ignore
+                )
+                self.towerbox = display.Towerbox(
+                    self.frame, self.infoboard, self.tower_map  # type: ignore
+                )
+        with startup.phase('grid'):
+            self.grid = self._load_grid(map_name)
+            self.grid.track(self.tower_map)
         self.monsters: list[IMonster] = []
+        with startup.phase('waves and path'):
+            self.wavegenerator = Wavegenerator(self, wave_name)
+            _, directions = self.grid.path
+            self.corridor = corridor.PathCorridor(
+                self.wavegenerator.origin,
+                directions,
+                self.block_dim,
+                self.size,
+                self.monsters,
+            )
+            self.pool = MonsterPool(self.corridor, self.random)
+        if headless:
+            self._add_objects([self.wavegenerator, self.corridor, self.tower_map])
+            return
+
+        with startup.phase('map image'):
+            background_ = background.Background(
+                map_name, self.tower_map, self.block_dim
+            )
+        playfield: background.Background | framebuffer.Playfield = background_
+        if renderer == 'framebuffer':
+            self.playfield = playfield = framebuffer.Playfield(
+                background_, self.tower_map, self.monsters
+            )
+        self.heatmap = heatmap.Heatmap(self.grid, self.towerbox, self.tower_map)
+        with startup.phase('mouse'):
+            self.mouse = Mouse(self, self.infoboard, self.towerbox)
 
         self._add_objects(
             [
-                maps.Map(map_name),
-                Wavegenerator(self),
-                Mouse(self, infoboard, self.towerbox),
-                tower_map,
+                playfield,
+                self.heatmap,
+                self.wavegenerator,
+                self.mouse,
+                self.corridor,
+                self.tower_map,
             ]
         )
 
+        self.root.bind("<F5>", lambda _: self.save())
+        self.root.bind("<F9>", lambda _: self.load())
+        self.root.bind("<h>", lambda _: self.heatmap.toggle())
+
     @cached_property
     def size(self) -> Dimension:
         return maps.size(self.grid_dim, self.block_dim)
 
-    def _load_grid(self, map_name: str) -> Grid[Block]:
+    def _load_grid(self, map_name: str) -> maps.MapGrid:
         return maps.make_grid(map_name, self.block_dim, self.grid_dim)
 
     @property
     def is_idle(self) -> bool:
         return self.state is GameState.IDLE
 
-    def _update(self) -> None:
-        super()._update()
-        self.displayboard.update(self.stats)
+    def export_telemetry(self, fp: Path | str) -> None:
+        self.damage_log.export_csv(fp)
+
+    def start_trace(self, run_dir: Path) -> None:
+        """Trace the game state each tick into `run_dir`, until the game ends."""
+        self.tracer = trace.Tracer(
+            run_dir, MONSTERS, self.map_name, self.block_dim, self._timestep
+        )
+
+    def start_stream(
+        self, out: BinaryIO, keyframe_ticks: int = 100
+    ) -> stream.StateStream:
+        """Send the state changes of each tick to `out`, until the game ends."""
+        self.stream = stream.StateStream(
+            out, MONSTERS, self.map_name, self.block_dim, keyframe_ticks
+        )
+        return self.stream
+
+    def capture(self) -> snapshot.Snapshot:
+        towers, projectiles = snapshot.capture_towers(self.tower_map, self.monsters)
+        return snapshot.Snapshot(
+            self.tick,
+            self.state.value,
+            self.stats.money,
+            self.stats.health,
+            self.wavegenerator.position(),
+            towers,
+            snapshot.capture_monsters(self.monsters, MONSTERS),
+            projectiles,
+            snapshot.capture_random(self.random),
+        )
+
+    def restore(self, snap: snapshot.Snapshot) -> None:
+        self.tick = snap.tick
+        self.state = GameState(snap.state)
+        self.stats.money = snap.money
+        self.stats.health = snap.health
+        self.wavegenerator.seek(snap.wave)
+        snapshot.restore_random(self.random, snap.random)
 
         for monster_ in self.monsters:
-            monster_.update()
-            if monster.is_dead(monster_):
-                self.monsters.remove(monster_)
-                self.monsters.extend(monster_.children)
-                self.stats.money += monster_.value
-            if monster_.got_through:
-                self.stats.health -= monster_.damage
+            self.pool.release(monster_)
+        # Towers hold on to the monster list, so it is refilled in place
+        self.monsters[:] = snapshot.restore_monsters(
+            snap.monsters,
+            lambda idx, distance: self.pool.acquire(MONSTERS[idx], distance),
+        )
+        self.tower_map.clear()
+        snapshot.restore_towers(
+            snap,
+            self.tower_map,
+            self.grid,
+            self.block_dim,
+            self.monsters,
+            self.damage_log,
+            self.corridor,
+        )
+        if not self.headless:
+            self.infoboard.displaySpecific()
+
+    def _prefetch_upgrade(self, p: grid.Point) -> None:
+        if self.prefetcher is not None and p in self.tower_map:
+            tower.prefetch_upgrade(self.prefetcher, self.tower_map[p])
+
+    def start_wave(self) -> bool:
+        """Send the next wave, if the last one has been cleared."""
+        if not can_spawn(self, self.monsters):
+            return False
+        self.set_state(GameState.WAIT_FOR_SPAWN)
+        return True
+
+    def save(self, fp: Path = QUICKSAVE) -> threading.Thread:
+        """Save the game, writing it to disk in the background."""
+        return snapshot.save_async(self.capture(), fp)
+
+    def load(self, fp: Path = QUICKSAVE) -> None:
+        if fp.exists():
+            self.restore(snapshot.load(fp))
+
+    def _update(self) -> None:
+        self.damage_log.tick = self.tick
+        super()._update()
+        if not self.headless:
+            self.infoboard.refresh_dps()
+
+        tracer = self.tracer
+        with self.metrics.measure('monsters'):
+            for monster_ in self.monsters:
+                monster_.update()
+                if monster.is_dead(monster_):
+                    self.monsters.remove(monster_)
+                    self.monsters.extend(monster_.children)
+                    self.pool.release(monster_)
+                    self.stats.money += monster_.value
+                    if tracer is not None:
+                        if monster_.got_through:
+                            tracer.leaked(self.tick, (monster_,))
+                        else:
+                            tracer.died(self.tick, (monster_,))
+                        tracer.spawned(self.tick, monster_.children)
+                if monster_.got_through:
+                    self.stats.health -= monster_.damage
+
+        if not self.headless:
+            self.displayboard.set_wave_ready(can_spawn(self, self.monsters))
+        if tracer is not None:
+            tracer.record(self.tick, self.monsters, self.tower_map)
+        if self.stream is not None:
+            self.stream.record(self.tick, self.monsters, self.tower_map, self.stats)
+
+    def _end(self) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.tracer is not None:
+            self.tracer.close()
+            self.tracer = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        super()._end()
 
     def _paint(self) -> None:
         super()._paint()
+        if self.playfield is not None:
+            # Monsters were drawn into the playfield's frame
+            return
 
-        for monster_ in monster.sort_distance(self.monsters):
-            monster_.paint(self.canvas)
+        painter = self.painter
+        monsters = monster.sort_distance(self.monsters)
+        quality = self.quality.quality
+        if quality is lod.Quality.FULL:
+            for monster_ in monsters:
+                monster_.paint(painter)
+            return
 
-        self.displayboard.paint(
-            'blue' if self.is_idle and len(self.monsters) == 0 else 'red'
-        )
+        # Sprites first, then every health bar below full, without outlines
+        bars = []
+        for monster_ in monsters:
+            monster_.paint_sprite(painter)
+            bar = monster_.health_bar()
+            if bar is not None:
+                bars.append(bar)
+        if quality is lod.Quality.REDUCED:
+            lod.paint_boxes(painter, (back for back, _ in bars), 'red')
+        lod.paint_boxes(painter, (fill for _, fill in bars), 'green')
 
     def set_state(self, state: GameState) -> None:
         self.state = state
 
 
 class Wavegenerator:
-    def __init__(self, game: TowerDefenseGame):
+    def __init__(self, game: TowerDefenseGame, wave_name: str):
         self._game = game
+        self._waves = load_waves(wave_name)
+        self._wave_idx = 0
         self._current_wave: Sequence[int]
         self._curr_monster = 0
-        self._direction = None
-        self._gridx = 0
-        self._gridy = 0
         self._spawn = self._findSpawn()
-        self._decideMove()
         self._ticks = 1
         self._max_ticks = 2
-        self._wave_file = open("texts/waveTexts/WaveGenerator2.txt", "r")
+        self._prefetch_next()
+
+    @property
+    def spawn(self) -> grid.Loc:
+        return self._spawn
+
+    @property
+    def origin(self) -> grid.Loc:
+        """Position of a monster that has travelled no distance."""
+        return grid.Loc(self._spawn.x, self._spawn.y + self._game.block_dim / 2)
 
     def _getWave(self) -> None:
         self._game.set_state(GameState.SPAWNING)
         self._curr_monster = 1
-        wave_line = self._wave_file.readline()
-        if len(wave_line) == 0:
+        if self._wave_idx == len(self._waves):
             return
-        self._current_wave = tuple(map(int, wave_line.split()))
+        self._current_wave = self._waves[self._wave_idx]
+        self._wave_idx += 1
         self._max_ticks = self._current_wave[0]
+        self._prefetch_next()
 
-    def _findSpawn(self) -> grid.Loc:
-        for x in range(self._game.grid_dim):
-            if block.is_path(self._game.grid[x][0]):
-                self._gridx = x
-                spawnx = x * self._game.block_dim + self._game.block_dim / 2
-                spawny = 0
-                return grid.Loc(spawnx, spawny)
-
-        for y in range(self._game.grid_dim):
-            if block.is_path(self._game.grid[0][y]):
-                self._gridy = y
-                spawnx = 0
-                spawny = y * self._game.block_dim + self._game.block_dim / 2  # type: ignore
-                return grid.Loc(spawnx, spawny)
-
-        raise ValueError('Some invalid config of blocks')
+    def _prefetch_next(self) -> None:
+        """Have the sprites of every monster in the next wave decoded."""
+        prefetcher = self._game.prefetcher
+        if prefetcher is None or self._wave_idx == len(self._waves):
+            return
+        _, *indices = self._waves[self._wave_idx]
+        for type_ in descendants(MONSTERS[idx] for idx in set(indices)):
+            monster.prefetch(prefetcher, type_.prefab)
 
-    def _move(self):
-        pathList.append(self._direction)
-        if self._direction == 1:
-            self._gridx += 1
-        if self._direction == 2:
-            self._gridx -= 1
-        if self._direction == 3:
-            self._gridy += 1
-        if self._direction == 4:
-            self._gridy -= 1
-        self._decideMove()
-
-    def _decideMove(self):
-        if (
-            self._direction != 2
-            and self._gridx < self._game.grid_dim - 1
-            and self._gridy >= 0
-            and self._gridy <= self._game.grid_dim - 1
-        ):
-            if block.is_path(self._game.grid[self._gridx + 1][self._gridy]):
-                self._direction = 1
-                self._move()
-                return
+    @property
+    def wave(self) -> int:
+        """The waves sent so far."""
+        return self._wave_idx
 
-        if (
-            self._direction != 1
-            and self._gridx > 0
-            and self._gridy >= 0
-            and self._gridy <= self._game.grid_dim - 1
-        ):
-            if block.is_path(self._game.grid[self._gridx - 1][self._gridy]):
-                self._direction = 2
-                self._move()
-                return
+    @property
+    def waves_left(self) -> int:
+        return len(self._waves) - self._wave_idx
 
-        if (
-            self._direction != 4
-            and self._gridy < self._game.grid_dim - 1
-            and self._gridx >= 0
-            and self._gridx <= self._game.grid_dim - 1
-        ):
-            if block.is_path(self._game.grid[self._gridx][self._gridy + 1]):
-                self._direction = 3
-                self._move()
-                return
+    def position(self) -> snapshot.WavePosition:
+        return snapshot.WavePosition(
+            self._wave_idx, self._curr_monster, self._ticks, self._max_ticks
+        )
 
-        if (
-            self._direction != 3
-            and self._gridy > 0
-            and self._gridx >= 0
-            and self._gridx <= self._game.grid_dim - 1
-        ):
-            if block.is_path(self._game.grid[self._gridx][self._gridy - 1]):
-                self._direction = 4
-                self._move()
-                return
+    def seek(self, position: snapshot.WavePosition) -> None:
+        self._wave_idx = position.index
+        if self._wave_idx > 0:
+            self._current_wave = self._waves[self._wave_idx - 1]
+        self._curr_monster = position.monster
+        self._ticks = position.ticks
+        self._max_ticks = position.max_ticks
+        self._prefetch_next()
 
-        pathList.append(5)
+    def _findSpawn(self) -> grid.Loc:
+        x, y = self._game.grid.spawn()
+        b_dim = self._game.block_dim
+        if y == 0:
+            return grid.Loc(x * b_dim + b_dim / 2, 0)
+        return grid.Loc(0, y * b_dim + b_dim / 2)
 
     def _spawnMonster(self):
         monster_idx = self._current_wave[self._curr_monster]
 
-        self._game.monsters.append(
-            monster_factory(monster_idx, self._spawn, self._game.block_dim)
-        )
+        monster_ = monster_factory(monster_idx, self._game.pool)
+        self._game.monsters.append(monster_)
+        if self._game.tracer is not None:
+            self._game.tracer.spawned(self._game.tick, (monster_,))
         self._curr_monster = self._curr_monster + 1
 
     def update(self):
@@ -224,6 +402,15 @@ class Wavegenerator:
         pass
 
 
+@cache
+def load_waves(wave_name: str) -> Sequence[Sequence[int]]:
+    """Return each wave as (ticks between spawns, *monster indices)."""
+    text = io.load_text(Path(f'waveTexts/{wave_name}.txt'))
+    return tuple(
+        tuple(map(int, line.split())) for line in text.splitlines() if line.strip()
+    )
+
+
 def can_spawn(game: TowerDefenseGame, monsters_: Sequence[IMonster]) -> bool:
     return game.is_idle and len(monsters_) == 0
 
@@ -245,23 +432,33 @@ class Mouse:
         self._xoffset = 0
         self._yoffset = 0
         self._pressed = False
+        self._input = mouse.InputQueue()
 
         game.root.bind("<Button-1>", self._clicked)
         game.root.bind("<ButtonRelease-1>", self._released)
         game.root.bind("<Motion>", self._motion)
 
-        self._image = mouse.load_img('HoveringCanPress')
+        self._hoverImage = mouse.load_img('HoveringCanPress')
+        if game.prefetcher is not None:
+            # Shown on the first click, so decoded before any click comes
+            mouse.prefetch(game.prefetcher, 'Pressed')
         self.canNotPressImage = mouse.load_img('HoveringCanNotPress')
+        self._image = self._hoverImage
+        self._cursor: ImageTk.PhotoImage | None = None
+        self._item: int | None = None
+        self._update_cursor()
 
-    def _clicked(self, _):
-        self._pressed = True  # sets a variable
-        self._image = mouse.load_img('Pressed')
+    def _clicked(self, event: tk.Event) -> None:
+        self._input.push(mouse.Action.PRESS, event)
 
-    def _released(self, _):
-        self._pressed = False
-        self._image = mouse.load_img('HoveringCanPress')
+    def _released(self, event: tk.Event) -> None:
+        self._input.push(mouse.Action.RELEASE, event)
+
+    def _motion(self, event: tk.Event) -> None:
+        self._input.motion(event)
 
-    def _motion(self, event):
+    def _move_to(self, event: tk.Event) -> bool:
+        """Move to the event's position, returning whether the grid cell changed."""
         if event.widget == self.game.canvas:
             self._xoffset = 0
             self._yoffset = 0
@@ -280,18 +477,40 @@ class Mouse:
             self._x = 0
         if self._y < 0:
             self._y = 0
-        self._gridx = int(
-            (self._x - (self._x % self.game.block_dim)) / self.game.block_dim
-        )
-        self._gridy = int(
-            (self._y - (self._y % self.game.block_dim)) / self.game.block_dim
-        )
+        gridx = self._x // self.game.block_dim
+        gridy = self._y // self.game.block_dim
+        if gridx == self._gridx and gridy == self._gridy:
+            return False
+        self._gridx = gridx
+        self._gridy = gridy
+        self._update_cursor()
+        return True
 
     def update(self) -> None:
-        if self._in_grid() and self._pressed:
-            self._in_update()
-        else:
-            self._out_update()
+        for action, event, received in self._input.actions():
+            self._move_to(event)
+            if action is mouse.Action.PRESS:
+                self._pressed = True
+                self._image = mouse.load_img('Pressed')
+                effect = self._press()
+                if effect is not None:
+                    self.game.metrics.consumed(effect, received)
+            else:
+                self._pressed = False
+                self._image = self._hoverImage
+            self._update_cursor()
+
+        event = self._input.pop_motion()
+        if event is not None and self._move_to(event) and self._pressed:
+            # Dragging across the grid keeps placing towers
+            if self._in_grid():
+                self._in_update()
+
+    def _press(self) -> str | None:
+        """Act on a click, returning what it did for the latency metrics."""
+        if self._in_grid():
+            return self._in_update()
+        return self._out_update()
 
     def _in_grid(self) -> bool:
         return (
@@ -301,16 +520,27 @@ class Mouse:
             and self._gridy <= self.game.grid_dim - 1
         )
 
-    def _in_update(self) -> None:
+    def _update_cursor(self) -> None:
+        if not self._in_grid():
+            self._cursor = None
+            return
+        free = self.game.grid.can_build(self._gridx, self._gridy)
+        self._cursor = self._image if free else self.canNotPressImage
+
+    def _in_update(self) -> str | None:
         tower_map = self.infoboard.tower_map
         block_ = self.game.grid[self._gridx][self._gridy]
         if block_.grid_loc in tower_map:
             if not self.towerbox.is_selected:
                 tower_map.select(block_.grid_loc)
                 self.infoboard.displaySpecific()
+                return 'infoboard'
         else:
             if self.towerbox.is_selected and can_add_tower(
-                block_, self.towerbox.selected, self.game.stats.money
+                self.game.grid,
+                block_.grid_loc,
+                self.towerbox.selected,
+                self.game.stats.money,
             ):
                 self.game.stats.money -= add_tower(
                     tower_map,
@@ -318,36 +548,43 @@ class Mouse:
                     self.towerbox.selected,
                     self.game.block_dim,
                     self.game.monsters,
+                    self.game.damage_log,
+                    self.game.corridor,
                 )
+                return 'tower placed'
+        return None
 
-    def _out_update(self) -> None:
+    def _out_update(self) -> str | None:
+        effect = None
         pos = grid.Point(self._x - self._xoffset, self._y - self._yoffset)
         btn = self.game.displayboard.nextWaveButton
-        if all(
-            [
-                self._pressed,
-                buttons.is_within_bounds(btn, pos),
-                can_spawn(self.game, self.game.monsters),
-            ]
-        ):
-            self.game.set_state(GameState.WAIT_FOR_SPAWN)
-        if self._pressed:
-            self.game.stats.money += self.infoboard.buttonsCheck(
-                pos, self.game.stats.money
-            )
+        if buttons.is_within_bounds(btn, pos) and self.game.start_wave():
+            effect = 'wave started'
+        if self.infoboard.button_at(pos) is not None:
+            effect = 'infoboard'
+        self.game.stats.money += self.infoboard.buttonsCheck(
+            pos, self.game.stats.money
+        )
+        return effect
 
     def paint(self, canvas: tk.Canvas) -> None:
-        if not self._in_grid():
+        # A persistent item, moved at a rate that drops as quality is lowered
+        if self._item is None:
+            self._item = canvas.create_image(
+                0, 0, anchor=tk.NW, state=tk.HIDDEN, tags=lod.PERSISTENT
+            )
+        elif not self.game.quality.due(self.game.tick):
             return None
 
-        block_ = self.game.grid[self._gridx][self._gridy]
-        img = self._image if block.is_empty(block_) else self.canNotPressImage
-        canvas.create_image(
+        if self._cursor is None:
+            canvas.itemconfigure(self._item, state=tk.HIDDEN)
+            return None
+        canvas.coords(
+            self._item,
             self._gridx * self.game.block_dim,
             self._gridy * self.game.block_dim,
-            image=img,
-            anchor=tk.NW,
         )
+        canvas.itemconfigure(self._item, image=self._cursor, state=tk.NORMAL)
 
 
 def select_tower(tower_map: ITowerMap, grid_: grid.Point) -> None:
@@ -356,8 +593,10 @@ def select_tower(tower_map: ITowerMap, grid_: grid.Point) -> None:
 
 
 # TODO: Pass tower instance as param to both, instead of string.
-def can_add_tower(block_: Block, tower_: str, money: int) -> bool:
-    return all([block.is_empty(block_), can_buy_tower(money, tower_)])
+def can_add_tower(
+    grid_: maps.MapGrid, p: grid.Point, tower_: str, money: int
+) -> bool:
+    return grid_.can_build(p.x, p.y) and can_buy_tower(money, tower_)
 
 
 def can_buy_tower(money_: int, tower_: str) -> bool:
@@ -370,196 +609,165 @@ def add_tower(
     tower_: str,
     block_dim: Dimension,
     monsters: list[IMonster],
+    damage_log: telemetry.DamageLog | None = None,
+    corridor_: corridor.PathCorridor | None = None,
 ) -> int:
     tower_map[block_.grid_loc] = tower.tower_factory(
-        tower_, block_.loc, block_.grid_loc, block_dim, monsters
+        tower_,
+        block_.loc,
+        block_.grid_loc,
+        block_dim,
+        monsters,
+        damage_log,
+        corridor_,
     )
     return tower.cost(tower_)
 
 
 class Monster:
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        self.health: int
-        self._max_health: int
-        self.speed: float
-        self.movement: float
+    prefab: monster.Prefab
+
+    def __init__(self, distance: float, pool: MonsterPool):
+        self._pool = pool
+        self._path = pool.path
+        self._block_dim = pool.path.block_dim
+        self.x = self.y = 0.0
+        self.children: list[IMonster] = []
+        self.damage: int = 1
+        self.generation = 0
+        self.uid = -1
+        self.reset(distance)
+
+    def reset(self, distance: float) -> None:
+        """Respawn the monster at `distance` along the path, as if new."""
+        prefab, b_dim = self.prefab, self._block_dim
+        self.generation += 1
         self.tick = 0
         self.maxTick = 1
-        self._block_dim = block_dim
+        self.children.clear()
+        self.got_through = False
+        self._max_health = prefab.health
+        self.health = prefab.health
+        self.value = prefab.value
+        self.speed = prefab.speed * b_dim
+        self.movement = prefab.movement * b_dim
+        self.axis = prefab.axis * b_dim
         self.distance_travelled = max(distance, 0.0)
-        self._spawn = spawn
-        self.x, self.y = self._compute_position()
-        self.value = 0
-        self._image = monster.load_img(self)
-        self.axis: int | float
-        self.children: list[IMonster] = []
-        self.got_through: bool = False
-        self.damage: int = 1
+        self._place()
 
     def update(self):
-        if monster.is_dead(self):
+        if monster.is_dead(self) and not self.got_through:
             self._die()
         self._move()
 
     def _move(self):
         if self.tick >= self.maxTick:
             self.distance_travelled += self.movement
-            self.x, self.y = self._compute_position()
+            self._place()
             self.movement = self.speed
             self.tick = 0
             self.maxTick = 1
         self.tick += 1
 
-    # TODO: Optimize this section, as recomputing each time
-    def _compute_position(self) -> grid.Loc:
-        dist = self.distance_travelled
-        b_dim = self._block_dim
-        x = self._spawn.x
-        y = self._spawn.y + b_dim / 2
-        blocks = int((dist - (dist % b_dim)) / b_dim)
-        if blocks != 0:
-            for i in range(blocks):
-                if pathList[i] == 1:
-                    x += b_dim
-                elif pathList[i] == 2:
-                    x -= b_dim
-                elif pathList[i] == 3:
-                    y += b_dim
-                else:
-                    y -= b_dim
-        if dist % b_dim != 0:
-            if pathList[blocks] == 1:
-                x += dist % b_dim
-            elif pathList[blocks] == 2:
-                x -= dist % b_dim
-            elif pathList[blocks] == 3:
-                y += dist % b_dim
-            else:
-                y -= dist % b_dim
-        if pathList[blocks] == 5:
+    def _place(self) -> None:
+        if not self._path.place(self):
             self.health = 0
             self.got_through = True
 
-        return grid.Loc(x, y)
-
     def _die(self):
-        ...
+        prefab = self.prefab
+        if prefab.spawns is not None:
+            self._spawn_children(MONSTERS[prefab.spawns], prefab.spawn_count)
+
+    def _spawn_children(self, type_: type[Monster], count: int) -> None:
+        for _ in range(count):
+            self.children.append(
+                self._pool.acquire(type_, self._spawn_children_loc)
+            )
 
     @property
     def _spawn_children_loc(self) -> float:
-        return self.distance_travelled + self._block_dim * (0.5 - random.random())
+        offset = 0.5 - self._pool.random.random()
+        return self.distance_travelled + self._block_dim * offset
 
     def paint(self, canvas: tk.Canvas):
-        canvas.create_rectangle(
-            self.x - self.axis,
-            self.y - 3 * self.axis / 2,
-            self.x + self.axis - 1,
-            self.y - self.axis - 1,
-            fill="red",
-            outline="black",
-        )
-        canvas.create_rectangle(
-            self.x - self.axis + 1,
-            self.y - 3 * self.axis / 2 + 1,
-            self.x - self.axis + (self.axis * 2 - 2) * self.health / self._max_health,
-            self.y - self.axis - 2,
-            fill="green",
-            outline="green",
-        )
+        back, fill = self._health_bar()
+        canvas.create_rectangle(*back, fill="red", outline="black")
+        canvas.create_rectangle(*fill, fill="green", outline="green")
+        self.paint_sprite(canvas)
+
+    def paint_sprite(self, canvas: tk.Canvas) -> None:
         canvas.create_image(self.x, self.y, image=self._image, anchor=tk.CENTER)
 
+    def blit(self, frame: framebuffer.Frame) -> None:
+        back, fill = self._health_bar()
+        frame.rectangle(back, 'red', 'black')
+        frame.rectangle(fill, 'green', 'green')
+        frame.blit(framebuffer.sprite(self.prefab.sprite_path), self.x, self.y)
 
-class Monster1(Monster):
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        super().__init__(distance, spawn, block_dim)
-        self._max_health = 30
-        self.health = self._max_health
-        self.value = 5
-        self.speed = float(block_dim) / 2
-        self.movement = block_dim / 3
-        self.axis = block_dim / 2
+    def health_bar(self) -> tuple[lod.Box, lod.Box] | None:
+        if self.health >= self._max_health:
+            return None
+        return self._health_bar()
 
+    def _health_bar(self) -> tuple[lod.Box, lod.Box]:
+        return monster.health_bar(
+            self.x, self.y, self.axis, self.health, self._max_health
+        )
 
-class Monster2(Monster):
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        super().__init__(distance, spawn, block_dim)
-        self._max_health = 50
-        self.health = self._max_health
-        self.value = 10
-        self.speed = block_dim / 4
-        self.movement = block_dim / 4
-        self.axis = block_dim / 2
+    @property
+    def _image(self) -> ImageTk.PhotoImage:
+        # Loaded on first paint, so sprites are not decoded before they're seen
+        return self.prefab.image
 
-    def _die(self):
-        self.children = [
-            Monster1(self._spawn_children_loc, self._spawn, self._block_dim)
-        ]
 
+def _monster_type(prefab: monster.Prefab) -> type[Monster]:
+    """A `Monster` subclass per unit definition, named after it for telemetry."""
+    return type(prefab.name, (Monster,), {'prefab': prefab, '__module__': __name__})
 
-class AlexMonster(Monster):
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        super().__init__(distance, spawn, block_dim)
-        self._max_health = 500
-        self.health = self._max_health
-        self.value = 100
-        self.speed = block_dim / 5
-        self.movement = block_dim / 5
-        self.axis = block_dim
 
-    def _die(self):
-        self.children = [
-            Monster2(self._spawn_children_loc, self._spawn, self._block_dim)
-            for _ in range(5)
-        ]
-
-
-class BenMonster(Monster):
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        super().__init__(distance, spawn, block_dim)
-        self._max_health = 200
-        self.health = self._max_health
-        self.value = 30
-        self.speed = block_dim / 4
-        self.movement = block_dim / 4
-        self.axis = block_dim / 2
+# Indexed by the monster ids of the wave files: their order in the unit file
+MONSTERS: Final = tuple(_monster_type(prefab) for prefab in units.load().monsters)
 
-    def _die(self):
-        self.children = [
-            LeoMonster(self._spawn_children_loc, self._spawn, self._block_dim)
-            for _ in range(2)
-        ]
-
-
-class LeoMonster(Monster):
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        super().__init__(distance, spawn, block_dim)
-        self._max_health = 20
-        self.health = self._max_health
-        self.value = 2
-        self.speed = block_dim / 2
-        self.movement = block_dim / 2
-        self.axis = block_dim / 4
-
-
-class MonsterBig(Monster):
-    def __init__(self, distance: float, spawn: grid.Loc, block_dim: Dimension):
-        super().__init__(distance, spawn, block_dim)
-        self._max_health = 1000
-        self.health = self._max_health
-        self.value = 10
-        self.speed = block_dim / 6
-        self.movement = block_dim / 6
-        self.axis = 3 * block_dim / 2
-
-
-def monster_factory(idx: int, spawn: grid.Loc, block_dim: Dimension) -> Monster:
-    monsters_ = (
-        Monster1,
-        Monster2,
-        AlexMonster,
-        BenMonster,
-        LeoMonster,
-        MonsterBig,
-    )
-    monster_ = monsters_[idx](0.0, spawn, block_dim)
-    return monster_
+
+class MonsterPool:
+    """Recycles dead monsters into new spawns, keeping a free list per type."""
+
+    def __init__(self, path: corridor.PathCorridor, random_: random.Random):
+        self.path = path
+        # Where the children of dying monsters spawn
+        self.random = random_
+        self._free: dict[type[Monster], list[Monster]] = {
+            type_: [] for type_ in MONSTERS
+        }
+        self._uids = itertools.count()
+
+    def acquire(self, type_: type[Monster], distance: float) -> Monster:
+        free = self._free[type_]
+        if free:
+            monster_ = free.pop()
+            monster_.reset(distance)
+        else:
+            monster_ = type_(distance, self)
+        monster_.uid = next(self._uids)
+        return monster_
+
+    def release(self, monster_: IMonster) -> None:
+        if isinstance(monster_, Monster):
+            self._free[type(monster_)].append(monster_)
+
+
+def descendants(types: Iterable[type[Monster]]) -> set[type[Monster]]:
+    """The monster types given and every type that their deaths spawn."""
+    found: set[type[Monster]] = set()
+    for type_ in types:
+        while type_ not in found:
+            found.add(type_)
+            if type_.prefab.spawns is None:
+                break
+            type_ = MONSTERS[type_.prefab.spawns]
+    return found
+
+
+def monster_factory(idx: int, pool: MonsterPool) -> Monster:
+    return pool.acquire(MONSTERS[idx], 0.0)
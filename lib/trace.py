@@ -0,0 +1,290 @@
+"""Opt-in per-tick state trace, written as columns of ``.npy`` memory maps.
+
+A run directory holds one subdirectory per table, with one ``<column>.npy``
+file per column, plus ``meta.json`` naming the type and event ids. Columns
+load instantly with ``np.load(path, mmap_mode='r')``.
+"""
+from __future__ import annotations
+import json
+import os
+from collections.abc import Iterable, Sequence
+from enum import IntEnum
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Final
+
+import numpy as np
+
+from . import tower
+from .monster import IMonster
+from .tower import ITowerMap
+
+VERSION: Final = 2
+MONSTER_DTYPE: Final = np.dtype(
+    [
+        ('tick', '<i8'),
+        ('id', '<i8'),
+        ('type', '<i1'),
+        ('x', '<f4'),
+        ('y', '<f4'),
+        ('health', '<i4'),
+        ('distance', '<f4'),
+    ]
+)
+TOWER_DTYPE: Final = np.dtype(
+    [
+        ('tick', '<i8'),
+        ('id', '<i4'),
+        ('type', '<i1'),
+        ('gridx', '<i2'),
+        ('gridy', '<i2'),
+        ('level', '<i1'),
+        ('target', '<i8'),
+    ]
+)
+# For shots, id and type are the tower's and x, y its grid location
+EVENT_DTYPE: Final = np.dtype(
+    [
+        ('tick', '<i8'),
+        ('kind', '<i1'),
+        ('id', '<i8'),
+        ('type', '<i1'),
+        ('x', '<f4'),
+        ('y', '<f4'),
+    ]
+)
+
+
+class Event(IntEnum):
+    SPAWN = 0
+    DEATH = 1
+    LEAK = 2
+    SHOT = 3
+
+
+class Table:
+    """Records of one dtype, each field a growable ``.npy`` memmap."""
+
+    def __init__(self, directory: Path, dtype: np.dtype, capacity: int = 1 << 16):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.length = 0
+        self._columns = {
+            name: _Column(directory / f'{name}.npy', dtype[name], capacity)
+            for name in dtype.names or ()
+        }
+
+    def extend(self, records: np.ndarray) -> None:
+        for name, column in self._columns.items():
+            column.write(self.length, records[name])
+        self.length += len(records)
+
+    def close(self) -> None:
+        for column in self._columns.values():
+            column.resize(self.length)
+            column.close()
+
+
+class _Column:
+    def __init__(self, path: Path, dtype: np.dtype, capacity: int):
+        self._path = path
+        self._dtype = dtype
+        self._array: np.memmap | None = np.lib.format.open_memmap(
+            path, mode='w+', dtype=dtype, shape=(capacity,)
+        )
+        self._offset = self._array.offset
+
+    def write(self, start: int, values: np.ndarray) -> None:
+        assert self._array is not None
+        end = start + len(values)
+        if end > len(self._array):
+            self.resize(max(end, 2 * len(self._array)))
+            assert self._array is not None
+        self._array[start:end] = values
+
+    def resize(self, length: int) -> None:
+        """Grow or shrink the file in place, rewriting only its header."""
+        if self._array is not None and len(self._array) == length:
+            return
+        header = _header(self._dtype, length)
+        if len(header) != self._offset:
+            self._copy(length)
+            return
+        self.close()
+        with open(self._path, 'r+b') as f:
+            f.write(header)
+            f.truncate(self._offset + length * self._dtype.itemsize)
+        if length:
+            self._array = np.memmap(
+                self._path, self._dtype, 'r+', self._offset, (length,)
+            )
+
+    def close(self) -> None:
+        if self._array is not None:
+            self._array.flush()
+            self._array = None
+
+    def _copy(self, length: int) -> None:
+        # The header outgrew its padding, so the column moves to a new file
+        assert self._array is not None
+        tmp = self._path.with_suffix('.tmp')
+        array = np.lib.format.open_memmap(
+            tmp, mode='w+', dtype=self._dtype, shape=(length,)
+        )
+        count = min(length, len(self._array))
+        array[:count] = self._array[:count]
+        self.close()
+        array.flush()
+        os.replace(tmp, self._path)
+        self._array, self._offset = array, array.offset
+
+
+def _header(dtype: np.dtype, length: int) -> bytes:
+    buffer = BytesIO()
+    np.lib.format.write_array_header_1_0(
+        buffer,
+        {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (length,),
+        },
+    )
+    return buffer.getvalue()
+
+
+class Tracer:
+    """Records monsters, towers and events each tick into a run directory.
+
+    Rows are buffered in memory and flushed to the memmaps in bulk every
+    `flush_ticks` ticks.
+    """
+
+    def __init__(
+        self,
+        run_dir: Path,
+        monster_types: Sequence[type],
+        map_name: str,
+        block_dim: int,
+        timestep: int,
+        flush_ticks: int = 64,
+    ):
+        """map_name, block_dim and timestep are kept so the run can be replayed."""
+        self.run_dir = run_dir
+        self._monster_ids = {type_: i for i, type_ in enumerate(monster_types)}
+        self._tower_ids = {name: i for i, name in enumerate(tower.TOWERS)}
+        self._flush_ticks = flush_ticks
+        self._ticks = 0
+        self._monsters = Table(run_dir / 'monsters', MONSTER_DTYPE)
+        self._towers = Table(run_dir / 'towers', TOWER_DTYPE)
+        self._events = Table(run_dir / 'events', EVENT_DTYPE)
+        self._monster_rows: list[tuple[Any, ...]] = []
+        self._tower_rows: list[tuple[Any, ...]] = []
+        self._event_rows: list[tuple[Any, ...]] = []
+        self._shots: dict[int, int] = {}
+        self._write_meta(monster_types, map_name, block_dim, timestep)
+
+    def spawned(self, tick: int, monsters: Iterable[IMonster]) -> None:
+        self._add_events(tick, Event.SPAWN, monsters)
+
+    def died(self, tick: int, monsters: Iterable[IMonster]) -> None:
+        self._add_events(tick, Event.DEATH, monsters)
+
+    def leaked(self, tick: int, monsters: Iterable[IMonster]) -> None:
+        self._add_events(tick, Event.LEAK, monsters)
+
+    def record(
+        self, tick: int, monsters: Sequence[IMonster], tower_map: ITowerMap
+    ) -> None:
+        """Record the state at the end of `tick`."""
+        types = self._monster_ids
+        self._monster_rows.extend(
+            [
+                (
+                    tick,
+                    m.uid,
+                    types[type(m)],
+                    m.x,
+                    m.y,
+                    m.health,
+                    m.distance_travelled,
+                )
+                for m in monsters
+            ]
+        )
+        for point in tower_map:
+            tower_ = tower_map[point]
+            type_ = self._tower_ids[tower_.name]
+            target = tower_.target
+            self._tower_rows.append(
+                (
+                    tick,
+                    tower_.telemetry_id,
+                    type_,
+                    point.x,
+                    point.y,
+                    tower_.level,
+                    -1 if target is None else target.uid,
+                )
+            )
+            shots = tower_.shots
+            if shots != self._shots.get(tower_.telemetry_id, 0):
+                self._shots[tower_.telemetry_id] = shots
+                self._event_rows.append(
+                    (tick, Event.SHOT, tower_.telemetry_id, type_, point.x, point.y)
+                )
+
+        self._ticks += 1
+        if self._ticks % self._flush_ticks == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, rows, dtype in (
+            (self._monsters, self._monster_rows, MONSTER_DTYPE),
+            (self._towers, self._tower_rows, TOWER_DTYPE),
+            (self._events, self._event_rows, EVENT_DTYPE),
+        ):
+            if rows:
+                table.extend(np.array(rows, dtype=dtype))
+                rows.clear()
+
+    def close(self) -> None:
+        self.flush()
+        for table in (self._monsters, self._towers, self._events):
+            table.close()
+
+    def _add_events(
+        self, tick: int, kind: Event, monsters: Iterable[IMonster]
+    ) -> None:
+        types = self._monster_ids
+        self._event_rows.extend(
+            [(tick, kind, m.uid, types[type(m)], m.x, m.y) for m in monsters]
+        )
+
+    def _write_meta(
+        self,
+        monster_types: Sequence[type],
+        map_name: str,
+        block_dim: int,
+        timestep: int,
+    ) -> None:
+        meta = {
+            'version': VERSION,
+            'map': map_name,
+            'block_dim': block_dim,
+            'timestep': timestep,
+            'monster_types': [type_.__name__ for type_ in monster_types],
+            'tower_types': list(tower.TOWERS),
+            'events': {event.name: event.value for event in Event},
+        }
+        (self.run_dir / 'meta.json').write_text(json.dumps(meta, indent=1))
+
+
+def load_meta(run_dir: Path | str) -> dict[str, Any]:
+    return json.loads(Path(run_dir, 'meta.json').read_text())
+
+
+def load(run_dir: Path | str, table: str) -> dict[str, np.ndarray]:
+    """Map the columns of `table` in a run directory, read-only."""
+    directory = Path(run_dir, table)
+    return {
+        fp.stem: np.load(fp, mmap_mode='r') for fp in sorted(directory.glob('*.npy'))
+    }
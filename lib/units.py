@@ -0,0 +1,151 @@
+"""Unit definitions: the stats of every monster and tower, from ``texts/units.json``.
+
+The file is read and validated once, into frozen records per type, indexed by
+type id: the position of the type in the file.
+"""
+from __future__ import annotations
+import json
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, fields, replace
+from functools import cache
+from typing import Any
+
+from . import constants as C
+from .monster import Prefab
+
+
+@dataclass(frozen=True)
+class TowerLevel:
+    """A tower's stats at one level. range and speed are in blocks."""
+
+    range: float
+    fire_rate: int
+    damage: int
+    speed: float
+    # The cost of upgrading to the next level, None at the last
+    upgrade_cost: int | None = None
+    slow: float = 0
+
+
+@dataclass(frozen=True)
+class TowerDef:
+    name: str
+    type: str
+    cost: int
+    levels: tuple[TowerLevel, ...]
+
+
+@dataclass(frozen=True)
+class Units:
+    monsters: tuple[Prefab, ...]
+    towers: tuple[TowerDef, ...]
+
+
+@cache
+def load() -> Units:
+    return compile_units(json.loads(C.Paths.TEXTS.join('units.json').read_text()))
+
+
+def compile_units(data: Mapping[str, Any]) -> Units:
+    """Validate raw unit definitions and compile them into records.
+
+    Raises ValueError on the first invalid definition.
+    """
+    monsters = _compile_monsters(_list(data, 'monsters'))
+    towers = tuple(_compile_tower(t) for t in _list(data, 'towers'))
+    _unique('tower', [t.name for t in towers])
+    _unique('tower type', [t.type for t in towers])
+    return Units(monsters, towers)
+
+
+def _compile_monsters(raw: Sequence[Mapping[str, Any]]) -> tuple[Prefab, ...]:
+    names = [_field(m, 'name', str, 'monster') for m in raw]
+    _unique('monster', names)
+    ids = {name: i for i, name in enumerate(names)}
+    monsters = []
+    for name, m in zip(names, raw):
+        spawns, spawn_count = None, 0
+        if m.get('spawns') is not None:
+            child = _field(m['spawns'], 'monster', str, name)
+            if child not in ids:
+                raise ValueError(f'{name} spawns unknown monster {child!r}')
+            spawns = ids[child]
+            spawn_count = _positive(m['spawns'], 'count', int, name)
+        monsters.append(
+            Prefab(
+                name,
+                m.get('sprite', name),
+                _positive(m, 'health', int, name),
+                _field(m, 'value', int, name),
+                _positive(m, 'speed', float, name),
+                _positive(m, 'movement', float, name),
+                _positive(m, 'axis', float, name),
+                spawns,
+                spawn_count,
+            )
+        )
+    return tuple(monsters)
+
+
+def _compile_tower(raw: Mapping[str, Any]) -> TowerDef:
+    name = _field(raw, 'name', str, 'tower')
+    levels: list[TowerLevel] = []
+    for i, level in enumerate(_list(raw, 'levels'), 1):
+        where = f'{name} level {i}'
+        unknown = set(level) - {f.name for f in fields(TowerLevel)}
+        if unknown:
+            raise ValueError(f'{where} has unknown stats {sorted(unknown)}')
+        # Later levels only list what changes, except the upgrade cost
+        changes = {'upgrade_cost': None, **level}
+        for stat in ('range', 'speed'):
+            if stat in level:
+                _positive(level, stat, float, where)
+        for stat in ('fire_rate', 'damage'):
+            if stat in level:
+                _positive(level, stat, int, where)
+        if level.get('upgrade_cost') is not None:
+            _positive(level, 'upgrade_cost', int, where)
+        try:
+            levels.append(
+                replace(levels[-1], **changes) if levels else TowerLevel(**changes)
+            )
+        except TypeError as e:
+            raise ValueError(f'{where} is missing stats: {e}') from None
+    if not levels:
+        raise ValueError(f'{name} has no levels')
+    if levels[-1].upgrade_cost is not None:
+        raise ValueError(f'{name} has an upgrade cost at its last level')
+    type_ = _field(raw, 'type', str, name)
+    return TowerDef(name, type_, _positive(raw, 'cost', int, name), tuple(levels))
+
+
+def _list(raw: Mapping[str, Any], key: str) -> Sequence[Any]:
+    value = raw.get(key)
+    if not isinstance(value, list):
+        raise ValueError(f'Expected a list of {key}')
+    return value
+
+
+def _field(raw: Mapping[str, Any], key: str, type_: type, where: str) -> Any:
+    value = raw.get(key)
+    # JSON has no separate integral floats, so ints are accepted as floats
+    if type_ is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, type_) or isinstance(value, bool):
+        raise ValueError(f'{where}: expected {key} to be a {type_.__name__}')
+    return value
+
+
+def _positive(raw: Mapping[str, Any], key: str, type_: type, where: str) -> Any:
+    value = _field(raw, key, type_, where)
+    if value <= 0:
+        raise ValueError(f'{where}: expected {key} to be positive')
+    return value
+
+
+def _unique(kind: str, names: Sequence[str]) -> None:
+    seen = set()
+    for name in names:
+        if name in seen:
+            raise ValueError(f'Duplicate {kind} {name!r}')
+        seen.add(name)
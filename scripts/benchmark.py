@@ -0,0 +1,399 @@
+"""Benchmark scenarios headlessly, failing if any exceeds its budgets."""
+# pylint: disable=wrong-import-position
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import sys
+import os
+import time
+import tkinter as tk
+from collections.abc import Iterator
+from pathlib import Path
+
+
+def _config_path() -> None:
+    _root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, _root.as_posix())  # pylint: disable=no-member
+    # Needed as image loading is on relative paths
+    os.chdir(_root.joinpath('lib'))  # pylint: disable=no-member
+
+
+_config_path()
+
+from PIL import Image
+
+from lib import (
+    background,
+    checkpoints,
+    drawlist,
+    framebuffer,
+    grid,
+    io,
+    lod,
+    monster,
+    projectile,
+    scenario,
+    sessions,
+    tower,
+    tower_defense,
+)
+from lib.game import Stats
+
+
+def main() -> None:
+    args = _parse_args()
+    names = args.scenarios or scenario.names()
+    failures = 0
+    for name in names:
+        scenario_ = scenario.load(name)
+        failures += allocations(scenario_, args.waves)
+        latency(scenario_, args.waves)
+        draw_calls(scenario_, args.waves)
+        rendering(scenario_, args.waves)
+        concurrent_sessions(scenario_, args.waves, args.sessions)
+        layout_search(scenario_, args.waves, args.layouts)
+    if failures:
+        print(f'{failures} budget(s) exceeded')
+        sys.exit(1)
+
+
+def allocations(scenario_: scenario.Scenario, waves: int) -> int:
+    """Check the per-tick allocations of each subsystem against the budgets."""
+    game = scenario.build(scenario_)
+    game.freeze_gc()
+    tracked = game.metrics.track_allocations()
+    start = time.perf_counter()
+    ticks = scenario.play(game, waves=waves)
+    elapsed = time.perf_counter() - start
+    tracked.stop()
+    game.stop()
+
+    print(f'{scenario_.name}: {ticks} ticks, {waves} waves in {elapsed:.2f} s')
+    print(tracked.report())
+    failures = 0
+    for subsystem, budget in scenario_.budgets.items():
+        usage = tracked.usage.get(subsystem)
+        per_tick = usage.allocated_per_tick if usage is not None else 0.0
+        if per_tick > budget:
+            failures += 1
+            print(f'  {subsystem}: {per_tick:.0f} B/tick exceeds {budget} B/tick')
+    return failures
+
+
+def latency(scenario_: scenario.Scenario, waves: int, every: int = 10) -> None:
+    """Time clicks from their Tk event to the redraw that shows their effect, in a
+    window: starting each wave, and between waves selecting a placed tower and
+    placing another in turn every `every` frames. Played apart from the
+    allocations, as tracing them slows every tick down.
+    """
+    try:
+        game = tower_defense.TowerDefenseGame(
+            map_name=scenario_.map_name,
+            wave_name=scenario_.wave_name,
+            stats=Stats(scenario_.money, scenario_.health),
+            seed=scenario_.seed,
+        )
+    except tk.TclError as e:
+        print(f'  input latency skipped, as no window can be opened: {e}')
+        return
+    scenario.place(game, scenario_)
+    game.freeze_gc()
+    placed = list(game.tower_map)
+    free = [
+        grid.Point(x, y)
+        for x in range(game.grid_dim)
+        for y in range(game.grid_dim)
+        if game.grid.can_build(x, y)
+    ]
+    button = game.displayboard.nextWaveButton
+    start_wave = (
+        (button.coord1.x + button.coord2.x) // 2,
+        (button.coord1.y + button.coord2.y) // 2,
+    )
+    name = scenario_.towers[0].tower if scenario_.towers else 'Arrow Shooter'
+    tracked = game.metrics.track_latency()
+    sent = 0
+    frame = 0
+    while True:
+        game.towerbox.selected = '<None>'
+        if tower_defense.can_spawn(game, game.monsters):
+            if sent == waves:
+                break
+            _click(game, game.displayboard.canvas, *start_wave)
+            sent += 1
+        elif frame % every == 0 and frame // every % 2 == 0 and placed:
+            cell = placed[frame // every % len(placed)]
+            _click(game, game.canvas, *_centre(game, cell))
+        elif frame % every == 0 and free:
+            game.towerbox.selected = name
+            _click(game, game.canvas, *_centre(game, free.pop()))
+        _frame(game)
+        frame += 1
+    game.stop()
+    game.root.destroy()
+    print(tracked.report())
+
+
+def _click(game: tower_defense.TowerDefenseGame, widget: tk.Misc, x, y) -> None:
+    """Press and release the left button at `x`, `y` on `widget`, as Tk would."""
+    event = tk.Event()
+    event.widget = widget
+    event.x = x
+    event.y = y
+    game.mouse._clicked(event)  # pylint: disable=protected-access
+    game.mouse._released(event)  # pylint: disable=protected-access
+
+
+def _centre(
+    game: tower_defense.TowerDefenseGame, cell: grid.Point
+) -> tuple[int, int]:
+    """The canvas position of the middle of a grid cell."""
+    half = game.block_dim // 2
+    return cell.x * game.block_dim + half, cell.y * game.block_dim + half
+
+
+def _frame(game: tower_defense.TowerDefenseGame) -> None:
+    """Play one frame as the game loop would, then let Tk redraw the window and
+    run the idle callbacks that record what the frame showed.
+    """
+    game._run()  # pylint: disable=protected-access
+    game.root.update()
+
+
+class _CountingTcl:
+    """A bare Tcl interpreter, counting the calls made into it from Python."""
+
+    def __init__(self):
+        self.calls = 0
+        self._tcl = tk.Tcl().tk
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tcl.call(*args)
+
+    def __getattr__(self, name: str):
+        return getattr(self._tcl, name)
+
+
+class _TclCanvas(tk.Canvas):
+    """A canvas command in a bare Tcl interpreter, so no display is needed.
+
+    Creating an item only counts it, which leaves the cost of getting each call
+    from Python to Tcl.
+    """
+
+    # pylint: disable-next=super-init-not-called
+    def __init__(self):
+        self.tk = _CountingTcl()
+        self._w = '.canvas'
+        self.tk.eval(
+            'proc .canvas {command args} '
+            '{ if {$command eq "create"} { incr ::items }; return 1 }'
+        )
+        self.tk.eval('set ::items 0')
+
+    def __str__(self) -> str:
+        return self._w
+
+    @property
+    def items(self) -> int:
+        return int(self.tk.eval('set ::items'))
+
+
+@contextlib.contextmanager
+def _image_names() -> Iterator[None]:
+    """Load sprites as their paths, as a bare interpreter can hold no images.
+
+    Clears the image caches filled meanwhile on leaving, so that nothing painted
+    later is given a name.
+    """
+    load_img_tk = io.load_img_tk
+    io.load_img_tk = lambda fp, rotation=0: f'{fp.as_posix()}@{rotation}'
+    try:
+        yield
+    finally:
+        io.load_img_tk = load_img_tk
+        # pylint: disable=protected-access
+        for cached in (
+            monster._load_img,
+            tower._load_img,
+            projectile._load_img,
+            projectile._load_arrow_img,
+        ):
+            cached.cache_clear()
+
+
+def draw_calls(scenario_: scenario.Scenario, waves: int, repeat: int = 20) -> None:
+    """Paint the busiest frame with the game's own paint path, at each quality,
+    one Tcl call per item and as one draw list.
+    """
+    game = scenario.build(scenario_)
+    busiest, tick = -1, 0
+    for _ in scenario.steps(game, waves=waves):
+        sprites = _sprites(game)
+        if sprites > busiest:
+            busiest, tick = sprites, game.tick
+    game.stop()
+
+    # Scenarios are seeded, so playing again reaches the same frame
+    game = scenario.build(scenario_)
+    scenario.play(game, tick, waves)
+    print(f'  draw calls for the busiest frame, of {_sprites(game)} sprites:')
+    with _image_names():
+        for quality in lod.Quality:
+            game.quality.quality = quality
+            results = []
+            for batched in (False, True):
+                canvas = _TclCanvas()
+                # pylint: disable=attribute-defined-outside-init
+                game.canvas = canvas
+                game.draw = drawlist.DrawList(canvas) if batched else canvas
+                calls = items = 0
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    canvas.tk.calls = 0
+                    items = canvas.items
+                    _paint(game)
+                    calls, items = canvas.tk.calls, canvas.items - items
+                results.append((calls, (time.perf_counter() - start) / repeat))
+            (direct, direct_time), (batched_calls, batched_time) = results
+            print(
+                f'  {quality.name.lower():<8} {items:5d} items: '
+                f'{direct:5d} Tcl calls {direct_time * 1000:6.2f} ms per item, '
+                f'{batched_calls:3d} Tcl calls {batched_time * 1000:6.2f} ms '
+                'as a draw list'
+            )
+    game.stop()
+
+
+def _paint(game) -> None:
+    """Paint a frame as the game loop does."""
+    # pylint: disable=protected-access
+    game._paint()
+    if isinstance(game.draw, drawlist.DrawList):
+        game.draw.flush()
+    game.canvas.tag_raise(lod.PERSISTENT)
+
+
+def _sprites(game) -> int:
+    # pylint: disable-next=protected-access
+    return len(game.monsters) + sum(
+        len(game.tower_map[point]._projectiles) for point in game.tower_map
+    )
+
+
+def rendering(scenario_: scenario.Scenario, waves: int) -> None:
+    """Time compositing each frame's playfield into a framebuffer image."""
+    game = scenario.build(scenario_)
+    background_ = background.Background(
+        scenario_.map_name, game.tower_map, game.block_dim
+    )
+    playfield = framebuffer.Playfield(background_, game.tower_map, game.monsters)
+    timings = []
+    busiest, busiest_time = 0, 0.0
+    for _ in scenario.steps(game, waves=waves):
+        start = time.perf_counter()
+        Image.fromarray(playfield.render(), 'RGB')
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        sprites = _sprites(game)
+        if sprites >= busiest:
+            busiest, busiest_time = sprites, elapsed
+    game.stop()
+    mean = sum(timings) / len(timings) if timings else 0.0
+    print(
+        f'  framebuffer: {mean * 1000:.2f} ms a frame, '
+        f'{busiest_time * 1000:.2f} ms for the busiest, of {busiest} sprites'
+    )
+
+
+def concurrent_sessions(scenario_: scenario.Scenario, waves: int, count: int) -> None:
+    """Play the scenario as many sessions under one scheduler, against one game."""
+    game = scenario.build(scenario_)
+    start = time.perf_counter()
+    ticks = scenario.play(game, waves=waves)
+    alone = ticks / (time.perf_counter() - start)
+    game.stop()
+
+    scheduler = sessions.Scheduler()
+    for _ in range(count):
+        scheduler.add(scenario.build(scenario_), max_ticks=ticks, auto_waves=True)
+    asyncio.run(scheduler.run(until_done=True))
+    print(f'  one game alone: {alone:.0f} ticks/s')
+    print(scheduler.report())
+
+
+def layout_search(scenario_: scenario.Scenario, waves: int, count: int) -> None:
+    """Evaluate layouts that differ only in a tower placed before the last wave,
+    each played from the start and then resumed from cached checkpoints.
+    """
+    game = scenario.build(scenario_)
+    taken = {(placement.x, placement.y) for placement in scenario_.towers}
+    cells = [
+        (x, y)
+        for x in range(game.grid_dim)
+        for y in range(game.grid_dim)
+        if game.grid.is_empty(x, y) and (x, y) not in taken
+    ]
+    game.stop()
+    step = max(1, len(cells) // count)
+    layouts = [
+        dataclasses.replace(
+            scenario_,
+            towers=(
+                *scenario_.towers,
+                scenario.Placement('Tack Tower', x, y, wave=waves - 1),
+            ),
+        )
+        for x, y in cells[::step][:count]
+    ]
+
+    cache = checkpoints.CheckpointCache()
+    timings = []
+    for cache_ in (None, cache):
+        start = time.perf_counter()
+        results = [checkpoints.evaluate(layout, waves, cache_) for layout in layouts]
+        timings.append(time.perf_counter() - start)
+    from_start, resumed = timings
+    played = sum(result.played for result in results)
+    print(
+        f'  layout search, {len(layouts)} layouts: {from_start:.2f} s from the start, '
+        f'{resumed:.2f} s from checkpoints ({played} ticks played), '
+        f'{from_start / resumed:.1f}x'
+    )
+    print(cache.report())
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'scenarios',
+        nargs='*',
+        metavar='SCENARIO',
+        help=f'scenarios to run, of {", ".join(scenario.names())} (default: all)',
+    )
+    parser.add_argument(
+        '--waves', type=int, default=6, help='waves to play (default: 6)'
+    )
+    parser.add_argument(
+        '--sessions',
+        type=int,
+        default=16,
+        help='games played at once by the session scheduler (default: 16)',
+    )
+    parser.add_argument(
+        '--layouts',
+        type=int,
+        default=20,
+        help='layouts evaluated by the layout search (default: 20)',
+    )
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(scenario.names())
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    return args
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Pack every sprite into the pre-decoded sprite atlas."""
+# pylint: disable=wrong-import-position
+import sys
+from pathlib import Path
+
+sys.path.insert(0, Path(__file__).resolve().parents[1].as_posix())
+
+from lib import atlas
+
+
+def main() -> None:
+    for fp in atlas.build():
+        print(f'Wrote {fp}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Render a scenario or a traced game offscreen, to PNG frames or raw video."""
+# pylint: disable=wrong-import-position
+import argparse
+import sys
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def _config_path() -> None:
+    _root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, _root.as_posix())  # pylint: disable=no-member
+    # Needed as image loading is on relative paths
+    os.chdir(_root.joinpath('lib'))  # pylint: disable=no-member
+
+
+_OUT = Path.cwd()
+_config_path()
+
+from lib import export, scenario
+
+
+def main() -> None:
+    args = _parse_args()
+    out = args.out if args.out.is_absolute() else _OUT / args.out
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = args.trace
+        if run_dir is None:
+            run_dir = Path(tmp, args.scenario)
+            game = scenario.build(scenario.load(args.scenario))
+            game.start_trace(run_dir)
+            ticks = scenario.play(game, args.ticks, args.waves)
+            game.stop()
+            print(f'{args.scenario}: played {ticks} ticks')
+        elif not run_dir.is_absolute():
+            run_dir = _OUT / run_dir
+
+        export_ = export.Export(
+            run_dir, out, args.format, args.size, args.fps, args.speed, args.ranges
+        )
+        start = time.perf_counter()
+        frames = export.export(export_, args.workers)
+        elapsed = time.perf_counter() - start
+    print(f'Rendered {frames} frames in {elapsed:.2f} s to {out}')
+    if args.format == 'raw' and frames:
+        width, height = export.frame_size(export_)
+        print(
+            'Encode it with: ffmpeg -f rawvideo -pix_fmt rgb24 '
+            f'-s {width}x{height} -r {args.fps:g} -i {out} out.mp4'
+        )
+
+
+def _size(text: str) -> tuple[int, int]:
+    try:
+        width, height = map(int, text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected WIDTHxHEIGHT, not {text!r}')
+    return width, height
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        'scenario', nargs='?', choices=scenario.names(), help='scenario to play'
+    )
+    source.add_argument(
+        '--trace',
+        type=Path,
+        metavar='DIR',
+        help='render a run recorded with scripts/main.py --trace instead',
+    )
+    parser.add_argument(
+        '--ticks', type=int, help='ticks to play, sending waves back to back'
+    )
+    parser.add_argument(
+        '--waves',
+        type=int,
+        default=1,
+        help='waves to play, when no tick limit is given (default: 1)',
+    )
+    parser.add_argument(
+        '--out',
+        type=Path,
+        default=Path('frames'),
+        help='directory for PNG frames, or file for raw video (default: frames)',
+    )
+    parser.add_argument(
+        '--format',
+        choices=export.FORMATS,
+        default='png',
+        help='a PNG per frame, or raw rgb24 frames in one file (default: png)',
+    )
+    parser.add_argument(
+        '--size', type=_size, metavar='WxH', help='frame size (default: the map\'s)'
+    )
+    parser.add_argument(
+        '--fps', type=float, default=20.0, help='frames per second (default: 20)'
+    )
+    parser.add_argument(
+        '--speed',
+        type=float,
+        default=1.0,
+        help='game seconds per second of video (default: 1)',
+    )
+    parser.add_argument(
+        '--ranges', action='store_true', help='outline the range of every tower'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='processes rendering frame ranges (default: one per CPU)',
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 """Start up Game."""
 # pylint: disable=wrong-import-position
+import argparse
 import sys
 import os
+import time
 from pathlib import Path
 
+_START = time.perf_counter()
+
 
 def _config_path() -> None:
     _root = Path(__file__).resolve().parents[1]
@@ -12,18 +16,102 @@ def _config_path() -> None:
     os.chdir(_root.joinpath('lib'))  # pylint: disable=no-member
 
 
+_CWD = Path.cwd()
 _config_path()
 
-from lib import (
-    tower_defense,
-    game as G,
-)
+from lib import startup
 
 
 def main() -> None:
-    game = tower_defense.TowerDefenseGame(stats=G.Stats(2_000, 100))
+    args = _parse_args()
+    if args.profile_startup or args.startup_budget is not None:
+        startup.profiler.enable(origin=_START)
+
+    with startup.phase('imports'):
+        # pylint: disable-next=import-outside-toplevel
+        from lib import tower_defense, game as G
+
+    game = tower_defense.TowerDefenseGame(
+        stats=G.Stats(2_000, 100), renderer=args.renderer
+    )
+    if args.trace is not None:
+        game.start_trace(_CWD / args.trace)
+    if args.stream is not None:
+        # pylint: disable-next=import-outside-toplevel
+        from lib import stream
+
+        game.start_stream(stream.connect(stream.resolve(args.stream, _CWD)))
+    if args.freeze_gc:
+        game.after_first_frame(game.freeze_gc)
+    if args.latency:
+        game.metrics.track_latency()
+    over_budget = False
+
+    def _report() -> None:
+        nonlocal over_budget
+        elapsed = startup.profiler.finish()
+        print(startup.profiler.report())
+        if args.startup_budget is not None:
+            over_budget = elapsed * 1000 > args.startup_budget
+            verdict = 'EXCEEDED' if over_budget else 'ok'
+            print(f'Budget: {args.startup_budget} ms {verdict}')
+            game.stop()
+
+    if startup.profiler.enabled:
+        game.after_first_frame(_report)
     game.run()
 
+    if game.metrics.latency is not None:
+        print('Input latency:')
+        print(game.metrics.latency.report())
+    if over_budget:
+        sys.exit(1)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help='print a breakdown of the time to the first interactive frame',
+    )
+    parser.add_argument(
+        '--startup-budget',
+        type=float,
+        metavar='MS',
+        help='profile startup, then exit with status 1 if it took longer than MS',
+    )
+    parser.add_argument(
+        '--freeze-gc',
+        action='store_true',
+        help='freeze startup objects and only collect garbage between frames',
+    )
+    parser.add_argument(
+        '--latency',
+        action='store_true',
+        help='print histograms of the time from each click to its effect on exit',
+    )
+    parser.add_argument(
+        '--renderer',
+        choices=('canvas', 'framebuffer'),
+        default='canvas',
+        help='draw the playfield as canvas items, or composite it into one image '
+        'each frame (default: canvas)',
+    )
+    parser.add_argument(
+        '--trace',
+        type=Path,
+        metavar='DIR',
+        help='record the game state each tick as .npy columns in DIR',
+    )
+    parser.add_argument(
+        '--stream',
+        metavar='ADDRESS',
+        help='send the state changes of each tick to a viewer listening at '
+        'HOST:PORT or a Unix socket path, or - for standard output',
+    )
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+"""Profile a scenario headlessly, under cProfile or a stack sampler."""
+# pylint: disable=wrong-import-position
+import argparse
+import sys
+import os
+import time
+from pathlib import Path
+
+# This file would shadow the stdlib profile module that cProfile imports
+sys.path[:] = [p for p in sys.path if Path(p).resolve() != Path(__file__).parent]
+
+import cProfile
+import pstats
+
+
+def _config_path() -> None:
+    _root = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, _root.as_posix())  # pylint: disable=no-member
+    # Needed as image loading is on relative paths
+    os.chdir(_root.joinpath('lib'))  # pylint: disable=no-member
+
+
+_OUT = Path.cwd()
+_config_path()
+
+from lib import profiling, scenario
+
+
+def main() -> None:
+    args = _parse_args()
+    out = args.out if args.out.is_absolute() else _OUT / args.out
+    out.mkdir(parents=True, exist_ok=True)
+    game = scenario.build(scenario.load(args.scenario))
+
+    start = time.perf_counter()
+    if args.mode == 'cprofile':
+        profiler = cProfile.Profile()
+        ticks = profiler.runcall(scenario.play, game, args.ticks, args.waves)
+        elapsed = time.perf_counter() - start
+        stats = pstats.Stats(profiler)
+        path = out / f'{args.scenario}.pstats'
+        stats.dump_stats(path)
+        summary = profiling.stats_summary(stats, n=args.top)
+    else:
+        with profiling.Sampler(args.interval / 1000) as sampler:
+            ticks = scenario.play(game, args.ticks, args.waves)
+        elapsed = time.perf_counter() - start
+        path = out / f'{args.scenario}.collapsed'
+        with open(path, 'w', encoding='utf-8') as fp:
+            sampler.write_collapsed(fp)
+        summary = sampler.summary(n=args.top)
+
+    print(
+        f'{args.scenario}: {ticks} ticks in {elapsed:.2f} s '
+        f'({1000 * elapsed / max(ticks, 1):.2f} ms/tick), '
+        f'{game.wavegenerator.position().index} waves'
+    )
+    print(summary)
+    print(f'Wrote {path}')
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('scenario', choices=scenario.names())
+    parser.add_argument(
+        '--ticks', type=int, help='ticks to play, sending waves back to back'
+    )
+    parser.add_argument(
+        '--waves',
+        type=int,
+        default=1,
+        help='waves to play, when no tick limit is given (default: 1)',
+    )
+    parser.add_argument(
+        '--mode',
+        choices=('cprofile', 'sample'),
+        default='cprofile',
+        help='cprofile writes a .pstats file, sample a collapsed stack file',
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=1.0,
+        metavar='MS',
+        help='time between samples in sample mode (default: 1)',
+    )
+    parser.add_argument(
+        '--top', type=int, default=20, help='hot functions to summarise'
+    )
+    parser.add_argument(
+        '--out', type=Path, default=Path('profiles'), help='output directory'
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
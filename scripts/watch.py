@@ -0,0 +1,53 @@
+"""Watch a game streamed with scripts/main.py --stream, printing a status line."""
+# pylint: disable=wrong-import-position
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, Path(__file__).resolve().parents[1].as_posix())
+
+from lib import stream
+
+
+def main() -> None:
+    args = _parse_args()
+    print(f'Waiting for a game at {args.address}', file=sys.stderr)
+    fp = stream.accept(args.address)
+    header = stream.read_header(fp)
+    view = stream.View(header)
+    types = header['monster_types']
+    received = 0
+    for message in stream.read_messages(fp):
+        view.apply(message)
+        received += 1
+        if not view.synced or view.tick % args.every:
+            continue
+        counts: dict[str, int] = {}
+        for type_, *_ in view.monsters.values():
+            counts[types[type_]] = counts.get(types[type_], 0) + 1
+        monsters = ', '.join(f'{n} {name}' for name, n in sorted(counts.items()))
+        print(
+            f'tick {view.tick}: money {view.stats.get("money")} '
+            f'health {view.stats.get("health")}, {len(view.towers)} towers, '
+            f'{len(view.projectiles)} projectiles, monsters: {monsters or "none"}'
+        )
+    print(f'Stream ended after {received} messages', file=sys.stderr)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'address',
+        help='HOST:PORT or a Unix socket path to listen on, or - for standard input',
+    )
+    parser.add_argument(
+        '--every',
+        type=int,
+        default=20,
+        help='print the state every N ticks (default: 20)',
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()